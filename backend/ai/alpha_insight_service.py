@@ -1,13 +1,19 @@
 # AI-powered insight service (moved from services)
 import os
+import json
+import asyncio
 import logging
 from openai import AsyncOpenAI
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple
+from backend.ai.insight_cache import InsightCache, insight_key
 
 logger = logging.getLogger(__name__)
 
+BATCH_TOKENS_PER_INSIGHT = 80  # Completion budget per token in batch mode
+
 class AlphaInsightService:
-    def __init__(self):
+    def __init__(self, cache: Optional[InsightCache] = None):
+        self.cache = cache or InsightCache()
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             logger.warning("OPENAI_API_KEY not found in environment variables")
@@ -15,9 +21,11 @@ class AlphaInsightService:
         else:
             self.client = AsyncOpenAI(api_key=self.api_key)
         
-    async def get_insight(self, price_cex: float, price_dex: float, spread: float, token: str, volume: float, slippage: float = None, trend: float = None, detailed: bool = False) -> str:
-        if not self.client:
-            return f"Spread {spread:+.2f}% with ${volume:.0f} volume"
+    @staticmethod
+    def _build_prompt(price_cex: float, price_dex: float, spread: float, token: str, volume: float,
+                      slippage: Optional[float], trend: Optional[float], detailed: bool) -> Tuple[str, int]:
+        trend_text = f"{trend:+.2f}%" if trend is not None else "n/a"
+        slippage_text = f"{slippage:.2f}%" if slippage is not None else "n/a"
 
         if detailed:
             prompt = (
@@ -31,11 +39,11 @@ Format your response exactly as below, using clear sections and emojis:
 📉 Market Overview
 CEX: ${price_cex:.4f} | DEX: ${price_dex:.4f}
 Spread: {spread:+.2f}%
-24h Trend: {trend:+.2f}%
+24h Trend: {trend_text}
 
 💧 Liquidity
 Volume: ${volume:,.1f} — describe activity (e.g. strong/weak)
-Slippage: {slippage:.2f}% — describe entry/exit (e.g. smooth/high impact)
+Slippage: {slippage_text} — describe entry/exit (e.g. smooth/high impact)
 
 ⚠️ Risk Level
 Describe risk (trend, spread, volatility, etc.)
@@ -54,11 +62,24 @@ Keep each section 1-2 lines. Be objective, avoid hype, and use only English.
             prompt = (
                 f"""
 You are a professional crypto trading assistant. Based on the following data, give a concise, actionable trading insight for {token}.
-CEX price: ${price_cex:.4f} | DEX price: ${price_dex:.4f} | Spread: {spread:+.2f}% | Volume: ${volume:,.0f} | 24h Trend: {trend:+.2f}% | Slippage: {slippage:.2f}%
+CEX price: ${price_cex:.4f} | DEX price: ${price_dex:.4f} | Spread: {spread:+.2f}% | Volume: ${volume:,.0f} | 24h Trend: {trend_text} | Slippage: {slippage_text}
 Format: 1-2 sentences, no section headers, no emojis, no preamble, just the main idea in English.
 """
             )
             max_tokens = 80
+        return prompt, max_tokens
+
+    async def get_insight(self, price_cex: float, price_dex: float, spread: float, token: str, volume: float, slippage: float = None, trend: float = None, detailed: bool = False) -> str:
+        if not self.client:
+            return self._fallback_text(spread, volume)
+
+        # Identical (bucketed) market conditions reuse a recent insight instead of a new LLM call
+        cache_key = insight_key(token, detailed, spread, trend, slippage, volume)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        prompt, max_tokens = self._build_prompt(price_cex, price_dex, spread, token, volume, slippage, trend, detailed)
         try:
             response = await self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
@@ -68,8 +89,163 @@ Format: 1-2 sentences, no section headers, no emojis, no preamble, just the main
             )
             ai_text = response.choices[0].message.content.strip()
             if not ai_text:
-                ai_text = f"Spread {spread:+.2f}% with ${volume:.0f} volume"
+                return self._fallback_text(spread, volume)
+            await self.cache.set(cache_key, ai_text)
             return ai_text
         except Exception as e:
             logger.error(f"Error generating insight: {e}")
-            return f"Spread {spread:+.2f}% with ${volume:.0f} volume"
+            return self._fallback_text(spread, volume)
+
+    async def stream_insight(self, price_cex: float, price_dex: float, spread: float, token: str, volume: float,
+                             slippage: float = None, trend: float = None, detailed: bool = True) -> AsyncIterator[str]:
+        """
+        Stream an insight as it is generated.
+        Yields the accumulated text so far after every received chunk; a cached insight
+        or the fallback text is yielded once. The complete text is cached like get_insight.
+        """
+        if not self.client:
+            yield self._fallback_text(spread, volume)
+            return
+
+        cache_key = insight_key(token, detailed, spread, trend, slippage, volume)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        prompt, max_tokens = self._build_prompt(price_cex, price_dex, spread, token, volume, slippage, trend, detailed)
+        text = ""
+        try:
+            stream = await self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=0.5,
+                stream=True,
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    text += delta
+                    yield text
+        except Exception as e:
+            logger.error(f"Error streaming insight: {e}")
+            if not text.strip():
+                yield self._fallback_text(spread, volume)
+            return
+
+        if text.strip():
+            await self.cache.set(cache_key, text.strip())
+        else:
+            yield self._fallback_text(spread, volume)
+
+    @staticmethod
+    def _fallback_text(spread: float, volume: float) -> str:
+        return f"Spread {spread:+.2f}% with ${volume:.0f} volume"
+
+    @staticmethod
+    def _parse_batch(content: str, tokens: List[str]) -> Dict[str, str]:
+        """Validate the batch JSON and return insights only for requested tokens with non-empty text."""
+        try:
+            payload = json.loads(content)
+        except (TypeError, json.JSONDecodeError) as e:
+            logger.error(f"Batch insight response is not valid JSON: {e}")
+            return {}
+        entries = payload.get("insights") if isinstance(payload, dict) else None
+        if not isinstance(entries, list):
+            logger.error("Batch insight response has no 'insights' list")
+            return {}
+        wanted = set(tokens)
+        parsed = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            token = str(entry.get("token", "")).upper()
+            text = entry.get("insight")
+            if token in wanted and isinstance(text, str) and text.strip():
+                parsed[token] = text.strip()
+        return parsed
+
+    async def get_insights_batch(self, items: List[Mapping[str, Any]]) -> Dict[str, str]:
+        """
+        Short insights for many tokens with one LLM call.
+        Args:
+            items: comparison dicts with token, price_cex, price_dex, spread_pct, volume_dex, slippage, trend
+        Returns:
+            {token: insight}; entries missing from or invalid in the batch response are
+            generated with individual get_insight calls.
+        """
+        insights: Dict[str, str] = {}
+        by_token = {item["token"].upper(): item for item in items}
+        if not self.client:
+            return {
+                token: self._fallback_text(item["spread_pct"], item.get("volume_dex") or 0)
+                for token, item in by_token.items()
+            }
+
+        keys = {}
+        for token, item in by_token.items():
+            keys[token] = insight_key(token, False, item["spread_pct"], item.get("trend"),
+                                      item.get("slippage"), item.get("volume_dex") or 0)
+            cached = await self.cache.get(keys[token])
+            if cached is not None:
+                insights[token] = cached
+        missing = [token for token in by_token if token not in insights]
+        if not missing:
+            return insights
+
+        lines = []
+        for token in missing:
+            item = by_token[token]
+            trend = item.get("trend")
+            slippage = item.get("slippage")
+            lines.append(
+                f"- {token}: CEX price ${item['price_cex']:.4f} | DEX price ${item['price_dex']:.4f} | "
+                f"Spread: {item['spread_pct']:+.2f}% | Volume: ${item.get('volume_dex') or 0:,.0f} | "
+                f"24h Trend: {f'{trend:+.2f}%' if trend is not None else 'n/a'} | "
+                f"Slippage: {f'{slippage:.2f}%' if slippage is not None else 'n/a'}"
+            )
+        prompt = (
+            "You are a professional crypto trading assistant. For each token below, give a concise, actionable trading insight.\n"
+            + "\n".join(lines)
+            + "\nEach insight: 1-2 sentences, no section headers, no emojis, no preamble, just the main idea in English.\n"
+            'Respond with JSON only: {"insights": [{"token": "<SYMBOL>", "insight": "<text>"}]}, one entry per token.'
+        )
+        try:
+            response = await self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=BATCH_TOKENS_PER_INSIGHT * len(missing) + 50,
+                temperature=0.5,
+                response_format={"type": "json_object"},
+            )
+            parsed = self._parse_batch(response.choices[0].message.content, missing)
+        except Exception as e:
+            logger.error(f"Error generating batch insights: {e}")
+            parsed = {}
+
+        for token, text in parsed.items():
+            insights[token] = text
+            await self.cache.set(keys[token], text)
+
+        # Per-token fallback only for entries the batch did not cover
+        retry = [token for token in missing if token not in parsed]
+        if retry:
+            logger.warning(f"Batch insight fell back to single calls for: {', '.join(retry)}")
+            texts = await asyncio.gather(*[
+                self.get_insight(
+                    price_cex=by_token[token]["price_cex"],
+                    price_dex=by_token[token]["price_dex"],
+                    spread=by_token[token]["spread_pct"],
+                    token=token,
+                    volume=by_token[token].get("volume_dex") or 0,
+                    slippage=by_token[token].get("slippage"),
+                    trend=by_token[token].get("trend"),
+                    detailed=False,
+                )
+                for token in retry
+            ])
+            insights.update(zip(retry, texts))
+        return insights
@@ -0,0 +1,130 @@
+# Cache for AI insight text keyed on quantized market state
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INSIGHT_CACHE_TTL = float(os.getenv("INSIGHT_CACHE_TTL", "300"))
+INSIGHT_CACHE_SIZE = int(os.getenv("INSIGHT_CACHE_SIZE", "2048"))
+# Optional SQLite file for a persistent tier shared across restarts/processes
+INSIGHT_CACHE_DB = os.getenv("INSIGHT_CACHE_DB")
+
+# Bucket widths: market states within one bucket get the same insight
+SPREAD_STEP = 0.25    # percent
+TREND_STEP = 1.0      # percent
+SLIPPAGE_STEP = 0.1   # percent
+
+
+def _bucket(value: Optional[float], step: float) -> str:
+    if value is None:
+        return "na"
+    return str(int(math.floor(value / step)))
+
+
+def insight_key(token: str, detailed: bool, spread: float, trend: Optional[float] = None,
+                slippage: Optional[float] = None, volume: Optional[float] = None) -> str:
+    """Cache key: token, mode and bucketed spread/trend/slippage plus volume order of magnitude."""
+    volume_magnitude = str(int(math.floor(math.log10(volume)))) if volume and volume > 0 else "0"
+    return "|".join([
+        token.upper(),
+        "detailed" if detailed else "short",
+        _bucket(spread, SPREAD_STEP),
+        _bucket(trend, TREND_STEP),
+        _bucket(slippage, SLIPPAGE_STEP),
+        volume_magnitude,
+    ])
+
+
+class InsightCache:
+    def __init__(self, ttl: float = INSIGHT_CACHE_TTL, maxsize: int = INSIGHT_CACHE_SIZE,
+                 db_path: Optional[str] = INSIGHT_CACHE_DB):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        if self.db_path:
+            self._init_db()
+
+    def _init_db(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS insight_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    insight TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _db_get(self, key: str) -> Optional[Tuple[float, str]]:
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT created_at, insight FROM insight_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _db_set(self, key: str, created_at: float, text: str):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO insight_cache (cache_key, insight, created_at) VALUES (?, ?, ?)",
+                (key, text, created_at),
+            )
+            conn.execute("DELETE FROM insight_cache WHERE created_at < ?", (created_at - self.ttl,))
+
+    def _remember(self, key: str, created_at: float, text: str):
+        self._memory[key] = (created_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._memory[key]
+        if self.db_path:
+            try:
+                entry = await asyncio.to_thread(self._db_get, key)
+            except sqlite3.Error as e:
+                logger.warning(f"Insight cache DB read failed: {e}")
+                entry = None
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._remember(key, entry[0], entry[1])
+                self.hits += 1
+                self.persistent_hits += 1
+                return entry[1]
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, text: str):
+        created_at = time.time()
+        self._remember(key, created_at, text)
+        if self.db_path:
+            try:
+                await asyncio.to_thread(self._db_set, key, created_at, text)
+            except sqlite3.Error as e:
+                logger.warning(f"Insight cache DB write failed: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._memory),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,34 +1,61 @@
 # FastAPI routes for OKX Screener AI bot API
-from fastapi import APIRouter
+import base64
+import json
+import os
+import time
+from typing import Iterable, Iterator, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from backend.services.price_comparator_service import PriceComparatorService
 from backend.ai.alpha_insight_service import AlphaInsightService
-from backend.services.price_history import PriceHistoryService
+from backend.services.price_history import PriceHistoryService, format_ts, to_epoch_ms
+from backend.services.downsample import lttb
+from backend.services.spread_analytics import SpreadAnalytics
+from backend.services.market_snapshot import SnapshotScheduler
+from backend.services.single_flight import SingleFlight
 
 router = APIRouter()
 
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "1000"))
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", "5000"))
+DOWNSAMPLE_OVERSAMPLE = 4
+
 price_service = PriceComparatorService()
 ai_service = AlphaInsightService()
 history_service = PriceHistoryService()
+snapshot_scheduler = SnapshotScheduler(price_service)
+spread_analytics = SpreadAnalytics(history_service)
+insight_flights = SingleFlight()
 
 @router.get("/spreads", summary="Get spreads for all supported tokens")
-async def get_spreads():
+async def get_spreads(response: Response):
+    """Spreads from the latest background market snapshot; its version and age are sent as headers."""
+    snapshot = await snapshot_scheduler.get()
+    response.headers["X-Snapshot-Version"] = str(snapshot.version)
+    response.headers["X-Snapshot-Age"] = f"{snapshot.age:.1f}"
     results = []
-    for symbol in price_service.tokens.keys():
-        try:
-            data = await price_service.compare(symbol)
-            if 'spread_pct' in data:
-                results.append({
-                    'symbol': symbol,
-                    'spread_pct': data['spread_pct'],
-                    'price_cex': data['price_cex'],
-                    'price_dex': data['price_dex']
-                })
-        except Exception:
-            continue
+    for data in snapshot.results:
+        if 'spread_pct' in data:
+            results.append({
+                'symbol': data['token'],
+                'spread_pct': data['spread_pct'],
+                'price_cex': data['price_cex'],
+                'price_dex': data['price_dex']
+            })
     return sorted(results, key=lambda x: abs(x['spread_pct']), reverse=True)
 
-@router.get("/insight/{symbol}", summary="Get AI insight for a token")
-async def get_insight(symbol: str):
+@router.get("/analytics", summary="Spread statistics per token")
+async def get_analytics(response: Response, symbol: Optional[str] = None):
+    """
+    Rolling mean/std, z-score and percentile of the current spread plus the mean-reversion
+    half-life for each token, computed once per market snapshot version.
+    """
+    snapshot = await snapshot_scheduler.get()
+    response.headers["X-Snapshot-Version"] = str(snapshot.version)
+    stats = await spread_analytics.for_snapshot(snapshot, [symbol] if symbol else None)
+    return {"snapshot_version": snapshot.version, "tokens": stats}
+
+async def _build_insight(symbol: str) -> dict:
     data = await price_service.compare(symbol)
     insight = await ai_service.get_insight(
         price_cex=data['price_cex'],
@@ -40,7 +67,92 @@ async def get_insight(symbol: str):
     )
     return {"symbol": symbol, "insight": insight}
 
-@router.get("/history/{symbol}", summary="Get price history for a token (last 100 points)")
-def get_history(symbol: str):
-    """Returns the latest 100 price history points for the given symbol."""
-    return history_service.get_history(symbol)
+@router.get("/insight/{symbol}", summary="Get AI insight for a token")
+async def get_insight(symbol: str):
+    # Concurrent requests for the same token share one comparison and one LLM call
+    return await insight_flights.do(("insight", symbol), lambda: _build_insight(symbol))
+
+def _parse_time(value: Optional[str], name: str) -> Optional[int]:
+    """Epoch milliseconds from an integer string or an ISO 8601 datetime (naive means UTC)."""
+    if value is None:
+        return None
+    try:
+        return int(value) if value.lstrip("-").isdigit() else to_epoch_ms(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid '{name}': expected epoch milliseconds or ISO 8601")
+
+def _encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["ts"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        ts, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(ts), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _stream_json_array(items: Iterable[dict]) -> Iterator[str]:
+    yield "["
+    for i, item in enumerate(items):
+        yield ("," if i else "") + json.dumps(item)
+    yield "]"
+
+@router.get("/history/{symbol}", summary="Get price history for a token")
+def get_history(
+    symbol: str,
+    from_: Optional[str] = Query(None, alias="from", description="Range start: epoch ms or ISO 8601"),
+    to: Optional[str] = Query(None, description="Range end: epoch ms or ISO 8601"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    limit: int = Query(100, ge=1, le=HISTORY_PAGE_MAX),
+    max_points: Optional[int] = Query(None, ge=3, le=HISTORY_MAX_POINTS),
+):
+    """
+    Price history for the given symbol from the hot and archived tiers, streamed as a JSON array.
+
+    Without ``max_points`` rows are returned newest first, ``limit`` per page; the
+    ``X-Next-Cursor`` header carries the cursor for the next page. With ``max_points``
+    the range (default: last 24 hours) is downsampled server-side with LTTB over the
+    spread, oldest first, and ``X-Resolution`` reports the source resolution.
+
+    Called without ``from``, ``to``, ``cursor`` and ``max_points`` it keeps the legacy
+    response: the latest ``limit`` rows with ``created_at`` and no ``ts``, not paginated.
+    """
+    if from_ is None and to is None and cursor is None and max_points is None:
+        return StreamingResponse(_stream_json_array(history_service.get_history(symbol, limit)),
+                                 media_type="application/json")
+
+    start = _parse_time(from_, "from")
+    end = _parse_time(to, "to")
+    if max_points is not None:
+        # Oversample from raw rows/rollups so LTTB has detail to choose from
+        series = history_service.get_series(symbol, start, end, max_points=max_points * DOWNSAMPLE_OVERSAMPLE)
+        points = [p for p in series["points"] if p["spread_close"] is not None]
+        keep = lttb([p["ts"] for p in points], [p["spread_close"] for p in points], max_points)
+        items = (
+            {
+                "ts": points[i]["ts"],
+                "timestamp": points[i]["timestamp"],
+                "spread_pct": points[i]["spread_close"],
+                "price_cex": points[i]["cex_close"],
+                "price_dex": points[i]["dex_close"],
+                "count": points[i]["count"],
+            }
+            for i in keep
+        )
+        return StreamingResponse(_stream_json_array(items), media_type="application/json",
+                                 headers={"X-Resolution": series["resolution"]})
+
+    end = int(time.time() * 1000) if end is None else end
+    page = history_service.get_page(symbol, start or 0, end, limit,
+                                    before=_decode_cursor(cursor) if cursor else None)
+    headers = {"X-Next-Cursor": _encode_cursor(page[-1])} if len(page) == limit else {}
+    items = (
+        {key: value for key, value in row.items() if key != "id"} | {"timestamp": format_ts(row["ts"])}
+        for row in page
+    )
+    return StreamingResponse(_stream_json_array(items), media_type="application/json", headers=headers)
+
+@router.get("/history-writer/stats", summary="Price history writer queue depth and flush latency")
+def get_history_writer_stats():
+    return price_service.price_history_service.writer.stats()
@@ -1,5 +1,5 @@
-import httpx
 from typing import Dict, Any
+from backend.clients.transport import get_http_client
 
 class JupiterDEXClient:
     BASE_URL = "https://quote-api.jup.ag"
@@ -14,7 +14,6 @@ class JupiterDEXClient:
         }
         if swap_mode:
             params["swapMode"] = swap_mode
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            return resp.json()
+        resp = await get_http_client(url).get(url, params=params, timeout=10.0)
+        resp.raise_for_status()
+        return resp.json()
@@ -1,28 +1,34 @@
-import httpx
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from backend.clients.transport import get_http_client
+from backend.services.cache import MarketDataCache, market_cache
+from backend.services.okx import CANDLE_TTLS
 
 class OKXCEXClient:
     BASE_URL = "https://www.okx.com"
 
+    def __init__(self, cache: Optional[MarketDataCache] = None):
+        self.cache = cache or market_cache
+
     async def get_ticker(self, symbol: str) -> Dict[str, Any]:
         url = f"{self.BASE_URL}/api/v5/market/ticker"
         params = {"instId": symbol}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            return resp.json()
+        resp = await get_http_client(url).get(url, params=params, timeout=10.0)
+        resp.raise_for_status()
+        return resp.json()
 
     async def get_candles(self, symbol: str, bar: str = "5m", limit: int = 100) -> Dict[str, Any]:
         url = f"{self.BASE_URL}/api/v5/market/candles"
         params = {"instId": symbol, "bar": bar, "limit": str(limit)}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, params=params)
+
+        async def fetch():
+            resp = await get_http_client(url).get(url, params=params, timeout=10.0)
             resp.raise_for_status()
             return resp.json()
 
+        return await self.cache.get_or_fetch(("okx:candles", symbol, bar, limit), fetch, ttl=CANDLE_TTLS.get(bar, 30))
+
     async def get_system_time(self) -> Dict[str, Any]:
         url = f"{self.BASE_URL}/api/v5/public/time"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            return resp.json()
+        resp = await get_http_client(url).get(url, timeout=10.0)
+        resp.raise_for_status()
+        return resp.json()
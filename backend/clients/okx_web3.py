@@ -1,6 +1,7 @@
 import httpx
 from typing import Dict, Any
 import logging
+from backend.clients.transport import get_http_client
 
 class OKXWeb3Client:
     BASE_URL = "https://www.okx.com/web3/api/v1"
@@ -10,10 +11,9 @@ class OKXWeb3Client:
         payload = {"chainId": str(chain_id), "tokenAddress": token_address}
         headers = {"Content-Type": "application/json"}
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(url, json=payload, headers=headers)
-                resp.raise_for_status()
-                return resp.json()
+            resp = await get_http_client(url).post(url, json=payload, headers=headers, timeout=10.0)
+            resp.raise_for_status()
+            return resp.json()
         except httpx.HTTPStatusError as e:
             logging.error(f"OKX Web3 token price error: {e.response.status_code} {e.response.text}")
             raise
@@ -0,0 +1,141 @@
+"""
+Shared pooled HTTP transport for all upstream clients.
+
+Every upstream client (OKX, Jupiter, Helius) borrows an ``httpx.AsyncClient``
+from this module instead of opening a new one per request, so TCP/TLS
+connections are kept alive and reused across tickers, quotes and metadata calls.
+One pool is kept per origin (scheme + host + port).
+
+Environment variables:
+    HTTP_MAX_CONNECTIONS: max open connections per host (default 100)
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: max idle keep-alive connections per host (default 20)
+    HTTP_KEEPALIVE_EXPIRY: seconds an idle connection is kept open (default 30)
+    HTTP_TIMEOUT: default request timeout in seconds (default 10)
+    HTTP_HTTP2: enable HTTP/2 when the ``h2`` package is installed (default false)
+
+Example usage:
+    from backend.clients.transport import get_http_client
+
+    client = get_http_client("https://www.okx.com")
+    resp = await client.get("https://www.okx.com/api/v5/public/time")
+
+Lifecycle:
+    FastAPI and the Telegram bot call ``open_transport()`` on startup and
+    ``close_transport()`` on shutdown.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPTransport:
+    """
+    Keep-alive connection pools per upstream host.
+
+    Pools are bound to the event loop they were created on; if the running loop
+    changes (e.g. between test cases) fresh pools are created transparently.
+    """
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, timeout: float = 10.0, http2: bool = False):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        if http2 and not _http2_available():
+            logger.warning("HTTP_HTTP2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "HTTPTransport":
+        return cls(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+            timeout=float(os.getenv("HTTP_TIMEOUT", "10")),
+            http2=_env_bool("HTTP_HTTP2"),
+        )
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        if not parts.scheme or not parts.netloc:
+            raise ValueError(f"Absolute URL required, got: {url}")
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def _bind_loop(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not self._loop:
+            # Clients from another (possibly closed) loop cannot be reused or closed here
+            self._clients = {}
+            self._loop = loop
+
+    def client(self, url: str) -> httpx.AsyncClient:
+        """Return the pooled client for the origin of ``url``."""
+        self._bind_loop()
+        origin = self._origin(url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+            self._clients[origin] = client
+            logger.debug(f"Opened HTTP pool for {origin}")
+        return client
+
+    def stats(self) -> Dict[str, int]:
+        return {"pools": len(self._clients)}
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for origin, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP pool for {origin}: {e}")
+
+
+transport = HTTPTransport.from_env()
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    """Shortcut for ``transport.client(url)``."""
+    return transport.client(url)
+
+
+async def open_transport():
+    """Startup hook: bind the shared transport to the running loop."""
+    transport._bind_loop()
+    logger.info(f"HTTP transport ready (http2={transport.http2}, limits={transport.limits})")
+
+
+async def close_transport():
+    """Shutdown hook: close all pooled connections."""
+    await transport.aclose()
+    logger.info("HTTP transport closed")
@@ -0,0 +1 @@
+# Database schema and migrations package
@@ -0,0 +1,272 @@
+"""
+Versioned SQLite schema migrations.
+
+The schema version is stored in ``PRAGMA user_version``. Each migration runs in
+its own ``BEGIN IMMEDIATE`` transaction together with the version bump, so a
+failed migration leaves the database at the previous version and concurrent
+processes (API and bot) never apply the same step twice.
+
+Versions:
+    1: baseline schema (tokens, solana_tokens, signals, users, token_analysis,
+       price_history with text timestamps)
+    2: ``symbols`` dictionary table; ``price_history`` rebuilt with ``symbol_id``
+       and epoch-millisecond ``ts``, plus a covering index on (symbol_id, ts DESC)
+    3: ``price_rollups`` (1m/5m/1h OHLC aggregates), backfilled from raw rows
+    4: bot settings columns on ``users`` (flags, spread_threshold, tracked_mask bitmask by symbol id)
+
+Example usage:
+    from backend.db.migrations import migrate
+    version = migrate("backend/db/mipilot.db")
+"""
+import logging
+import sqlite3
+from typing import Callable, List, Optional, Tuple, Union
+
+from backend.db.rollups import apply_rollups
+
+logger = logging.getLogger(__name__)
+
+
+def _v1_baseline(conn: sqlite3.Connection):
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            chain TEXT NOT NULL,
+            contract_address TEXT,
+            decimals INTEGER,
+            last_price REAL,
+            market_cap REAL,
+            volume_24h REAL,
+            change_24h REAL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS solana_tokens (
+            mint_address TEXT PRIMARY KEY,
+            symbol TEXT NOT NULL,
+            name TEXT NOT NULL,
+            decimals INTEGER,
+            holders INTEGER,
+            supply REAL,
+            last_price REAL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS signals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            direction TEXT CHECK(direction IN ('BUY', 'SELL', 'HOLD')) NOT NULL,
+            entry_price REAL,
+            target_price REAL,
+            stop_loss REAL,
+            timeframe TEXT,
+            confidence REAL,
+            reasoning TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            is_admin BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS token_analysis (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            sentiment TEXT CHECK(sentiment IN ('BULLISH', 'BEARISH', 'NEUTRAL')) NOT NULL,
+            risk_level TEXT CHECK(risk_level IN ('LOW', 'MEDIUM', 'HIGH', 'VERY HIGH')) NOT NULL,
+            summary TEXT,
+            pros TEXT,
+            cons TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            price_cex REAL,
+            price_dex REAL,
+            spread_pct REAL,
+            volume_cex FLOAT,
+            volume_dex FLOAT,
+            source_dex TEXT,
+            is_valid BOOLEAN DEFAULT TRUE,
+            error_message TEXT,
+            timestamp TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CHECK (
+                (is_valid = FALSE) OR
+                (is_valid = TRUE AND price_cex IS NOT NULL AND price_dex IS NOT NULL AND spread_pct IS NOT NULL)
+            )
+        )
+        """,
+    ]
+    for statement in statements:
+        conn.execute(statement)
+
+
+def _v2_symbol_ids_and_epoch_ts(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE symbols (
+            id INTEGER PRIMARY KEY,
+            symbol TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    conn.execute("INSERT INTO symbols (symbol) SELECT DISTINCT symbol FROM price_history ORDER BY symbol")
+    conn.execute(
+        """
+        CREATE TABLE price_history_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol_id INTEGER NOT NULL REFERENCES symbols (id),
+            ts INTEGER NOT NULL,  -- Unix epoch milliseconds, UTC
+            price_cex REAL,
+            price_dex REAL,
+            spread_pct REAL,
+            volume_cex REAL,
+            volume_dex REAL,
+            source_dex TEXT,
+            is_valid INTEGER NOT NULL DEFAULT 1,
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CHECK (
+                (is_valid = 0) OR
+                (is_valid = 1 AND price_cex IS NOT NULL AND price_dex IS NOT NULL AND spread_pct IS NOT NULL)
+            )
+        )
+        """
+    )
+    # Text timestamps ("YYYY-MM-DD HH:MM:SS" or ISO with "T"/fractions) are UTC; rows saved
+    # without one fall back to created_at
+    conn.execute(
+        """
+        INSERT INTO price_history_v2 (id, symbol_id, ts, price_cex, price_dex, spread_pct, volume_cex, volume_dex,
+                                      source_dex, is_valid, error_message, created_at)
+        SELECT p.id, s.id,
+               CAST(ROUND((COALESCE(julianday(NULLIF(p.timestamp, '')), julianday(p.created_at), 2440587.5)
+                           - 2440587.5) * 86400000) AS INTEGER),
+               p.price_cex, p.price_dex, p.spread_pct, p.volume_cex, p.volume_dex,
+               p.source_dex, CASE WHEN p.is_valid THEN 1 ELSE 0 END, p.error_message, p.created_at
+        FROM price_history p JOIN symbols s ON s.symbol = p.symbol
+        """
+    )
+    conn.execute("DROP TABLE price_history")
+    conn.execute("ALTER TABLE price_history_v2 RENAME TO price_history")
+    # Covers chart reads (latest points of one symbol) without touching the table
+    conn.execute(
+        """
+        CREATE INDEX idx_price_history_symbol_ts
+        ON price_history (symbol_id, ts DESC, spread_pct, price_cex, price_dex, is_valid)
+        """
+    )
+
+
+def _v3_rollups(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE price_rollups (
+            resolution INTEGER NOT NULL,  -- bucket width in seconds
+            symbol_id INTEGER NOT NULL REFERENCES symbols (id),
+            bucket_ts INTEGER NOT NULL,  -- bucket start, epoch milliseconds
+            open_ts INTEGER NOT NULL,
+            close_ts INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            spread_open REAL, spread_high REAL, spread_low REAL, spread_close REAL,
+            cex_open REAL, cex_high REAL, cex_low REAL, cex_close REAL,
+            dex_open REAL, dex_high REAL, dex_low REAL, dex_close REAL,
+            PRIMARY KEY (resolution, symbol_id, bucket_ts)
+        ) WITHOUT ROWID
+        """
+    )
+    cur = conn.execute(
+        """
+        SELECT symbol_id, ts, price_cex, price_dex, spread_pct, volume_cex, volume_dex, source_dex, is_valid
+        FROM price_history ORDER BY symbol_id, ts
+        """
+    )
+    while True:
+        rows = cur.fetchmany(10000)
+        if not rows:
+            break
+        apply_rollups(conn, rows)
+
+
+def _v4_user_settings(conn: sqlite3.Connection):
+    # flags: bit 0 = notifications enabled, bits 1-2 = trading mode (0 safe, 1 degen)
+    conn.execute("ALTER TABLE users ADD COLUMN flags INTEGER NOT NULL DEFAULT 1")
+    conn.execute("ALTER TABLE users ADD COLUMN spread_threshold REAL NOT NULL DEFAULT 1.0")
+    # Little-endian bitmask with bit (symbol_id - 1) set per tracked token; NULL tracks every token
+    conn.execute("ALTER TABLE users ADD COLUMN tracked_mask BLOB")
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "baseline schema", _v1_baseline),
+    (2, "symbol ids and epoch-ms timestamps for price_history", _v2_symbol_ids_and_epoch_ts),
+    (3, "1m/5m/1h price rollups", _v3_rollups),
+    (4, "bot user settings", _v4_user_settings),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _apply(conn: sqlite3.Connection, target: int) -> int:
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None  # Manage transactions explicitly so DDL is part of them
+    try:
+        for version, description, step in MIGRATIONS:
+            if version > target:
+                break
+            if current_version(conn) >= version:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-check under the write lock: another process may have migrated meanwhile
+                if current_version(conn) >= version:
+                    conn.execute("ROLLBACK")
+                    continue
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            logger.info(f"Applied database migration {version}: {description}")
+        return current_version(conn)
+    finally:
+        conn.isolation_level = previous_isolation
+
+
+def migrate(db: Union[str, sqlite3.Connection], target: Optional[int] = None) -> int:
+    """
+    Bring the database up to ``target`` (default: latest) and return the resulting version.
+    Args:
+        db: database path or an open connection (left open)
+        target: schema version to migrate to
+    """
+    target = LATEST_VERSION if target is None else target
+    if isinstance(db, sqlite3.Connection):
+        return _apply(db, target)
+    conn = sqlite3.connect(db)
+    try:
+        return _apply(conn, target)
+    finally:
+        conn.close()
@@ -0,0 +1,157 @@
+"""
+Price history rollups.
+
+1-minute, 5-minute and 1-hour aggregates per token are kept in ``price_rollups``
+and updated incrementally in the same transaction that writes raw rows. Every
+bucket stores OHLC for the spread, CEX price and DEX price (high/low are the
+bucket max/min) plus the sample count. Open/close are tracked together with the
+timestamps they came from, so batches arriving out of order still merge
+correctly.
+
+Raw ``price_history`` rows older than the retention window are pruned; rollups
+are kept, so long ranges are served from aggregates.
+
+Environment variables:
+    HISTORY_RAW_RETENTION_HOURS: hours raw rows are kept (default 168)
+
+Example usage:
+    resolution = pick_resolution(start_ms, end_ms, max_points=500)
+    points = query_rollups(conn, symbol_id, resolution, start_ms, end_ms)
+"""
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+HISTORY_RAW_RETENTION_HOURS = float(os.getenv("HISTORY_RAW_RETENTION_HOURS", "168"))
+
+# Resolution name -> bucket width in milliseconds, finest first
+RESOLUTIONS: Dict[str, int] = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "1h": 3_600_000,
+}
+
+SERIES = ("spread", "cex", "dex")
+
+UPSERT_SQL = """
+    INSERT INTO price_rollups (
+        resolution, symbol_id, bucket_ts, open_ts, close_ts, count,
+        spread_open, spread_high, spread_low, spread_close,
+        cex_open, cex_high, cex_low, cex_close,
+        dex_open, dex_high, dex_low, dex_close
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (resolution, symbol_id, bucket_ts) DO UPDATE SET
+        count = count + excluded.count,
+        spread_open = CASE WHEN excluded.open_ts < open_ts THEN excluded.spread_open ELSE spread_open END,
+        cex_open = CASE WHEN excluded.open_ts < open_ts THEN excluded.cex_open ELSE cex_open END,
+        dex_open = CASE WHEN excluded.open_ts < open_ts THEN excluded.dex_open ELSE dex_open END,
+        spread_close = CASE WHEN excluded.close_ts >= close_ts THEN excluded.spread_close ELSE spread_close END,
+        cex_close = CASE WHEN excluded.close_ts >= close_ts THEN excluded.cex_close ELSE cex_close END,
+        dex_close = CASE WHEN excluded.close_ts >= close_ts THEN excluded.dex_close ELSE dex_close END,
+        spread_high = MAX(spread_high, excluded.spread_high),
+        spread_low = MIN(spread_low, excluded.spread_low),
+        cex_high = MAX(cex_high, excluded.cex_high),
+        cex_low = MIN(cex_low, excluded.cex_low),
+        dex_high = MAX(dex_high, excluded.dex_high),
+        dex_low = MIN(dex_low, excluded.dex_low),
+        open_ts = MIN(open_ts, excluded.open_ts),
+        close_ts = MAX(close_ts, excluded.close_ts)
+"""
+
+# (symbol_id, ts, price_cex, price_dex, spread_pct)
+Sample = Tuple[int, int, float, float, float]
+
+
+def _aggregate(samples: Iterable[Sample]) -> List[Tuple[Any, ...]]:
+    """Pre-aggregate a batch per (resolution, symbol, bucket) into UPSERT parameter rows."""
+    buckets: Dict[Tuple[int, int, int], List[Any]] = {}
+    for symbol_id, ts, cex, dex, spread in sorted(samples, key=lambda s: s[1]):
+        values = (spread, cex, dex)
+        for width in RESOLUTIONS.values():
+            key = (width // 1000, symbol_id, ts - ts % width)
+            bucket = buckets.get(key)
+            if bucket is None:
+                # [open_ts, close_ts, count, (o, h, l, c) per series...]
+                buckets[key] = [ts, ts, 1] + [[v, v, v, v] for v in values]
+                continue
+            bucket[1] = ts
+            bucket[2] += 1
+            for ohlc, v in zip(bucket[3:], values):
+                ohlc[1] = max(ohlc[1], v)
+                ohlc[2] = min(ohlc[2], v)
+                ohlc[3] = v
+    return [
+        key + (bucket[0], bucket[1], bucket[2]) + tuple(bucket[3]) + tuple(bucket[4]) + tuple(bucket[5])
+        for key, bucket in buckets.items()
+    ]
+
+
+def apply_rollups(conn: sqlite3.Connection, rows: Iterable[Sequence[Any]]):
+    """
+    Merge raw rows into all rollup resolutions (call inside the write transaction).
+    Rows use the price_history column order (symbol_id, ts, price_cex, price_dex, spread_pct, ..., is_valid, ...);
+    invalid rows are skipped.
+    """
+    samples = [
+        (row[0], row[1], row[2], row[3], row[4])
+        for row in rows
+        if row[8] and row[2] is not None and row[3] is not None and row[4] is not None
+    ]
+    if samples:
+        conn.executemany(UPSERT_SQL, _aggregate(samples))
+
+
+def prune_raw(conn: sqlite3.Connection, before_ms: int, chunk: int = 5000) -> int:
+    """Delete raw rows older than ``before_ms`` symbol by symbol via the (symbol_id, ts) index."""
+    deleted = 0
+    symbol_ids = [row[0] for row in conn.execute("SELECT id FROM symbols")]
+    for symbol_id in symbol_ids:
+        while True:
+            with conn:
+                cur = conn.execute(
+                    """
+                    DELETE FROM price_history WHERE id IN (
+                        SELECT id FROM price_history WHERE symbol_id = ? AND ts < ? LIMIT ?
+                    )
+                    """,
+                    (symbol_id, before_ms, chunk),
+                )
+            deleted += cur.rowcount
+            if cur.rowcount < chunk:
+                break
+    return deleted
+
+
+def pick_resolution(start_ms: int, end_ms: int, max_points: int) -> str:
+    """Finest rollup resolution whose bucket count over the range does not exceed ``max_points``."""
+    span = max(0, end_ms - start_ms)
+    for name, width in RESOLUTIONS.items():
+        if span // width + 1 <= max_points:
+            return name
+    return list(RESOLUTIONS)[-1]
+
+
+def query_rollups(conn: sqlite3.Connection, symbol_id: int, resolution: str,
+                  start_ms: int, end_ms: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Rollup buckets of one symbol overlapping [start_ms, end_ms], oldest first; with ``limit`` the most recent ones."""
+    width = RESOLUTIONS[resolution]
+    cur = conn.execute(
+        f"""
+        SELECT bucket_ts, count, {", ".join(f"{s}_open, {s}_high, {s}_low, {s}_close" for s in SERIES)}
+        FROM price_rollups
+        WHERE resolution = ? AND symbol_id = ? AND bucket_ts BETWEEN ? AND ?
+        ORDER BY bucket_ts {"DESC LIMIT ?" if limit else ""}
+        """,
+        (width // 1000, symbol_id, start_ms - start_ms % width, end_ms) + ((limit,) if limit else ()),
+    )
+    rows = cur.fetchall()
+    if limit:
+        rows.reverse()
+    points = []
+    for row in rows:
+        point = {"ts": row[0], "count": row[1]}
+        for i, series in enumerate(SERIES):
+            o, h, l, c = row[2 + 4 * i: 6 + 4 * i]
+            point.update({f"{series}_open": o, f"{series}_high": h, f"{series}_low": l, f"{series}_close": c})
+        points.append(point)
+    return points
@@ -10,7 +10,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from fastapi import FastAPI
-from backend.api.routes import router as api_router
+from backend.api.routes import router as api_router, price_service, snapshot_scheduler
+from backend.clients.transport import open_transport, close_transport
+from backend.services.okx_stream import OKXTickerStream, OKX_WS_ENABLED
 
 # Импортируем наш сервис Helius
 from backend.services.helius import HeliusClient
@@ -27,6 +29,29 @@ app = FastAPI(
 
 app.include_router(api_router, prefix="/api")
 
+# Поток тикеров OKX через WebSocket (опционально, OKX_WS_ENABLED)
+okx_stream = OKXTickerStream(price_service.tokens) if OKX_WS_ENABLED else None
+
+# Общий пул HTTP-соединений для всех upstream-клиентов
+@app.on_event("startup")
+async def startup():
+    await open_transport()
+    if okx_stream:
+        price_service.comparator.price_book = okx_stream.book
+        await okx_stream.start()
+    # Фоновая пакетная запись истории цен (не блокирует event loop)
+    await price_service.price_history_service.start()
+    # Фоновое сканирование рынка для /api/spreads
+    await snapshot_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await snapshot_scheduler.stop()
+    await price_service.price_history_service.stop()
+    if okx_stream:
+        await okx_stream.stop()
+    await close_transport()
+
 # Добавляем CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,124 @@
+"""
+Spread alert engine.
+
+Subscribers are indexed per token in a list of ``(threshold, user_id)`` kept
+sorted, so evaluating a spread is a binary search plus a slice of the users that
+actually fire, independent of the total number of subscribers.
+
+Hysteresis is tracked with one "fired boundary" per token instead of per-user
+state: every subscriber whose threshold is at or below the boundary has already
+been alerted. A spread ``s`` (absolute, in percent) first re-arms everyone with
+a threshold above ``s + ALERT_HYSTERESIS`` (boundary = min(boundary, s + h)) and
+then fires everyone with a threshold in (boundary, s] (boundary = max(boundary, s)).
+A spread hovering around a threshold therefore alerts once and only again after
+falling ``ALERT_HYSTERESIS`` points below it. On top of that each user gets at
+most one alert per token per ``ALERT_COOLDOWN`` seconds; alerts inside the
+cooldown are dropped, while tokens crossing at the same time alert
+independently. A subscriber added with a threshold below the current boundary
+counts as already alerted until the spread re-arms it.
+
+Environment variables:
+    ALERT_HYSTERESIS: spread points below a threshold needed to re-arm it (default 0.2)
+    ALERT_COOLDOWN: minimum seconds between alerts to the same user for the same token (default 300)
+
+Example usage:
+    engine = AlertEngine()
+    engine.subscribe(user_id, 2.0, {"WIF", "JUP"})
+    scheduler.subscribe(lambda snapshot: deliver(engine.evaluate_snapshot(snapshot)))
+"""
+import logging
+import math
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Tuple
+
+logger = logging.getLogger(__name__)
+
+ALERT_HYSTERESIS = float(os.getenv("ALERT_HYSTERESIS", "0.2"))
+ALERT_COOLDOWN = float(os.getenv("ALERT_COOLDOWN", "300"))
+
+
+@dataclass(frozen=True)
+class Alert:
+    user_id: int
+    token: str
+    spread: float
+    threshold: float
+    data: Mapping[str, Any]
+
+
+class AlertEngine:
+    def __init__(self, hysteresis: float = ALERT_HYSTERESIS, cooldown: float = ALERT_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.hysteresis = hysteresis
+        self.cooldown = cooldown
+        self.clock = clock
+        self._index: Dict[str, List[Tuple[float, int]]] = {}  # token -> sorted (threshold, user_id)
+        self._boundary: Dict[str, float] = {}  # token -> fired boundary
+        self._subscriptions: Dict[int, Tuple[float, Tuple[str, ...]]] = {}
+        self._last_alert: Dict[Tuple[int, str], float] = {}  # (user_id, token) -> last alert
+        self.fired = 0
+        self.suppressed = 0
+
+    def subscribe(self, user_id: int, threshold: float, tokens: Iterable[str]):
+        """Alert ``user_id`` when the absolute spread of any of ``tokens`` reaches ``threshold`` percent."""
+        subscription = (float(threshold), tuple(sorted({t.upper() for t in tokens})))
+        if self._subscriptions.get(user_id) == subscription:
+            return
+        self.unsubscribe(user_id)
+        self._subscriptions[user_id] = subscription
+        for token in subscription[1]:
+            insort(self._index.setdefault(token, []), (subscription[0], user_id))
+
+    def unsubscribe(self, user_id: int):
+        subscription = self._subscriptions.pop(user_id, None)
+        if subscription is None:
+            return
+        key = (subscription[0], user_id)
+        for token in subscription[1]:
+            entries = self._index[token]
+            position = bisect_left(entries, key)
+            if position < len(entries) and entries[position] == key:
+                del entries[position]
+
+    def evaluate(self, token: str, spread: float) -> List[Tuple[int, float]]:
+        """(user_id, threshold) of the subscribers of ``token`` that the spread newly alerts."""
+        entries = self._index.get(token)
+        if not entries:
+            return []
+        level = abs(spread)
+        boundary = min(self._boundary.get(token, -math.inf), level + self.hysteresis)
+        fired = []
+        if level > boundary:
+            lo = bisect_right(entries, (boundary, math.inf))
+            hi = bisect_right(entries, (level, math.inf))
+            fired = [(user_id, threshold) for threshold, user_id in entries[lo:hi]]
+            boundary = level
+        self._boundary[token] = boundary
+        return fired
+
+    def evaluate_snapshot(self, snapshot) -> List[Alert]:
+        """Alerts for every valid result of a market snapshot, after the per-user, per-token cooldown."""
+        alerts = []
+        now = self.clock()
+        for data in snapshot.valid():
+            spread = data.get("spread_pct")
+            if spread is None:
+                continue
+            for user_id, threshold in self.evaluate(data["token"], spread):
+                key = (user_id, data["token"])
+                last = self._last_alert.get(key)
+                if last is not None and now - last < self.cooldown:
+                    self.suppressed += 1
+                    continue
+                self._last_alert[key] = now
+                alerts.append(Alert(user_id, data["token"], spread, threshold, data))
+        self.fired += len(alerts)
+        if alerts:
+            logger.info(f"Snapshot v{snapshot.version}: {len(alerts)} spread alerts")
+        return alerts
+
+    def stats(self) -> Dict[str, int]:
+        return {"subscribers": len(self._subscriptions), "fired": self.fired, "suppressed": self.suppressed}
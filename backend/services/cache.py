@@ -0,0 +1,148 @@
+"""
+Stale-while-revalidate market data cache.
+
+In-memory cache for slowly changing upstream data (Jupiter token info, OKX
+candles, OKX Web3 token and pool lists). Every key has its own TTL; once an
+entry is older than its TTL it is still served for ``stale_ttl`` more seconds
+while a single background task refreshes it. The cache is size-bounded with
+LRU eviction, and concurrent misses for the same key share one fetch.
+
+Environment variables:
+    MARKET_CACHE_SIZE: max number of cached keys (default 1024)
+
+Example usage:
+    from backend.services.cache import market_cache
+
+    async def fetch():
+        return await client.get_tokens()
+
+    tokens = await market_cache.get_or_fetch(("okx:tokens", 101), fetch, ttl=3600)
+    print(market_cache.stats())
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from backend.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MARKET_CACHE_SIZE = int(os.getenv("MARKET_CACHE_SIZE", "1024"))
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "ttl", "stale_ttl")
+
+    def __init__(self, value: Any, ttl: float, stale_ttl: float):
+        self.value = value
+        self.stored_at = time.monotonic()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+
+class MarketDataCache:
+    def __init__(self, maxsize: int = MARKET_CACHE_SIZE, default_ttl: float = 60.0,
+                 default_stale_ttl: Optional[float] = None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        # By default a stale entry may be served for as long again as its TTL
+        self.default_stale_ttl = default_stale_ttl
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._flights = SingleFlight(fresh_for=0)
+        self._refreshing: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, stale_ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        if stale_ttl is None:
+            stale_ttl = self.default_stale_ttl if self.default_stale_ttl is not None else ttl
+        self._entries[key] = _Entry(value, ttl, stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                     ttl: Optional[float], stale_ttl: Optional[float]) -> Any:
+        """Run one fetch per key; concurrent callers share it through single-flight."""
+        async def run():
+            value = await fetch()
+            self.set(key, value, ttl, stale_ttl)
+            return value
+
+        return await self._flights.do(key, run, fresh_for=0)
+
+    async def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                       ttl: Optional[float], stale_ttl: Optional[float]):
+        try:
+            await self._fetch(key, fetch, ttl, stale_ttl)
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.warning(f"Background refresh failed for {key!r}: {e}")
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                           ttl: Optional[float] = None, stale_ttl: Optional[float] = None) -> Any:
+        """
+        Return the cached value for ``key`` or fetch it.
+        Args:
+            key: hashable cache key, e.g. ("jupiter:token_info", mint)
+            fetch: coroutine function producing a fresh value; exceptions are not cached
+            ttl: seconds the value is fresh
+            stale_ttl: extra seconds a stale value is served while refreshing in the background
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = entry.age
+            if age <= entry.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age <= entry.ttl + entry.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._flights:
+                    task = asyncio.create_task(self._refresh(key, fetch, ttl, stale_ttl))
+                    self._refreshing.add(task)
+                    task.add_done_callback(self._refreshing.discard)
+                return entry.value
+            self.invalidate(key)
+        self.misses += 1
+        return await self._fetch(key, fetch, ttl, stale_ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refresh_errors": self.refresh_errors,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+
+market_cache = MarketDataCache()
@@ -0,0 +1,162 @@
+"""
+Chart rendering service.
+
+Two chart types are available: the spread history line chart and a market chart
+of OKX candlesticks with volume and our recorded CEX/DEX spread overlaid.
+
+Charts are drawn with Matplotlib's object-oriented API on the Agg canvas (no
+pyplot global state) inside a process pool, so rendering never blocks the event
+loop and concurrent renders do not share figures. PNGs are produced in memory
+and kept in an LRU cache keyed by (symbol, chart type, data version); concurrent
+requests for the same key share one render.
+
+Environment variables:
+    CHART_WORKERS: render processes (default 2)
+    CHART_CACHE_SIZE: cached PNGs (default 128)
+
+Example usage:
+    renderer = ChartRenderer()
+    png = await renderer.render("spread_history", "WIF", data_version, times, spreads)
+    await renderer.close()
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+from backend.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "128"))
+
+
+def render_spread_history(symbol: str, times: Sequence[str], spreads: Sequence[float]) -> bytes:
+    """Spread history line chart as PNG bytes."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(6, 3))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(times, spreads, marker='o')
+    ax.set_title(f"Spread history for {symbol}")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Spread (%)")
+    ax.tick_params(axis="x", labelrotation=45, labelsize=8)
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def render_candles(symbol: str, bar: str, ts: Sequence[int], opens: Sequence[float], highs: Sequence[float],
+                   lows: Sequence[float], closes: Sequence[float], volumes: Sequence[float],
+                   spread_ts: Sequence[int] = (), spreads: Sequence[float] = ()) -> bytes:
+    """Candlesticks with a volume panel and the spread on a secondary axis, as PNG bytes (timestamps in epoch ms)."""
+    import numpy as np
+    from matplotlib import dates as mdates
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    # Matplotlib date numbers are days since the Unix epoch
+    x = np.asarray(ts, dtype=np.float64) / 86_400_000
+    o, h, l, c = (np.asarray(v, dtype=np.float64) for v in (opens, highs, lows, closes))
+    width = float(np.median(np.diff(x))) * 0.7 if len(x) > 1 else 1 / 1440
+    colors = np.where(c >= o, "tab:green", "tab:red")
+
+    fig = Figure(figsize=(8, 5))
+    FigureCanvasAgg(fig)
+    price_ax, volume_ax = fig.subplots(2, 1, sharex=True, gridspec_kw={"height_ratios": (3, 1)})
+    price_ax.vlines(x, l, h, colors=colors, linewidth=0.8)
+    # Doji candles still get a visible body
+    bodies = np.maximum(np.abs(c - o), (h.max() - l.min()) * 0.001)
+    price_ax.bar(x, bodies, width, bottom=np.minimum(o, c), color=colors)
+    price_ax.set_title(f"{symbol} {bar}")
+    price_ax.set_ylabel("Price (USDC)")
+
+    if len(spreads):
+        spread_ax = price_ax.twinx()
+        spread_ax.plot(np.asarray(spread_ts, dtype=np.float64) / 86_400_000, spreads,
+                       color="tab:orange", linewidth=1, label="CEX/DEX spread")
+        spread_ax.axhline(0, color="tab:orange", linewidth=0.5, linestyle="--")
+        spread_ax.set_ylabel("Spread (%)")
+        spread_ax.legend(loc="upper left", fontsize=8)
+
+    volume_ax.bar(x, volumes, width, color=colors, alpha=0.6)
+    volume_ax.set_ylabel("Volume")
+    volume_ax.xaxis.set_major_formatter(mdates.DateFormatter("%m-%d %H:%M"))
+    volume_ax.tick_params(axis="x", labelrotation=45, labelsize=8)
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+# Chart type -> module-level render function (must be picklable for the process pool)
+RENDERERS: Dict[str, Callable[..., bytes]] = {
+    "spread_history": render_spread_history,
+    "candles": render_candles,
+}
+
+
+class ChartRenderer:
+    def __init__(self, max_workers: int = CHART_WORKERS, cache_size: int = CHART_CACHE_SIZE):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str, Hashable], bytes]" = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.flights = SingleFlight(fresh_for=0)
+        self.hits = 0
+        self.renders = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned workers do not inherit the bot's threads, sockets or event loop
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _remember(self, key: Tuple[str, str, Hashable], png: bytes):
+        self._cache[key] = png
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def render(self, kind: str, symbol: str, data_version: Hashable, *args: Any) -> bytes:
+        """
+        PNG for a chart, from the cache or rendered in the process pool.
+        Args:
+            kind: chart type, a key of RENDERERS
+            symbol: token symbol
+            data_version: changes whenever the underlying data changes
+            args: positional arguments for the render function
+        """
+        key = (symbol, kind, data_version)
+        png = self._cache.get(key)
+        if png is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return png
+
+        async def run() -> bytes:
+            self.renders += 1
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor(), RENDERERS[kind], symbol, *args)
+            self._remember(key, result)
+            return result
+
+        return await self.flights.do(key, run)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._cache), "hits": self.hits, "renders": self.renders}
+
+    async def close(self):
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.shutdown, True)
@@ -0,0 +1,43 @@
+"""
+Server-side downsampling for time series.
+
+``lttb`` implements Largest-Triangle-Three-Buckets: it keeps the first and last
+points and, for every bucket in between, the point forming the largest triangle
+with the previously kept point and the average of the next bucket. The visual
+shape (spikes included) survives with far fewer points than the input.
+
+Example usage:
+    keep = lttb(ts, spreads, 500)
+    points = [points[i] for i in keep]
+"""
+from typing import Sequence
+
+import numpy as np
+
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int) -> np.ndarray:
+    """Indices of at most ``threshold`` points chosen by LTTB (x must be sorted ascending)."""
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        raise ValueError("threshold must be at least 3")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Interior points are split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+        else:
+            next_lo, next_hi = n - 1, n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
@@ -39,6 +39,10 @@ import os
 import httpx
 from typing import Dict, Any, Optional
 from typing import TypedDict
+from backend.clients.transport import get_http_client
+from backend.services.cache import MarketDataCache, market_cache
+
+TOKEN_METADATA_TTL = 24 * 3600  # Token metadata rarely changes
 
 class TokenMetadata(TypedDict, total=False):
     name: str
@@ -51,7 +55,8 @@ class HeliusClient:
     Minimal async client for fetching token metadata via Helius API.
     Documentation: https://www.helius.dev/docs/api-reference/endpoints/token-metadata
     """
-    def __init__(self, network: str = "mainnet"):
+    def __init__(self, network: str = "mainnet", cache: Optional[MarketDataCache] = None):
+        self.cache = cache or market_cache
         self.api_key = os.getenv("HELIUS_API_KEY")
         if not self.api_key:
             raise ValueError("HELIUS_API_KEY is not set in environment variables")
@@ -73,54 +78,56 @@ class HeliusClient:
         url = f"{self.base_url}/v0/token-metadata"
         params = {"api-key": self.api_key}
         json_data = {"mintAccounts": [mint_address]}
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                resp = await client.post(url, params=params, json=json_data)
-                resp.raise_for_status()
-                data = resp.json()
-                print(f"HELIUS API RAW RESPONSE: {data}")  # DEBUG
-            except httpx.RequestError as e:
-                raise RuntimeError(f"Network error when contacting Helius: {e}") from e
-            except httpx.HTTPStatusError as e:
-                raise RuntimeError(f"Helius response error: {e}") from e
-            # Helius now returns a list of objects directly, without 'result' key
-            if not data or not isinstance(data, list) or not data:
-                return {
-                    "mint_address": mint_address,
-                    "name": "Unknown",
-                    "symbol": "Unknown",
-                    "decimals": 0
-                }
-            raw_metadata = data[0]
-            onchain_meta = raw_metadata.get("onChainMetadata", {})
-            meta_data = onchain_meta.get("metadata") or {}
-            meta_fields = meta_data.get("data") or {}
-            name = meta_fields.get("name")
-            symbol = meta_fields.get("symbol")
-            # Safely parse decimals
-            account_info = raw_metadata.get("onChainAccountInfo", {}).get("accountInfo")
-            decimals = None
-            if account_info and isinstance(account_info, dict):
-                decimals = account_info.get("data", {}).get("parsed", {}).get("info", {}).get("decimals")
-            # Fallback to legacyMetadata if onChainMetadata is missing
-            if (not name or not symbol or decimals is None) and raw_metadata.get("legacyMetadata"):
-                legacy = raw_metadata["legacyMetadata"]
-                name = name or legacy.get("name", "Unknown")
-                symbol = symbol or legacy.get("symbol", "Unknown")
-                decimals = decimals if decimals is not None else legacy.get("decimals", 0)
-            if name is None:
-                name = "Unknown"
-            if symbol is None:
-                symbol = "Unknown"
-            if decimals is None:
-                decimals = 0
-            logo = meta_fields.get("uri")
-            metadata = {
+        async def fetch():
+            resp = await get_http_client(url).post(url, params=params, json=json_data, timeout=30.0)
+            resp.raise_for_status()
+            return resp.json()
+
+        try:
+            data = await self.cache.get_or_fetch(("helius:token_metadata", mint_address), fetch, ttl=TOKEN_METADATA_TTL)
+            print(f"HELIUS API RAW RESPONSE: {data}")  # DEBUG
+        except httpx.RequestError as e:
+            raise RuntimeError(f"Network error when contacting Helius: {e}") from e
+        except httpx.HTTPStatusError as e:
+            raise RuntimeError(f"Helius response error: {e}") from e
+        # Helius now returns a list of objects directly, without 'result' key
+        if not data or not isinstance(data, list) or not data:
+            return {
                 "mint_address": mint_address,
-                "name": str(name),
-                "symbol": str(symbol),
-                "decimals": int(decimals)
+                "name": "Unknown",
+                "symbol": "Unknown",
+                "decimals": 0
             }
-            if logo:
-                metadata["logo"] = str(logo)
-            return metadata
\ No newline at end of file
+        raw_metadata = data[0]
+        onchain_meta = raw_metadata.get("onChainMetadata", {})
+        meta_data = onchain_meta.get("metadata") or {}
+        meta_fields = meta_data.get("data") or {}
+        name = meta_fields.get("name")
+        symbol = meta_fields.get("symbol")
+        # Safely parse decimals
+        account_info = raw_metadata.get("onChainAccountInfo", {}).get("accountInfo")
+        decimals = None
+        if account_info and isinstance(account_info, dict):
+            decimals = account_info.get("data", {}).get("parsed", {}).get("info", {}).get("decimals")
+        # Fallback to legacyMetadata if onChainMetadata is missing
+        if (not name or not symbol or decimals is None) and raw_metadata.get("legacyMetadata"):
+            legacy = raw_metadata["legacyMetadata"]
+            name = name or legacy.get("name", "Unknown")
+            symbol = symbol or legacy.get("symbol", "Unknown")
+            decimals = decimals if decimals is not None else legacy.get("decimals", 0)
+        if name is None:
+            name = "Unknown"
+        if symbol is None:
+            symbol = "Unknown"
+        if decimals is None:
+            decimals = 0
+        logo = meta_fields.get("uri")
+        metadata = {
+            "mint_address": mint_address,
+            "name": str(name),
+            "symbol": str(symbol),
+            "decimals": int(decimals)
+        }
+        if logo:
+            metadata["logo"] = str(logo)
+        return metadata
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+Cold tier for raw price history.
+
+Whole UTC days of ``price_history`` older than the raw retention window are moved
+out of SQLite into one compressed NumPy file per day (``YYYY-MM-DD.npz``). Each
+file is columnar: rows are sorted by (symbol, ts) and an offsets array maps every
+symbol to its contiguous slice, so a read only touches one symbol's range and
+narrows it further with a binary search on ``ts``. Columns are loaded lazily,
+one array per requested column.
+
+Compressed ``.npz`` members cannot be memory-mapped, so scans decompress only the
+index arrays and the requested columns instead.
+
+Environment variables:
+    HISTORY_ARCHIVE_ENABLED: move old raw rows to the archive instead of deleting them (default true)
+    HISTORY_ARCHIVE_DIR: archive directory (default: "archive" next to the database)
+
+Example usage:
+    archive = HistoryArchive("backend/db/archive")
+    archive.archive(conn, before_ms)
+    rows = archive.read("WIF", start_ms, end_ms)
+"""
+import logging
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HISTORY_ARCHIVE_ENABLED = os.getenv("HISTORY_ARCHIVE_ENABLED", "true").lower() in ("1", "true", "yes")
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR")
+
+DAY_MS = 86_400_000
+
+# Archived columns besides the (symbols, offsets) index
+FLOAT_COLUMNS = ("price_cex", "price_dex", "spread_pct", "volume_cex", "volume_dex")
+COLUMNS = ("id", "ts") + FLOAT_COLUMNS + ("is_valid", "source_dex", "error_message")
+
+
+def day_of(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+class HistoryArchive:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path_for(self, day: str) -> str:
+        return os.path.join(self.directory, f"{day}.npz")
+
+    def days(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name[:-4] for name in os.listdir(self.directory)
+            if name.endswith(".npz") and ".tmp" not in name
+        )
+
+    # --- writing ---
+
+    @staticmethod
+    def _columns(rows: Sequence[Sequence[Any]]) -> Dict[str, np.ndarray]:
+        """Build sorted columnar arrays from rows of (symbol, id, ts, floats..., is_valid, source_dex, error_message)."""
+        rows = sorted(rows, key=lambda r: (r[0], r[2], r[1]))
+        symbols = sorted({r[0] for r in rows})
+        counts = [0] * len(symbols)
+        index = {symbol: i for i, symbol in enumerate(symbols)}
+        for r in rows:
+            counts[index[r[0]]] += 1
+        arrays = {
+            "symbols": np.array(symbols, dtype=str),
+            "offsets": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            "id": np.array([r[1] for r in rows], dtype=np.int64),
+            "ts": np.array([r[2] for r in rows], dtype=np.int64),
+            "is_valid": np.array([bool(r[8]) for r in rows], dtype=bool),
+            "source_dex": np.array([r[9] or "" for r in rows], dtype=str),
+            "error_message": np.array([r[10] or "" for r in rows], dtype=str),
+        }
+        for i, name in enumerate(FLOAT_COLUMNS):
+            arrays[name] = np.array([np.nan if r[3 + i] is None else r[3 + i] for r in rows], dtype=np.float64)
+        return arrays
+
+    def _existing_rows(self, day: str) -> List[tuple]:
+        path = self.path_for(day)
+        if not os.path.exists(path):
+            return []
+        with np.load(path) as data:
+            symbols, offsets = data["symbols"], data["offsets"]
+            columns = {name: data[name] for name in COLUMNS}
+        rows = []
+        for s, symbol in enumerate(symbols):
+            for i in range(offsets[s], offsets[s + 1]):
+                rows.append((str(symbol), int(columns["id"][i]), int(columns["ts"][i]))
+                            + tuple(None if np.isnan(columns[c][i]) else float(columns[c][i]) for c in FLOAT_COLUMNS)
+                            + (int(columns["is_valid"][i]), str(columns["source_dex"][i]) or None,
+                               str(columns["error_message"][i]) or None))
+        return rows
+
+    def write_day(self, day: str, rows: Sequence[Sequence[Any]]):
+        """Write (or merge into) one day file; rows already archived (same id) are not duplicated."""
+        merged = {r[1]: tuple(r) for r in self._existing_rows(day)}
+        merged.update({r[1]: tuple(r) for r in rows})
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(day)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **self._columns(list(merged.values())))
+        os.replace(tmp_path, path)  # Readers never see a partial file
+
+    def archive(self, conn: sqlite3.Connection, before_ms: int) -> int:
+        """
+        Move raw rows of whole UTC days ending at or before ``before_ms`` into day files.
+        Rows are deleted from SQLite only after their day file is written. Returns rows moved.
+        """
+        before_ms -= before_ms % DAY_MS
+        # Per-symbol MIN(ts) uses the (symbol_id, ts) index
+        row = conn.execute(
+            "SELECT MIN((SELECT MIN(ts) FROM price_history WHERE symbol_id = s.id)) FROM symbols s"
+        ).fetchone()
+        if row[0] is None or row[0] >= before_ms:
+            return 0
+        moved = 0
+        day_start = row[0] - row[0] % DAY_MS
+        while day_start < before_ms:
+            day_end = day_start + DAY_MS
+            rows = conn.execute(
+                """
+                SELECT s.symbol, p.id, p.ts, p.price_cex, p.price_dex, p.spread_pct, p.volume_cex, p.volume_dex,
+                       p.is_valid, p.source_dex, p.error_message
+                FROM price_history p JOIN symbols s ON s.id = p.symbol_id
+                WHERE p.symbol_id IN (SELECT id FROM symbols) AND p.ts >= ? AND p.ts < ?
+                """,
+                (day_start, day_end),
+            ).fetchall()
+            if rows:
+                self.write_day(day_of(day_start), rows)
+                with conn:
+                    conn.execute(
+                        "DELETE FROM price_history WHERE symbol_id IN (SELECT id FROM symbols) AND ts >= ? AND ts < ?",
+                        (day_start, day_end),
+                    )
+                moved += len(rows)
+                logger.info(f"Archived {len(rows)} price history rows for {day_of(day_start)}")
+            day_start = day_end
+        return moved
+
+    # --- reading ---
+
+    def read(self, symbol: str, start_ms: int, end_ms: int,
+             columns: Iterable[str] = ("ts", "price_cex", "price_dex", "spread_pct", "is_valid")) -> Dict[str, np.ndarray]:
+        """Column arrays for one symbol with start_ms <= ts <= end_ms, oldest first."""
+        columns = tuple(columns)
+        if "ts" not in columns:
+            columns = ("ts",) + columns
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in columns}
+        first_day, last_day = day_of(start_ms), day_of(end_ms)
+        for day in self.days():
+            if day < first_day or day > last_day:
+                continue
+            with np.load(self.path_for(day)) as data:
+                symbols = data["symbols"]
+                position = np.searchsorted(symbols, symbol)
+                if position >= len(symbols) or symbols[position] != symbol:
+                    continue
+                offsets = data["offsets"]
+                lo, hi = int(offsets[position]), int(offsets[position + 1])
+                ts = data["ts"][lo:hi]
+                left = lo + int(np.searchsorted(ts, start_ms, side="left"))
+                right = lo + int(np.searchsorted(ts, end_ms, side="right"))
+                if left >= right:
+                    continue
+                for name in columns:
+                    parts[name].append(data[name][left:right])
+        return {
+            name: np.concatenate(chunks) if chunks else np.array([], dtype=np.int64 if name in ("id", "ts") else None)
+            for name, chunks in parts.items()
+        }
+
+    def read_rows(self, symbol: str, start_ms: int, end_ms: int) -> List[Dict[str, Any]]:
+        """Archived rows as price_history dicts (without created_at), oldest first."""
+        data = self.read(symbol, start_ms, end_ms, columns=COLUMNS)
+        rows = []
+        for i in range(len(data["ts"])):
+            row = {"id": int(data["id"][i]), "symbol": symbol, "ts": int(data["ts"][i])}
+            for name in FLOAT_COLUMNS:
+                value = data[name][i]
+                row[name] = None if np.isnan(value) else float(value)
+            row["is_valid"] = bool(data["is_valid"][i])
+            row["source_dex"] = str(data["source_dex"][i]) or None
+            row["error_message"] = str(data["error_message"][i]) or None
+            rows.append(row)
+        return rows
+
+    def day_starts(self) -> List[int]:
+        """Start (epoch ms) of every archived day, oldest first."""
+        return [
+            int(datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+            for day in self.days()
+        ]
@@ -3,22 +3,56 @@ Jupiter API client for fetching token swap price to USDC via DEX.
 
 Features:
 - Fetch swap price to USDC via /v6/quote endpoint (fallback: /v4/quote)
+- Fetch USD mid prices for many mints in one call via the Price API
 
 Documentation:
 - https://dev.jup.ag/docs/swap-api/
 - https://dev.jup.ag/docs/token-api/
+- https://dev.jup.ag/docs/price-api/
 
 """
 import httpx
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Optional
+from backend.clients.transport import get_http_client
 
 class JupiterClient:
     """
     Minimal async client for fetching token swap price to USDC via Jupiter API.
     """
+    PRICE_URL = "https://api.jup.ag/price/v2"
+    MAX_PRICE_IDS = 100  # Price API limit per request
+
     def __init__(self, base_url: str = "https://quote-api.jup.ag"):
         self.base_url = base_url
 
+    async def get_prices(self, mints: Iterable[str]) -> Dict[str, float]:
+        """
+        Get USD mid prices for many mints in one call per 100 ids.
+        Args:
+            mints: Iterable[str] — mint addresses
+        Returns:
+            dict: {mint: price}; mints without a price are omitted
+        Raises:
+            RuntimeError: on network or HTTP errors
+        """
+        mints = list(dict.fromkeys(mints))
+        prices = {}
+        client = get_http_client(self.PRICE_URL)
+        for start in range(0, len(mints), self.MAX_PRICE_IDS):
+            chunk = mints[start:start + self.MAX_PRICE_IDS]
+            try:
+                resp = await client.get(self.PRICE_URL, params={"ids": ",".join(chunk)}, timeout=10.0)
+                resp.raise_for_status()
+                data = resp.json()
+            except httpx.RequestError as e:
+                raise RuntimeError(f"Network error with Jupiter: {e}") from e
+            except httpx.HTTPStatusError as e:
+                raise RuntimeError(f"HTTP error from Jupiter: {e}") from e
+            for mint, info in (data.get("data") or {}).items():
+                if info and info.get("price") is not None:
+                    prices[mint] = float(info["price"])
+        return prices
+
     async def get_quote(self, input_mint: str, output_mint: str, amount: int, slippage_bps: int = 50) -> Dict[str, Any]:
         """
         Get swap price via /v6/quote (fallback: /v4/quote).
@@ -48,16 +82,16 @@ class JupiterClient:
         url_v6 = f"{self.base_url}/v6/quote"
         url_v4 = f"{self.base_url}/v4/quote"
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        client = get_http_client(self.base_url)
+        try:
+            resp = await client.get(url_v6, params=params_v6, timeout=15.0)
+            if resp.status_code == 404:
+                resp = await client.get(url_v4, params=params_v4, timeout=15.0)
             try:
-                resp = await client.get(url_v6, params=params_v6)
-                if resp.status_code == 404:
-                    resp = await client.get(url_v4, params=params_v4)
-                try:
-                    resp.raise_for_status()
-                except Exception as e:
-                    # Return error as dict for test to handle
-                    return {"error": str(e), "response": resp.text}
-                return resp.json()
+                resp.raise_for_status()
             except Exception as e:
-                return {"error": str(e)}
+                # Return error as dict for test to handle
+                return {"error": str(e), "response": resp.text}
+            return resp.json()
+        except Exception as e:
+            return {"error": str(e)}
@@ -0,0 +1,64 @@
+"""
+Batched Jupiter DEX price source for the whole token universe.
+
+Pulls mid prices for every tracked mint with one Price API call per cycle.
+``PriceComparator`` uses the mid price to pre-filter spreads and only requests a
+size-specific, slippage-aware /v6/quote for tokens whose mid spread is large
+enough to matter.
+
+Concurrent lookups during a scan share a single in-flight refresh.
+
+Environment variables:
+    JUPITER_PRICES_MAX_AGE: seconds a fetched price set is reused (default 5)
+    DEX_QUOTE_PREFILTER_PCT: absolute mid spread (%) from which a /quote is requested (default 0.5)
+
+Example usage:
+    source = JupiterPriceSource(mints)
+    price = await source.get(mint)
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+from backend.services.jupiter import JupiterClient
+
+logger = logging.getLogger(__name__)
+
+JUPITER_PRICES_MAX_AGE = float(os.getenv("JUPITER_PRICES_MAX_AGE", "5"))
+DEX_QUOTE_PREFILTER_PCT = float(os.getenv("DEX_QUOTE_PREFILTER_PCT", "0.5"))
+
+
+class JupiterPriceSource:
+    def __init__(self, mints: Iterable[str], max_age: float = JUPITER_PRICES_MAX_AGE,
+                 client: Optional[JupiterClient] = None):
+        self.mints = list(dict.fromkeys(mints))
+        self.max_age = max_age
+        self.client = client or JupiterClient()
+        self._prices: Dict[str, float] = {}
+        self._fetched_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self._fetched_at if self._fetched_at else float("inf")
+
+    async def refresh(self) -> Dict[str, float]:
+        """Fetch mid prices for all mints at once."""
+        self._prices = await self.client.get_prices(self.mints)
+        self._fetched_at = time.monotonic()
+        missing = len(self.mints) - len(self._prices)
+        if missing:
+            logger.warning(f"Jupiter prices missing for {missing} mint(s)")
+        return self._prices
+
+    async def get(self, mint: str) -> Optional[float]:
+        """Return the mid price for a mint, refreshing the whole set if older than max_age."""
+        if self.age > self.max_age:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self.age > self.max_age:
+                    await self.refresh()
+        return self._prices.get(mint)
@@ -0,0 +1,92 @@
+"""
+Market charts rendered from data instead of browser screenshots.
+
+OHLCV candles come from the OKX REST API (``OKXClient.get_candles``, cached per
+bar size) and the CEX/DEX spread from our own price history; both are drawn by
+the ``ChartRenderer`` process pool as candlesticks with a volume panel and the
+spread on a secondary axis. A chart takes a few hundred milliseconds and no
+browser. Screenshots of the OKX TradingView widget remain available as a
+fallback or as the primary mode.
+
+Environment variables:
+    CHART_MODE: "candles" (default) or "screenshot"
+    CHART_SCREENSHOT_FALLBACK: take a screenshot when the candle chart fails (default false)
+    CHART_BAR: candle size (default "15m")
+    CHART_CANDLES: candles per chart (default 96)
+
+Example usage:
+    charts = MarketChartService(chart_renderer, history_service)
+    png = await charts.render("WIF")
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from backend.services.okx import OKXClient
+
+logger = logging.getLogger(__name__)
+
+CHART_MODE = os.getenv("CHART_MODE", "candles").lower()
+CHART_SCREENSHOT_FALLBACK = os.getenv("CHART_SCREENSHOT_FALLBACK", "false").lower() in ("1", "true", "yes")
+CHART_BAR = os.getenv("CHART_BAR", "15m")
+CHART_CANDLES = int(os.getenv("CHART_CANDLES", "96"))
+SPREAD_POINTS = 500
+
+
+def parse_candles(data: Dict[str, Any]) -> Optional[Dict[str, List[float]]]:
+    """OKX candles response as oldest-first columns, or None if it holds no candles."""
+    if str(data.get("code")) != "0" or not data.get("data"):
+        return None
+    # OKX returns [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm], newest first
+    rows = sorted(data["data"], key=lambda r: int(r[0]))
+    return {
+        "ts": [int(r[0]) for r in rows],
+        "open": [float(r[1]) for r in rows],
+        "high": [float(r[2]) for r in rows],
+        "low": [float(r[3]) for r in rows],
+        "close": [float(r[4]) for r in rows],
+        "volume": [float(r[5]) for r in rows],
+    }
+
+
+class MarketChartService:
+    def __init__(self, renderer, history_service, client: Optional[OKXClient] = None,
+                 bar: str = CHART_BAR, limit: int = CHART_CANDLES, quote: str = "USDC"):
+        self.renderer = renderer
+        self.history_service = history_service
+        self.client = client or OKXClient()
+        self.bar = bar
+        self.limit = limit
+        self.quote = quote
+
+    async def render(self, symbol: str, bar: Optional[str] = None) -> Optional[bytes]:
+        """Candlestick chart PNG for a token, or None if OKX has no candles for it."""
+        symbol = symbol.upper()
+        bar = bar or self.bar
+        try:
+            data = await self.client.get_candles(symbol, bar, self.limit, quote=self.quote)
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching candles for {symbol}: {e}")
+            return None
+        candles = parse_candles(data)
+        if candles is None:
+            logger.warning(f"No candles for {symbol}-{self.quote} {bar}: {data.get('msg')}")
+            return None
+
+        series = await asyncio.to_thread(
+            self.history_service.get_series, symbol, candles["ts"][0], None, SPREAD_POINTS
+        )
+        points = [p for p in series["points"] if p["spread_close"] is not None]
+        spread_ts = [p["ts"] for p in points]
+        spreads = [p["spread_close"] for p in points]
+
+        # The last candle keeps changing until it closes, so it is part of the version
+        data_version = (bar, candles["ts"][-1], candles["close"][-1], candles["volume"][-1],
+                        spread_ts[-1] if spread_ts else None)
+        return await self.renderer.render(
+            "candles", symbol, data_version, bar, candles["ts"], candles["open"], candles["high"],
+            candles["low"], candles["close"], candles["volume"], spread_ts, spreads,
+        )
@@ -0,0 +1,129 @@
+"""
+Background market snapshot engine.
+
+Runs the full multi-token scan on a fixed cadence and publishes an immutable,
+versioned ``MarketSnapshot``. Bot handlers and /api/spreads read the latest
+snapshot instantly instead of triggering a live re-scan per request, so upstream
+load stays constant regardless of the number of users.
+
+Environment variables:
+    SNAPSHOT_INTERVAL: seconds between scans (default 30)
+
+Example usage:
+    scheduler = SnapshotScheduler(price_service)
+    await scheduler.start()
+    snapshot = await scheduler.get()
+    print(snapshot.version, snapshot.age, snapshot.valid())
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "30"))
+
+Listener = Callable[["MarketSnapshot"], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    version: int
+    created_at: float  # Unix time
+    scan_duration: float
+    results: Tuple[Mapping[str, Any], ...]  # Sorted by absolute spread, errors last
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.created_at)
+
+    def get(self, symbol: str) -> Optional[Mapping[str, Any]]:
+        symbol = symbol.upper()
+        return next((r for r in self.results if r.get("token") == symbol), None)
+
+    def select(self, symbols: Iterable[str]) -> List[Mapping[str, Any]]:
+        """Results for the given symbols, keeping the snapshot's spread order."""
+        wanted = {symbol.upper() for symbol in symbols}
+        return [r for r in self.results if r.get("token") in wanted]
+
+    def valid(self, symbols: Optional[Iterable[str]] = None) -> List[Mapping[str, Any]]:
+        results = self.results if symbols is None else self.select(symbols)
+        return [r for r in results if r.get("is_valid")]
+
+
+class SnapshotScheduler:
+    def __init__(self, service, interval: float = SNAPSHOT_INTERVAL):
+        self.service = service
+        self.interval = interval
+        self.latest: Optional[MarketSnapshot] = None
+        self._version = 0
+        self._listeners: List[Listener] = []
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Optional[asyncio.Future] = None
+
+    def subscribe(self, listener: Listener):
+        """Register a coroutine called with every newly published snapshot."""
+        self._listeners.append(listener)
+
+    async def _scan(self) -> MarketSnapshot:
+        started = time.monotonic()
+        results = await self.service.compare_many()
+        self._version += 1
+        snapshot = MarketSnapshot(
+            version=self._version,
+            created_at=time.time(),
+            scan_duration=time.monotonic() - started,
+            results=tuple(MappingProxyType(dict(r)) for r in results),
+        )
+        self.latest = snapshot
+        logger.info(f"Published market snapshot v{snapshot.version} "
+                    f"({len(snapshot.valid())}/{len(results)} valid, {snapshot.scan_duration:.2f}s)")
+        for listener in self._listeners:
+            try:
+                await listener(snapshot)
+            except Exception as e:
+                logger.error(f"Snapshot listener failed: {e}")
+        return snapshot
+
+    async def refresh(self) -> MarketSnapshot:
+        """Scan now; concurrent callers share the same scan."""
+        if self._refreshing is not None:
+            return await asyncio.shield(self._refreshing)
+        self._refreshing = asyncio.ensure_future(self._scan())
+        try:
+            return await asyncio.shield(self._refreshing)
+        finally:
+            self._refreshing = None
+
+    async def get(self) -> MarketSnapshot:
+        """Latest snapshot, scanning once if none has been published yet."""
+        if self.latest is not None:
+            return self.latest
+        return await self.refresh()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Market snapshot scan failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
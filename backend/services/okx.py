@@ -6,6 +6,7 @@ Features:
 - Get 24h volume
 - Get 24h % change
 - Get bid/ask price
+- Get tickers for all SPOT instruments in one request
 
 Implements best practices and matches OKX API documentation:
 https://my.okx.com/docs-v5/en/#order-book-trading-market-data-get-tickers
@@ -19,12 +20,22 @@ Example usage:
     print(price_info)
 """
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from backend.clients.transport import get_http_client
+from backend.services.cache import MarketDataCache, market_cache
+
+# Seconds a candle series stays fresh, by bar size
+CANDLE_TTLS = {"1m": 15, "5m": 60, "15m": 120, "1H": 300, "1h": 300, "4H": 900, "1D": 1800, "1d": 1800}
+TOKEN_LIST_TTL = 3600
+POOL_LIST_TTL = 3600
 
 class OKXClient:
     BASE_URL = "https://www.okx.com"
     WEB3_BASE_URL = "https://www.okx.com/web3/api/v1"
 
+    def __init__(self, cache: Optional[MarketDataCache] = None):
+        self.cache = cache or market_cache
+
     async def get_ticker(self, symbol: str) -> Dict[str, Any]:
         """
         Fetch ticker data for a token in USDC from OKX.
@@ -38,15 +49,14 @@ class OKXClient:
         inst_id = f"{symbol.upper()}-USDC"
         url = f"{self.BASE_URL}/api/v5/market/ticker"
         params = {"instId": inst_id}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                resp = await client.get(url, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-            except httpx.RequestError as e:
-                raise RuntimeError(f"Network error with OKX: {e}") from e
-            except httpx.HTTPStatusError as e:
-                raise RuntimeError(f"HTTP error from OKX: {e}") from e
+        try:
+            resp = await get_http_client(url).get(url, params=params, timeout=10.0)
+            resp.raise_for_status()
+            data = resp.json()
+        except httpx.RequestError as e:
+            raise RuntimeError(f"Network error with OKX: {e}") from e
+        except httpx.HTTPStatusError as e:
+            raise RuntimeError(f"HTTP error from OKX: {e}") from e
         if not data or data.get("code") != '0' or not data.get("data"):
             raise RuntimeError(f"Invalid response from OKX: {data}")
         ticker = data["data"][0]
@@ -61,6 +71,31 @@ class OKXClient:
             "ask": float(ticker["askPx"])
         }
 
+    async def get_tickers(self, inst_type: str = "SPOT") -> Dict[str, Any]:
+        """
+        Fetch tickers for all instruments of a type in one request.
+        https://www.okx.com/docs-v5/en/#order-book-trading-market-data-get-tickers
+        Args:
+            inst_type: str — instrument type, e.g. 'SPOT', 'SWAP'
+        Returns:
+            Raw OKX response: {"code": "0", "data": [ticker, ...]}
+        Raises:
+            RuntimeError: on network or API error
+        """
+        url = f"{self.BASE_URL}/api/v5/market/tickers"
+        params = {"instType": inst_type}
+        try:
+            resp = await get_http_client(url).get(url, params=params, timeout=10.0)
+            resp.raise_for_status()
+            data = resp.json()
+        except httpx.RequestError as e:
+            raise RuntimeError(f"Network error with OKX: {e}") from e
+        except httpx.HTTPStatusError as e:
+            raise RuntimeError(f"HTTP error from OKX: {e}") from e
+        if not data or data.get("code") != '0' or not isinstance(data.get("data"), list):
+            raise RuntimeError(f"Invalid response from OKX: {data}")
+        return data
+
     async def get_tokens(self, chain_id: int = 101) -> Dict[str, Any]:
         """
         Получить список всех токенов DEX (Web3 API).
@@ -68,11 +103,14 @@ class OKXClient:
         """
         url = f"{self.WEB3_BASE_URL}/token/token-list"
         params = {"chainId": chain_id}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, params=params)
+
+        async def fetch():
+            resp = await get_http_client(url).get(url, params=params, timeout=10.0)
             resp.raise_for_status()
             return resp.json()
 
+        return await self.cache.get_or_fetch(("okx:tokens", chain_id), fetch, ttl=TOKEN_LIST_TTL)
+
     async def get_pools(self, chain_id: int = 101) -> Dict[str, Any]:
         """
         Получить список пулов ликвидности DEX (Web3 API).
@@ -80,11 +118,14 @@ class OKXClient:
         """
         url = f"{self.WEB3_BASE_URL}/swap/pool/list"
         params = {"chainId": chain_id}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, params=params)
+
+        async def fetch():
+            resp = await get_http_client(url).get(url, params=params, timeout=10.0)
             resp.raise_for_status()
             return resp.json()
 
+        return await self.cache.get_or_fetch(("okx:pools", chain_id), fetch, ttl=POOL_LIST_TTL)
+
     async def get_prices(self, token_in: str, token_out: str, amount_in: str, chain_id: int = 101) -> Dict[str, Any]:
         """
         Получить цену обмена tokenIn → tokenOut (Web3 API).
@@ -92,10 +133,9 @@ class OKXClient:
         """
         url = f"{self.WEB3_BASE_URL}/swap/price"
         params = {"chainId": chain_id, "tokenIn": token_in, "tokenOut": token_out, "amountIn": amount_in}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            return resp.json()
+        resp = await get_http_client(url).get(url, params=params, timeout=10.0)
+        resp.raise_for_status()
+        return resp.json()
 
     async def get_swaps(self, pool_id: str, limit: int = 50, chain_id: int = 101) -> Dict[str, Any]:
         """
@@ -104,12 +144,11 @@ class OKXClient:
         """
         url = f"{self.WEB3_BASE_URL}/swap/trade-list"
         params = {"chainId": chain_id, "poolId": pool_id, "limit": limit}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            return resp.json()
+        resp = await get_http_client(url).get(url, params=params, timeout=10.0)
+        resp.raise_for_status()
+        return resp.json()
 
-    async def get_candles(self, symbol: str, bar: str = "5m", limit: int = 100) -> Dict[str, Any]:
+    async def get_candles(self, symbol: str, bar: str = "5m", limit: int = 100, quote: str = "USDT") -> Dict[str, Any]:
         """
         Получить свечи CEX (5m, 1h, 24h).
         https://www.okx.com/docs-v5/en/#rest-api-market-data-get-candlesticks
@@ -117,25 +156,28 @@ class OKXClient:
             symbol: Тикер (например, 'BTC')
             bar: Интервал ('5m', '1h', '1d')
             limit: Количество свечей
+            quote: Валюта котировки ('USDT', 'USDC')
         """
-        inst_id = f"{symbol.upper()}-USDT"
+        inst_id = f"{symbol.upper()}-{quote.upper()}"
         url = f"{self.BASE_URL}/api/v5/market/candles"
         params = {"instId": inst_id, "bar": bar, "limit": str(limit)}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, params=params)
+
+        async def fetch():
+            resp = await get_http_client(url).get(url, params=params, timeout=10.0)
             resp.raise_for_status()
             return resp.json()
 
+        return await self.cache.get_or_fetch(("okx:candles", inst_id, bar, limit), fetch, ttl=CANDLE_TTLS.get(bar, 30))
+
     async def get_system_time(self) -> Dict[str, Any]:
         """
         Получить текущее серверное время OKX (public REST API).
         https://www.okx.com/docs-v5/en/#public-data-rest-api-get-system-time
         """
         url = f"{self.BASE_URL}/api/v5/public/time"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            return resp.json()
+        resp = await get_http_client(url).get(url, timeout=10.0)
+        resp.raise_for_status()
+        return resp.json()
 
     async def get_token_price(self, chain_id: int, token_address: str) -> Dict[str, Any]:
         """
@@ -145,15 +187,15 @@ class OKXClient:
         url = "https://www.okx.com/web3/api/v1/token/price"
         payload = {"chainId": str(chain_id), "tokenAddress": token_address}
         headers = {"Content-Type": "application/json"}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                resp = await client.post(url, json=payload, headers=headers)
+        client = get_http_client(url)
+        try:
+            resp = await client.post(url, json=payload, headers=headers, timeout=10.0)
+            resp.raise_for_status()
+            return resp.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 405:
+                # Пробуем GET-запрос
+                resp = await client.get(url, params=payload, timeout=10.0)
                 resp.raise_for_status()
                 return resp.json()
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 405:
-                    # Пробуем GET-запрос
-                    resp = await client.get(url, params=payload)
-                    resp.raise_for_status()
-                    return resp.json()
-                raise
+            raise
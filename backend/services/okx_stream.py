@@ -0,0 +1,167 @@
+"""
+OKX WebSocket ticker stream feeding an in-memory CEX price book.
+
+Optional streaming mode: subscribes to the public ``tickers`` channel for every
+tracked *-USDC instrument and keeps a live, timestamped ``PriceBook`` that
+``PriceComparator`` reads with zero network round-trips. Lookups fall back to
+the REST tickers source when an instrument is missing or stale.
+
+Features:
+- Reconnect with exponential backoff and resubscribe
+- Heartbeat: sends "ping" after a quiet period and reconnects if no "pong" arrives
+- Per-instrument staleness flag
+
+Documentation:
+    https://www.okx.com/docs-v5/en/#public-data-websocket-tickers-channel
+
+Environment variables:
+    OKX_WS_ENABLED: enable streaming mode (default false)
+    OKX_WS_URL: public WebSocket endpoint (default wss://ws.okx.com:8443/ws/v5/public)
+    OKX_WS_STALE_AFTER: seconds after which a book entry is flagged stale (default 10)
+    OKX_WS_PING_INTERVAL: quiet seconds before a heartbeat ping (default 25, OKX drops idle sockets at 30)
+
+Example usage:
+    stream = OKXTickerStream(["WIF", "JUP"])
+    await stream.start()
+    entry = stream.book.get("WIF")   # {"last": ..., "stale": False, "age": 0.3, ...}
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import aiohttp
+
+from backend.services.okx_tickers import parse_tickers
+
+logger = logging.getLogger(__name__)
+
+OKX_WS_ENABLED = os.getenv("OKX_WS_ENABLED", "false").strip().lower() in ("1", "true", "yes", "on")
+OKX_WS_URL = os.getenv("OKX_WS_URL", "wss://ws.okx.com:8443/ws/v5/public")
+OKX_WS_STALE_AFTER = float(os.getenv("OKX_WS_STALE_AFTER", "10"))
+OKX_WS_PING_INTERVAL = float(os.getenv("OKX_WS_PING_INTERVAL", "25"))
+
+
+class PriceBook:
+    """Latest ticker per symbol, stamped with the local receive time."""
+    def __init__(self, stale_after: float = OKX_WS_STALE_AFTER):
+        self.stale_after = stale_after
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def update(self, symbol: str, ticker: Dict[str, Any]):
+        entry = dict(ticker)
+        entry["received_at"] = time.monotonic()
+        self._entries[symbol.upper()] = entry
+
+    def is_stale(self, symbol: str) -> bool:
+        entry = self._entries.get(symbol.upper())
+        return entry is None or time.monotonic() - entry["received_at"] > self.stale_after
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the entry with ``age`` and ``stale`` fields, or None."""
+        entry = self._entries.get(symbol.upper())
+        if entry is None:
+            return None
+        age = time.monotonic() - entry["received_at"]
+        return dict(entry, age=age, stale=age > self.stale_after)
+
+    def symbols(self):
+        return list(self._entries)
+
+
+class OKXTickerStream:
+    def __init__(self, symbols: Iterable[str], book: Optional[PriceBook] = None, url: str = OKX_WS_URL,
+                 quote: str = "USDC", ping_interval: float = OKX_WS_PING_INTERVAL,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.book = book or PriceBook()
+        self.url = url
+        self.quote = quote
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = asyncio.Event()
+        self.reconnects = 0
+        self._task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _subscribe_message(self) -> str:
+        args = [{"channel": "tickers", "instId": f"{symbol}-{self.quote}"} for symbol in self.symbols]
+        return json.dumps({"op": "subscribe", "args": args})
+
+    def handle_message(self, raw: str):
+        """Apply one text frame from OKX to the price book."""
+        if raw == "pong":
+            return
+        try:
+            message = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning(f"Unexpected OKX WS frame: {raw[:200]}")
+            return
+        if message.get("event") == "error":
+            logger.error(f"OKX WS error: {message}")
+            return
+        if message.get("arg", {}).get("channel") != "tickers" or "data" not in message:
+            return
+        for symbol, ticker in parse_tickers(message, self.symbols, self.quote).items():
+            self.book.update(symbol, ticker)
+
+    async def _consume(self, ws: aiohttp.ClientWebSocketResponse):
+        awaiting_pong = False
+        while True:
+            try:
+                msg = await ws.receive(timeout=self.ping_interval)
+            except asyncio.TimeoutError:
+                if awaiting_pong:
+                    logger.warning("OKX WS heartbeat timed out, reconnecting")
+                    return
+                await ws.send_str("ping")
+                awaiting_pong = True
+                continue
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                awaiting_pong = False
+                self.handle_message(msg.data)
+            elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                              aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                logger.warning(f"OKX WS closed: {msg.type}")
+                return
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with self._session.ws_connect(self.url, autoping=True) as ws:
+                    await ws.send_str(self._subscribe_message())
+                    self.connected.set()
+                    delay = self.reconnect_delay
+                    logger.info(f"OKX WS subscribed to {len(self.symbols)} tickers")
+                    await self._consume(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"OKX WS connection error: {e}")
+            self.connected.clear()
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._session = aiohttp.ClientSession()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self.connected.clear()
@@ -0,0 +1,107 @@
+"""
+Bulk OKX CEX price source built on the all-instruments tickers endpoint.
+
+Instead of one /market/ticker plus one /market/candles request per token, the
+source pulls /api/v5/market/tickers?instType=SPOT once per cycle and indexes
+only the tracked *-USDC pairs. The 24h change is derived from the ticker's own
+``open24h`` (rolling 24h open), falling back to ``sodUtc0`` (UTC day open).
+
+Concurrent lookups during a scan share a single in-flight refresh.
+
+Environment variables:
+    OKX_TICKERS_MAX_AGE: seconds a fetched ticker set is reused (default 5)
+
+Example usage:
+    source = OKXTickerSource(["WIF", "JUP"])
+    ticker = await source.get("WIF")   # {"last": ..., "vol24h": ..., "change24h": ...}
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from backend.services.okx import OKXClient
+
+logger = logging.getLogger(__name__)
+
+OKX_TICKERS_MAX_AGE = float(os.getenv("OKX_TICKERS_MAX_AGE", "5"))
+
+
+def _number(ticker: Dict[str, Any], field: str, cast=float):
+    """Numeric ticker field, 0 when it is missing or malformed."""
+    try:
+        return cast(ticker.get(field) or 0)
+    except (TypeError, ValueError):
+        return cast(0)
+
+
+def parse_tickers(data: Dict[str, Any], symbols: Iterable[str], quote: str = "USDC") -> Dict[str, Dict[str, Any]]:
+    """
+    Index an OKX tickers response by symbol, keeping only tracked ``{symbol}-{quote}`` pairs.
+    Returns:
+        {symbol: {"last", "vol24h", "change24h", "bid", "ask", "ts"}}
+    """
+    wanted = {f"{symbol.upper()}-{quote}": symbol.upper() for symbol in symbols}
+    book = {}
+    for ticker in data.get("data") or []:
+        symbol = wanted.get(ticker.get("instId"))
+        if symbol is None:
+            continue
+        try:
+            last = float(ticker["last"])
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Skipping malformed OKX ticker: {ticker}")
+            continue
+        change24h = 0.0
+        for open_field in ("open24h", "sodUtc0"):
+            open_price = _number(ticker, open_field)
+            if open_price > 0:
+                change24h = (last - open_price) / open_price * 100
+                break
+        book[symbol] = {
+            "last": last,
+            "vol24h": ticker.get("volCcy24h", "0"),
+            "change24h": change24h,
+            "bid": _number(ticker, "bidPx"),
+            "ask": _number(ticker, "askPx"),
+            "ts": _number(ticker, "ts", int),
+        }
+    return book
+
+
+class OKXTickerSource:
+    def __init__(self, symbols: Iterable[str], quote: str = "USDC", max_age: float = OKX_TICKERS_MAX_AGE,
+                 client: Optional[OKXClient] = None):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.quote = quote
+        self.max_age = max_age
+        self.client = client or OKXClient()
+        self._book: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self._fetched_at if self._fetched_at else float("inf")
+
+    async def refresh(self) -> Dict[str, Dict[str, Any]]:
+        """Fetch all SPOT tickers once and rebuild the index."""
+        data = await self.client.get_tickers("SPOT")
+        self._book = parse_tickers(data, self.symbols, self.quote)
+        self._fetched_at = time.monotonic()
+        missing = set(self.symbols) - set(self._book)
+        if missing:
+            logger.warning(f"OKX tickers missing for: {', '.join(sorted(missing))}")
+        return self._book
+
+    async def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Return the ticker for a symbol, refreshing the whole set if older than max_age."""
+        if self.age > self.max_age:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                # Another lookup may have refreshed while we waited
+                if self.age > self.max_age:
+                    await self.refresh()
+        return self._book.get(symbol.upper())
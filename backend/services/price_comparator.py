@@ -5,12 +5,18 @@ import logging
 from decimal import Decimal
 import time
 from backend.config.tokens import TOKENS
+from backend.clients.transport import get_http_client
+from backend.services.okx_tickers import OKXTickerSource
+from backend.services.okx_stream import PriceBook
+from backend.services.jupiter_prices import JupiterPriceSource, DEX_QUOTE_PREFILTER_PCT
+from backend.services.cache import market_cache
 
 logger = logging.getLogger(__name__)
 
 MIN_PRICE = 0.000001  # Minimum price for validation
 MAX_SPREAD = 10.0     # Maximum spread in percent
 MIN_VOLUME = 100     # Minimum volume in USDC
+TOKEN_INFO_TTL = 300  # Seconds Jupiter token info (daily volume) stays fresh
 
 def format_volume(volume: float) -> str:
     """Format volume in a human-readable format."""
@@ -86,6 +92,11 @@ class PriceComparator:
         self.MIN_PRICE = 0.000001
         self.MAX_SPREAD = 10.0
         self.MIN_VOLUME = 1000  # Lowered to 1000 USDC to include more tokens
+        self.cex_source = OKXTickerSource(self.tokens)
+        self.price_book: Optional[PriceBook] = None  # Set when the OKX WebSocket stream is enabled
+        self.dex_source = JupiterPriceSource(mint for mint, _, _ in self.tokens.values())
+        self.QUOTE_PREFILTER_PCT = DEX_QUOTE_PREFILTER_PCT
+        self.cache = market_cache
 
     async def compare_price(self, token: str) -> PriceComparisonResult:
         try:
@@ -128,7 +139,7 @@ class PriceComparator:
             trend = float(cex_data.get("change24h", 0))
 
             # Get DEX price and volume
-            dex_data = await self._get_dex_price(token)
+            dex_data = await self._get_dex_price(token, price_cex=price_cex)
             if not dex_data:
                 return PriceComparisonResult(
                     token=token,
@@ -145,9 +156,10 @@ class PriceComparator:
                     error="Failed to get DEX price"
                 )
 
-            price_dex = float(dex_data.get("outAmount", 0)) / float(dex_data.get("inAmount", 1))
+            price_dex = float(dex_data.get("price", 0))
             volume_dex = float(dex_data.get("volume24h", 0))  # Use actual DEX volume
-            slippage = float(dex_data.get("priceImpactPct", 0))
+            # None when the mid price was used without a size-specific quote
+            slippage = float(dex_data["priceImpactPct"]) if dex_data.get("priceImpactPct") is not None else None
 
             # Validate prices
             if price_cex < self.MIN_PRICE or price_dex < self.MIN_PRICE:
@@ -236,87 +248,84 @@ class PriceComparator:
 
     async def _get_cex_price(self, symbol: str) -> Optional[Dict[str, Any]]:
         try:
-            import aiohttp
-            session = aiohttp.ClientSession()
-            base_url = "https://www.okx.com"
-            
-            # Get ticker
-            ticker_url = f"{base_url}/api/v5/market/ticker?instId={symbol}-USDC"
-            logger.info(f"Fetching CEX price from: {ticker_url}")
-            
-            async with session.get(ticker_url) as response:
-                if response.status != 200:
-                    logger.error(f"CEX API error: {response.status}")
-                    return None
-                data = await response.json()
-                if not data.get("data"):
-                    logger.error(f"No CEX data for {symbol}")
-                    return None
-                
-                ticker_data = data["data"][0]
-                logger.info(f"CEX data for {symbol}: {ticker_data}")
-                
-                # Get candles for trend
-                candles_url = f"{base_url}/api/v5/market/candles?instId={symbol}-USDC&bar=1D&limit=2"
-                async with session.get(candles_url) as candles_response:
-                    if candles_response.status == 200:
-                        candles_data = await candles_response.json()
-                        if candles_data.get("data"):
-                            current_price = float(ticker_data["last"])
-                            prev_price = float(candles_data["data"][1][4])
-                            change_24h = ((current_price - prev_price) / prev_price) * 100
-                            ticker_data["change24h"] = change_24h
-                            logger.info(f"24h change for {symbol}: {change_24h}%")
-
-                await session.close()
-                return {
-                    "last": ticker_data["last"],
-                    "vol24h": ticker_data.get("volCcy24h", "0"),
-                    "change24h": ticker_data.get("change24h", 0)
-                }
+            # Streaming mode: read the live WebSocket book, no network round-trip
+            if self.price_book is not None:
+                ticker_data = self.price_book.get(symbol)
+                if ticker_data and not ticker_data["stale"]:
+                    return {
+                        "last": ticker_data["last"],
+                        "vol24h": ticker_data["vol24h"],
+                        "change24h": ticker_data["change24h"]
+                    }
+                logger.warning(f"No fresh streamed CEX price for {symbol}, falling back to REST")
+
+            # One /market/tickers request per cycle serves every tracked token
+            ticker_data = await self.cex_source.get(symbol)
+            if not ticker_data:
+                logger.error(f"No CEX data for {symbol}")
+                return None
+            logger.info(f"CEX data for {symbol}: {ticker_data}")
+            return {
+                "last": ticker_data["last"],
+                "vol24h": ticker_data["vol24h"],
+                "change24h": ticker_data["change24h"]
+            }
 
         except Exception as e:
             logger.error(f"Error getting CEX price for {symbol}: {e}")
             return None
 
-    async def _get_dex_price(self, symbol: str) -> Optional[Dict[str, Any]]:
+    async def _get_dex_price(self, symbol: str, price_cex: Optional[float] = None) -> Optional[Dict[str, Any]]:
         try:
-            import aiohttp
-            session = aiohttp.ClientSession()
             base_url = "https://quote-api.jup.ag/v6"
             tokens_base_url = "https://tokens.jup.ag/token"
-            
+
             mint, usdc_mint, decimals = self.tokens[symbol]
             amount = 10 ** decimals  # 1 token
 
             # Get token info including daily volume
             token_url = f"{tokens_base_url}/{mint}"
-            logger.info(f"Fetching token info from: {token_url}")
-            async with session.get(token_url) as token_response:
-                if token_response.status != 200:
-                    logger.error(f"Token info API error: {token_response.status}")
-                    await session.close()
-                    return None
-                token_data = await token_response.json()
-                daily_volume = float(token_data.get("daily_volume", 0))
-                logger.info(f"Token info for {symbol}: {token_data}")
+
+            async def fetch_token_info():
+                logger.info(f"Fetching token info from: {token_url}")
+                token_response = await get_http_client(token_url).get(token_url)
+                if token_response.status_code != 200:
+                    raise RuntimeError(f"Token info API error: {token_response.status_code}")
+                return token_response.json()
+
+            # Daily volume changes slowly; serve it from the market cache
+            token_data = await self.cache.get_or_fetch(("jupiter:token_info", mint), fetch_token_info, ttl=TOKEN_INFO_TTL)
+            daily_volume = float(token_data.get("daily_volume", 0))
+            logger.info(f"Token info for {symbol}: {token_data}")
+
+            # Mid price from the batched Price API; skip the quote if the spread is too small to matter
+            try:
+                mid_price = await self.dex_source.get(mint)
+            except Exception as e:
+                logger.warning(f"Jupiter batch price unavailable for {symbol}: {e}")
+                mid_price = None
+            if mid_price and price_cex:
+                mid_spread = (mid_price - price_cex) / price_cex * 100
+                if abs(mid_spread) < self.QUOTE_PREFILTER_PCT:
+                    return {
+                        "price": mid_price,
+                        "priceImpactPct": None,
+                        "source": "Jupiter",
+                        "volume24h": daily_volume
+                    }
 
             # Get quote for price and route
             quote_url = f"{base_url}/quote?inputMint={mint}&outputMint={usdc_mint}&amount={amount}&slippageBps=50"
             logger.info(f"Fetching DEX quote from: {quote_url}")
-            async with session.get(quote_url) as response:
-                if response.status != 200:
-                    logger.error(f"DEX quote API error: {response.status}")
-                    await session.close()
-                    return None
-                data = await response.json()
-                logger.info(f"DEX quote data for {symbol}: {data}")
-
-            await session.close()
+            response = await get_http_client(quote_url).get(quote_url)
+            if response.status_code != 200:
+                logger.error(f"DEX quote API error: {response.status_code}")
+                return None
+            data = response.json()
+            logger.info(f"DEX quote data for {symbol}: {data}")
 
             return {
-                "inAmount": amount,
-                "outAmount": data.get("outAmount", 0),
+                "price": float(data.get("outAmount", 0)) / amount,
                 "priceImpactPct": data.get("priceImpactPct", 0),
                 "source": "Jupiter",
                 "volume24h": daily_volume
@@ -1,10 +1,13 @@
+import asyncio
 from backend.services.price_comparator import PriceComparator, PriceComparisonResult
 from backend.config.tokens import TOKENS
 from backend.ai.alpha_insight_service import AlphaInsightService
 from backend.services.price_history import PriceHistoryService
+from backend.services.scan_engine import ScanEngine
+from backend.services.single_flight import SingleFlight
 from collections import defaultdict, deque
 from datetime import datetime
-from typing import Dict, List
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
 
 class HistoryStore:
     def __init__(self, maxlen: int = 100):
@@ -30,10 +33,16 @@ class PriceComparatorService:
         self.history = HistoryStore()
         self.tokens = TOKENS
         self.price_history_service = PriceHistoryService()
+        self.scan_engine = ScanEngine()
+        self.flights = SingleFlight()
 
     async def compare(self, symbol: str) -> dict:
+        """Compare one token; concurrent callers for the same symbol share a single upstream comparison."""
+        return dict(await self.flights.do(("compare", symbol), lambda: self._compare(symbol)))
+
+    async def _compare(self, symbol: str) -> dict:
         if symbol not in self.tokens:
-            return {"error": f"Token {symbol} not supported"}
+            return {"token": symbol, "is_valid": False, "error": f"Token {symbol} not supported"}
         
         result = await self.comparator.compare_price(symbol)
         if result.is_valid:
@@ -95,14 +104,37 @@ class PriceComparatorService:
     def get_history(self, symbol: str) -> List[Dict]:
         return self.history.get_history(symbol)
 
+    @staticmethod
+    def _scan_error(symbol: str, error: BaseException) -> dict:
+        message = "Timed out" if isinstance(error, asyncio.TimeoutError) else str(error)
+        return {"token": symbol, "symbol": symbol, "is_valid": False, "error": message}
+
+    async def compare_many(self, symbols: Optional[Iterable[str]] = None) -> List[dict]:
+        """Compare all given tokens concurrently, sorted by absolute spread (errors last)."""
+        return await self.scan_engine.scan(
+            symbols if symbols is not None else self.tokens,
+            self.compare,
+            on_error=self._scan_error,
+            key=lambda data: abs(data.get("spread_pct") or 0) if data.get("is_valid") else -1,
+        )
+
+    async def iter_compare(self, symbols: Optional[Iterable[str]] = None) -> AsyncIterator[Tuple[str, dict]]:
+        """Yield (symbol, comparison) pairs in completion order."""
+        async for symbol, data in self.scan_engine.iter_scan(
+            symbols if symbols is not None else self.tokens, self.compare, on_error=self._scan_error
+        ):
+            yield symbol, data
+
     async def compare_prices(self) -> List[PriceComparisonResult]:
         """Compare prices for all tokens and return top 3 by spread."""
         results = []
-        for token in self.tokens:
-            result = await self.comparator.compare_price(token)
-            if result.is_valid:
+        # A token that fails or times out is left out instead of failing the whole scan
+        scanned = await self.scan_engine.scan(self.tokens, self.comparator.compare_price,
+                                              on_error=lambda symbol, error: None)
+        for result in scanned:
+            if result is not None and result.is_valid:
                 # Save to history
-                self.history.add(token, result)
+                self.history.add(result.token, result)
                 self.price_history_service.save(
                     symbol=result.token,
                     price_cex=result.price_cex,
@@ -1,45 +1,334 @@
+"""
+Price history persistence.
+
+Rows are written by a background ``PriceHistoryWriter``: ``save`` only enqueues,
+and the writer drains the queue with ``executemany`` in one transaction per
+batch over a single long-lived WAL connection owned by a dedicated thread, so
+scans never block the event loop on disk fsync. Batches are flushed when
+``HISTORY_BATCH_SIZE`` rows are queued, every ``HISTORY_FLUSH_INTERVAL`` seconds,
+and on shutdown. When the writer is not running (scripts, tests) ``save`` writes
+synchronously.
+
+Rows are stored with an epoch-millisecond ``ts`` and a ``symbol_id`` from the
+``symbols`` dictionary table (see ``backend.db.migrations``); pending schema
+migrations are applied on first use. Each batch also updates the 1m/5m/1h
+rollups (``backend.db.rollups``) in the same transaction, and every
+``HISTORY_PRUNE_INTERVAL`` seconds the writer moves raw rows past the retention
+window to the per-day cold archive (``backend.services.history_archive``), or
+deletes them when archiving is disabled. ``get_history`` and ``get_raw`` read
+both tiers.
+``get_series`` serves a time range from raw rows or the rollup resolution that
+fits the requested number of points.
+
+Environment variables:
+    DATABASE_URL: sqlite database URL (default sqlite:///backend/db/mipilot.db)
+    HISTORY_BATCH_SIZE: rows per write transaction (default 100)
+    HISTORY_FLUSH_INTERVAL: max seconds a row waits in the queue (default 1.0)
+    HISTORY_QUEUE_SIZE: max queued rows before new rows are dropped (default 10000)
+    HISTORY_PRUNE_INTERVAL: seconds between raw row retention passes (default 3600)
+
+Example usage:
+    history = PriceHistoryService()
+    await history.start()
+    history.save(symbol="WIF", price_cex=1.0, price_dex=1.01, spread_pct=1.0)
+    print(history.writer.stats())
+    await history.stop()
+"""
+import asyncio
+import logging
 import sqlite3
-from typing import List, Dict, Any
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple, Union
+from datetime import datetime, timezone
 import os
 
+from backend.db.migrations import migrate
+from backend.services.history_archive import DAY_MS, HISTORY_ARCHIVE_DIR, HISTORY_ARCHIVE_ENABLED, HistoryArchive
+from backend.db.rollups import (
+    HISTORY_RAW_RETENTION_HOURS, SERIES, apply_rollups, pick_resolution, prune_raw, query_rollups,
+)
+
+logger = logging.getLogger(__name__)
+
 DB_PATH = os.getenv("DATABASE_URL", "backend/db/mipilot.db").replace("sqlite:///", "")
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "100"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1.0"))
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+HISTORY_PRUNE_INTERVAL = float(os.getenv("HISTORY_PRUNE_INTERVAL", "3600"))
+
+INSERT_SQL = """
+    INSERT INTO price_history (symbol_id, ts, price_cex, price_dex, spread_pct, volume_cex, volume_dex, source_dex, is_valid, error_message)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+RAW_COLUMNS = "id, ts, price_cex, price_dex, spread_pct, volume_cex, volume_dex, is_valid, source_dex, error_message"
+
+# (symbol, ts, price_cex, price_dex, spread_pct, volume_cex, volume_dex, source_dex, is_valid, error_message)
+Row = Tuple[Any, ...]
+
+
+def to_epoch_ms(value: Union[datetime, str, int, float, None]) -> int:
+    """Epoch milliseconds for a datetime, "YYYY-MM-DD HH:MM:SS"/ISO string (naive means UTC) or number."""
+    if value is None or value == "":
+        return int(time.time() * 1000)
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def format_ts(ts: int) -> str:
+    return datetime.fromtimestamp(ts / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def resolve_symbol_ids(conn: sqlite3.Connection, symbols: Iterable[str], cache: Dict[str, int]) -> Dict[str, int]:
+    """Map symbols to ids from the symbols dictionary table, registering new ones (committed)."""
+    missing = sorted({s for s in symbols if s not in cache})
+    if missing:
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO symbols (symbol) VALUES (?)", [(s,) for s in missing])
+        placeholders = ",".join("?" * len(missing))
+        for symbol, symbol_id in conn.execute(
+            f"SELECT symbol, id FROM symbols WHERE symbol IN ({placeholders})", missing
+        ):
+            cache[symbol] = symbol_id
+    return cache
+
+
+def insert_rows(conn: sqlite3.Connection, rows: List[Row], symbol_ids: Dict[str, int]):
+    resolve_symbol_ids(conn, (row[0] for row in rows), symbol_ids)
+    params = [(symbol_ids[row[0]],) + tuple(row[1:]) for row in rows]
+    with conn:  # One transaction per batch, rollups included
+        conn.executemany(INSERT_SQL, params)
+        apply_rollups(conn, params)
+
+
+class PriceHistoryWriter:
+    def __init__(self, db_path: str = DB_PATH, batch_size: int = HISTORY_BATCH_SIZE,
+                 flush_interval: float = HISTORY_FLUSH_INTERVAL, max_queue: int = HISTORY_QUEUE_SIZE,
+                 retention_hours: float = HISTORY_RAW_RETENTION_HOURS, prune_interval: float = HISTORY_PRUNE_INTERVAL,
+                 archive: Optional[HistoryArchive] = None):
+        self.db_path = db_path
+        self.retention_hours = retention_hours
+        self.prune_interval = prune_interval
+        self.archive = archive
+        self._last_prune: Optional[float] = None
+        self.pruned = 0
+        self.archived = 0
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[Row] = []
+        # One thread owns the connection, so it is never shared between threads
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._symbol_ids: Dict[str, int] = {}
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            migrate(self._conn)
+        return self._conn
+
+    def _write(self, rows: List[Row]):
+        conn = self._connect()
+        insert_rows(conn, rows, self._symbol_ids)
+        if self._last_prune is None or time.monotonic() - self._last_prune >= self.prune_interval:
+            self._last_prune = time.monotonic()
+            self._expire(conn)
+
+    def _expire(self, conn: sqlite3.Connection):
+        """Move raw rows past the retention window to the archive (or delete them when archiving is off)."""
+        cutoff = int((time.time() - self.retention_hours * 3600) * 1000)
+        try:
+            if self.archive is not None:
+                self.archived += self.archive.archive(conn, cutoff)
+            else:
+                self.pruned += prune_raw(conn, cutoff)
+        except Exception as e:
+            logger.error(f"Price history retention pass failed: {e}")
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def put(self, row: Row):
+        """Enqueue a row without waiting; drops it if the queue is full."""
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Price history queue full ({self.max_queue}), dropping row for {row[0]}")
+
+    async def _flush(self, rows: List[Row]):
+        if not rows:
+            return
+        started = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._write, rows)
+        except Exception as e:
+            self.flush_errors += 1
+            logger.error(f"Failed to write {len(rows)} price history rows: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.written += len(rows)
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def _drain(self, rows: List[Row]):
+        while len(rows) < self.batch_size and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                self._drain(self._batch)
+                timeout = deadline - loop.time()
+                if len(self._batch) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._batch = self._batch, []
+            # A started write always completes, even if shutdown cancels us meanwhile
+            await asyncio.shield(self._flush(batch))
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-history")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush all queued rows and close the connection."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Write rows already taken off the queue plus everything still queued
+        rows, self._batch = self._batch, []
+        while True:
+            self._drain(rows)
+            if not rows:
+                break
+            await self._flush(rows)
+            rows = []
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "pruned": self.pruned,
+            "archived": self.archived,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+
+def default_archive(db_path: str) -> Optional[HistoryArchive]:
+    if not HISTORY_ARCHIVE_ENABLED:
+        return None
+    return HistoryArchive(HISTORY_ARCHIVE_DIR or os.path.join(os.path.dirname(db_path) or ".", "archive"))
+
 
 class PriceHistoryService:
-    def __init__(self, db_path: str = DB_PATH):
+    def __init__(self, db_path: str = DB_PATH, writer: Optional[PriceHistoryWriter] = None,
+                 archive: Optional[HistoryArchive] = None):
         self.db_path = db_path
+        self.archive = archive or default_archive(db_path)
+        self.writer = writer or PriceHistoryWriter(db_path, archive=self.archive)
+        self._symbol_ids: Dict[str, int] = {}
+        self._migrated = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        if not self._migrated:
+            # Schema upgrades are applied lazily on first use
+            migrate(conn)
+            self._migrated = True
+        return conn
+
+    def _ensure_schema(self):
+        self._connect().close()
+
+    async def start(self):
+        await asyncio.to_thread(self._ensure_schema)
+        await self.writer.start()
+
+    async def stop(self):
+        await self.writer.stop()
 
     def save(self, symbol: str, price_cex: float, price_dex: float, spread_pct: float, timestamp: datetime = None,
              volume_cex: float = None, volume_dex: float = None, source_dex: str = None,
              is_valid: bool = True, error_message: str = None):
-        if timestamp is None:
-            timestamp = datetime.utcnow().isoformat()
         spread_pct = round(spread_pct, 4) if spread_pct is not None else None
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                """
-                INSERT INTO price_history (symbol, price_cex, price_dex, spread_pct, volume_cex, volume_dex, source_dex, is_valid, error_message, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (symbol, price_cex, price_dex, spread_pct, volume_cex, volume_dex, source_dex, int(is_valid), error_message, timestamp)
-            )
-            conn.commit()
+        row = (symbol, to_epoch_ms(timestamp), price_cex, price_dex, spread_pct, volume_cex, volume_dex, source_dex, int(is_valid), error_message)
+        if self.writer.running:
+            self.writer.put(row)
+            return
+        conn = self._connect()
+        try:
+            insert_rows(conn, [row], self._symbol_ids)
+        finally:
+            conn.close()
 
     def get_history(self, symbol: str, limit: int = 100) -> List[Dict[str, Any]]:
-        with sqlite3.connect(self.db_path) as conn:
+        conn = self._connect()
+        try:
             cur = conn.execute(
                 """
-                SELECT symbol, price_cex, price_dex, spread_pct, volume_cex, volume_dex, source_dex, is_valid, error_message, timestamp, created_at
-                FROM price_history
-                WHERE symbol = ?
-                ORDER BY timestamp DESC
+                SELECT s.symbol, p.price_cex, p.price_dex, p.spread_pct, p.volume_cex, p.volume_dex, p.source_dex,
+                       p.is_valid, p.error_message, p.ts, p.created_at
+                FROM price_history p JOIN symbols s ON s.id = p.symbol_id
+                WHERE p.symbol_id = (SELECT id FROM symbols WHERE symbol = ?)
+                ORDER BY p.ts DESC
                 LIMIT ?
                 """,
                 (symbol, limit)
             )
             rows = cur.fetchall()
+        finally:
+            conn.close()
         # Return as list of dicts, most recent first
-        return [
+        history = [
             {
                 "symbol": row[0],
                 "price_cex": row[1],
@@ -50,8 +339,159 @@ class PriceHistoryService:
                 "source_dex": row[6],
                 "is_valid": bool(row[7]),
                 "error_message": row[8],
-                "timestamp": row[9],
+                "timestamp": format_ts(row[9]),
                 "created_at": row[10],
             }
             for row in rows
         ]
+        if len(history) < limit and self.archive is not None:
+            # Continue into the cold tier, newest day first
+            before = rows[-1][9] - 1 if rows else int(time.time() * 1000)
+            for day_start in reversed(self.archive.day_starts()):
+                if day_start > before:
+                    continue
+                archived = self.archive.read_rows(symbol, day_start, min(before, day_start + DAY_MS - 1))
+                for row in reversed(archived):
+                    history.append(self._cold_row(row))
+                    if len(history) >= limit:
+                        return history
+        return history
+
+    @staticmethod
+    def _cold_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(row)
+        row.pop("id", None)
+        row["timestamp"] = format_ts(row.pop("ts"))
+        row["created_at"] = None
+        return row
+
+    @staticmethod
+    def _raw_row(symbol: str, row: Sequence[Any]) -> Dict[str, Any]:
+        return {
+            "id": row[0], "symbol": symbol, "ts": row[1], "price_cex": row[2], "price_dex": row[3],
+            "spread_pct": row[4], "volume_cex": row[5], "volume_dex": row[6], "is_valid": bool(row[7]),
+            "source_dex": row[8], "error_message": row[9],
+        }
+
+    def get_raw(self, symbol: str, start: int, end: int) -> List[Dict[str, Any]]:
+        """Raw rows with start <= ts <= end from the archive and SQLite, oldest first."""
+        rows = self.archive.read_rows(symbol, start, end) if self.archive is not None else []
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                f"""
+                SELECT {RAW_COLUMNS}
+                FROM price_history
+                WHERE symbol_id = (SELECT id FROM symbols WHERE symbol = ?) AND ts BETWEEN ? AND ?
+                ORDER BY ts, id
+                """,
+                (symbol, start, end),
+            )
+            rows.extend(self._raw_row(symbol, row) for row in cur)
+        finally:
+            conn.close()
+        return rows
+
+    def get_page(self, symbol: str, start: int, end: int, limit: int = 100,
+                 before: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+        """
+        One page of raw rows, newest first, by keyset pagination over (ts, id).
+        Args:
+            start, end: inclusive epoch-ms bounds
+            limit: page size
+            before: (ts, id) of the last row of the previous page
+        """
+        before_ts, before_id = before if before is not None else (end, float("inf"))
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                f"""
+                SELECT {RAW_COLUMNS}
+                FROM price_history
+                WHERE symbol_id = (SELECT id FROM symbols WHERE symbol = ?) AND ts >= ? AND ts <= ?
+                  AND (ts < ? OR (ts = ? AND id < ?))
+                ORDER BY ts DESC, id DESC
+                LIMIT ?
+                """,
+                (symbol, start, end, before_ts, before_ts, before_id, limit),
+            )
+            page = [self._raw_row(symbol, row) for row in cur]
+        finally:
+            conn.close()
+        if len(page) < limit and self.archive is not None:
+            # Continue into the cold tier, newest day first
+            upper = min(end, before_ts)
+            for day_start in reversed(self.archive.day_starts()):
+                if day_start > upper or day_start + DAY_MS <= start:
+                    continue
+                archived = self.archive.read_rows(symbol, max(start, day_start), min(upper, day_start + DAY_MS - 1))
+                for row in reversed(archived):
+                    if (row["ts"], row["id"]) >= (before_ts, before_id):
+                        continue
+                    page.append(row)
+                    if len(page) >= limit:
+                        return page
+        return page
+
+    def get_rollups(self, symbol: str, resolution: str, start: int, end: int) -> List[Dict[str, Any]]:
+        """Rollup buckets of one resolution ("1m", "5m", "1h") overlapping [start, end], oldest first."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT id FROM symbols WHERE symbol = ?", (symbol,)).fetchone()
+            return query_rollups(conn, row[0], resolution, start, end) if row else []
+        finally:
+            conn.close()
+
+    def get_series(self, symbol: str, start: Optional[int] = None, end: Optional[int] = None,
+                   max_points: int = 500) -> Dict[str, Any]:
+        """
+        Spread/CEX/DEX series for a time range at the finest resolution that fits ``max_points``.
+        Args:
+            symbol: token symbol
+            start, end: epoch milliseconds (default: the last 24 hours)
+            max_points: upper bound on returned points (exceeded only when the range spans
+                more than max_points buckets of the coarsest resolution)
+        Returns:
+            {"symbol", "resolution": "raw" | "1m" | "5m" | "1h", "points": [{ts, timestamp, count,
+            spread_open/high/low/close, cex_*, dex_*}, ...]} oldest first
+        """
+        end = int(time.time() * 1000) if end is None else end
+        start = end - 24 * 3_600_000 if start is None else start
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT id FROM symbols WHERE symbol = ?", (symbol,)).fetchone()
+            if row is None:
+                return {"symbol": symbol, "resolution": "raw", "points": []}
+            symbol_id = row[0]
+            raw_from = int((time.time() - self.writer.retention_hours * 3600) * 1000)
+            raw_count = None
+            if start >= raw_from:
+                raw_count = conn.execute(
+                    "SELECT COUNT(*) FROM price_history WHERE symbol_id = ? AND ts BETWEEN ? AND ? AND is_valid = 1",
+                    (symbol_id, start, end),
+                ).fetchone()[0]
+            if raw_count is not None and raw_count <= max_points:
+                resolution = "raw"
+                cur = conn.execute(
+                    """
+                    SELECT ts, spread_pct, price_cex, price_dex FROM price_history
+                    WHERE symbol_id = ? AND ts BETWEEN ? AND ? AND is_valid = 1
+                    ORDER BY ts
+                    """,
+                    (symbol_id, start, end),
+                )
+                points = []
+                for ts, *values in cur:
+                    point = {"ts": ts, "count": 1}
+                    for series, value in zip(SERIES, values):
+                        point.update({f"{series}_open": value, f"{series}_high": value,
+                                      f"{series}_low": value, f"{series}_close": value})
+                    points.append(point)
+            else:
+                resolution = pick_resolution(start, end, max_points)
+                points = query_rollups(conn, symbol_id, resolution, start, end)
+        finally:
+            conn.close()
+        for point in points:
+            point["timestamp"] = format_ts(point["ts"])
+        return {"symbol": symbol, "resolution": resolution, "points": points}
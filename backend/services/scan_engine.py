@@ -0,0 +1,91 @@
+"""
+Concurrent multi-token scan engine with bounded fan-out.
+
+Runs a per-token coroutine (e.g. ``PriceComparatorService.compare``) for many
+tokens at once, limited by a semaphore, with a timeout per token. Results can be
+consumed in completion order (``iter_scan``) or as one sorted batch (``scan``).
+
+Environment variables:
+    SCAN_CONCURRENCY: max tokens compared at the same time (default 10)
+    SCAN_TOKEN_TIMEOUT: seconds allowed per token before it is reported as failed (default 15)
+
+Example usage:
+    engine = ScanEngine()
+    results = await engine.scan(["WIF", "JUP"], service.compare, key=lambda r: abs(r["spread_pct"]))
+"""
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "10"))
+SCAN_TOKEN_TIMEOUT = float(os.getenv("SCAN_TOKEN_TIMEOUT", "15"))
+
+Worker = Callable[[str], Awaitable[Any]]
+ErrorHandler = Callable[[str, BaseException], Any]
+
+
+class ScanEngine:
+    def __init__(self, concurrency: int = SCAN_CONCURRENCY, timeout: Optional[float] = SCAN_TOKEN_TIMEOUT):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    async def _run_one(self, symbol: str, worker: Worker, semaphore: asyncio.Semaphore,
+                       on_error: Optional[ErrorHandler]) -> Tuple[str, Any]:
+        async with semaphore:
+            try:
+                if self.timeout:
+                    result = await asyncio.wait_for(worker(symbol), timeout=self.timeout)
+                else:
+                    result = await worker(symbol)
+            except asyncio.TimeoutError as e:
+                logger.error(f"Scan timed out for {symbol} after {self.timeout}s")
+                if on_error is None:
+                    raise
+                result = on_error(symbol, e)
+            except Exception as e:
+                logger.error(f"Scan failed for {symbol}: {e}")
+                if on_error is None:
+                    raise
+                result = on_error(symbol, e)
+        return symbol, result
+
+    async def iter_scan(self, symbols: Iterable[str], worker: Worker,
+                        on_error: Optional[ErrorHandler] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ``(symbol, result)`` pairs as soon as each token finishes."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [
+            asyncio.ensure_future(self._run_one(symbol, worker, semaphore, on_error))
+            for symbol in dict.fromkeys(symbols)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def scan(self, symbols: Iterable[str], worker: Worker, on_error: Optional[ErrorHandler] = None,
+                   key: Optional[Callable[[Any], Any]] = None, reverse: bool = True) -> List[Any]:
+        """
+        Run ``worker`` for every symbol and return all results as one batch.
+        Args:
+            symbols: tokens to scan (duplicates are scanned once)
+            worker: coroutine function called with each symbol
+            on_error: maps (symbol, exception) to a result; if None, errors are raised
+            key: sort key for the batch; if None, results keep the input order
+            reverse: sort descending (default, largest spread first)
+        """
+        symbols = list(dict.fromkeys(symbols))
+        by_symbol = {}
+        async for symbol, result in self.iter_scan(symbols, worker, on_error):
+            by_symbol[symbol] = result
+        results = [by_symbol[symbol] for symbol in symbols]
+        if key is not None:
+            results.sort(key=key, reverse=reverse)
+        return results
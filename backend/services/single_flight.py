@@ -0,0 +1,90 @@
+"""
+Request coalescing (single-flight) for in-flight upstream work.
+
+Concurrent callers asking for the same key await one shared call instead of
+each starting their own upstream requests. After the call completes its result
+is reused for a short freshness window; errors are never reused.
+
+The shared call runs as its own task that every caller awaits through
+``asyncio.shield``: cancelling one caller (e.g. a request timeout) only cancels
+that caller, and the shared task is cancelled once no callers are left.
+
+Environment variables:
+    COALESCE_FRESH_FOR: seconds a completed result is reused (default 2)
+
+Example usage:
+    flights = SingleFlight()
+    data = await flights.do(("compare", "WIF"), lambda: comparator.compare_price("WIF"))
+"""
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+COALESCE_FRESH_FOR = float(os.getenv("COALESCE_FRESH_FOR", "2"))
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, fresh_for: float = COALESCE_FRESH_FOR):
+        self.fresh_for = fresh_for
+        self._in_flight: Dict[Hashable, _Flight] = {}
+        self._done: Dict[Hashable, Tuple[float, Any]] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a call for ``key`` is in flight."""
+        return key in self._in_flight
+
+    def _prune(self, now: float):
+        expired = [key for key, (done_at, _) in self._done.items() if now - done_at > self.fresh_for]
+        for key in expired:
+            del self._done[key]
+
+    def _finished(self, key: Hashable, flight: _Flight, fresh_for: float):
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        task = flight.task
+        if task.cancelled():
+            return
+        if task.exception() is None and fresh_for > 0:  # Marks errors retrieved as well
+            self._done[key] = (time.monotonic(), task.result())
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], fresh_for: Optional[float] = None) -> Any:
+        """Run ``fn`` once for ``key``; concurrent and recent callers get the same result."""
+        fresh_for = self.fresh_for if fresh_for is None else fresh_for
+        now = time.monotonic()
+        done = self._done.get(key)
+        if done is not None and now - done[0] <= fresh_for:
+            self.shared += 1
+            return done[1]
+
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.shared += 1
+        else:
+            self._prune(now)
+            self.calls += 1
+
+            async def run():
+                return await fn()
+
+            flight = self._in_flight[key] = _Flight(asyncio.ensure_future(run()))
+            flight.task.add_done_callback(lambda _: self._finished(key, flight, fresh_for))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller is gone (cancelled); nobody needs the result
+                flight.task.cancel()
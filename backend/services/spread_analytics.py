@@ -0,0 +1,142 @@
+"""
+Spread analytics over price history.
+
+For every token the 1-minute spread rollups of the lookback window are turned
+into a regular series and analysed with vectorized NumPy:
+
+- rolling mean and standard deviation of ``spread_pct`` over ``ANALYTICS_WINDOW`` samples
+- z-score of the current spread against the latest rolling window
+- percentile of the current spread within the lookback
+- mean-reversion half-life from an AR(1) fit of the spread changes
+
+``SpreadAnalytics.for_snapshot`` uses the live spreads of a market snapshot as
+"current" values and caches the result per snapshot version, so every request
+for the same snapshot shares one computation.
+
+Environment variables:
+    ANALYTICS_WINDOW: rolling window in 1-minute samples (default 60)
+    ANALYTICS_LOOKBACK_HOURS: history used per token (default 24)
+
+Example usage:
+    analytics = SpreadAnalytics(history_service)
+    stats = await analytics.for_snapshot(snapshot)
+    print(stats["WIF"]["zscore"], stats["WIF"]["half_life_min"])
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from backend.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_WINDOW = int(os.getenv("ANALYTICS_WINDOW", "60"))
+ANALYTICS_LOOKBACK_HOURS = float(os.getenv("ANALYTICS_LOOKBACK_HOURS", "24"))
+MIN_SAMPLES = 10
+
+
+def rolling_mean_std(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Rolling mean and (population) standard deviation; element i covers values[i:i + window]."""
+    values = np.asarray(values, dtype=np.float64)
+    window = min(window, len(values))
+    if window == 0:
+        return np.array([]), np.array([])
+    # Shift by the first value so cumulative sums of squares stay well conditioned
+    shifted = values - values[0]
+    sums = np.concatenate(([0.0], np.cumsum(shifted)))
+    squares = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+    mean = (sums[window:] - sums[:-window]) / window
+    var = (squares[window:] - squares[:-window]) / window - mean * mean
+    return mean + values[0], np.sqrt(np.maximum(var, 0.0))
+
+
+def half_life(values: np.ndarray) -> Optional[float]:
+    """Mean-reversion half-life in samples from an AR(1) fit, None if the series does not revert."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 3:
+        return None
+    lagged = values[:-1] - values[:-1].mean()
+    delta = np.diff(values)
+    denominator = np.dot(lagged, lagged)
+    if denominator == 0:
+        return None
+    beta = np.dot(lagged, delta - delta.mean()) / denominator
+    phi = 1.0 + beta
+    if not 0.0 < phi < 1.0:
+        return None
+    return -math.log(2) / math.log(phi)
+
+
+def percentile_of(values: np.ndarray, value: float) -> float:
+    """Percent of values below ``value`` (ties count half)."""
+    values = np.asarray(values, dtype=np.float64)
+    below = np.count_nonzero(values < value)
+    equal = np.count_nonzero(values == value)
+    return 100.0 * (below + 0.5 * equal) / len(values)
+
+
+def spread_stats(ts: np.ndarray, spreads: np.ndarray, current: Optional[float] = None,
+                 window: int = ANALYTICS_WINDOW) -> Optional[Dict[str, Any]]:
+    """Summary statistics for one token, or None with too little history."""
+    ts = np.asarray(ts, dtype=np.float64)
+    spreads = np.asarray(spreads, dtype=np.float64)
+    if len(spreads) < MIN_SAMPLES:
+        return None
+    current = float(spreads[-1]) if current is None else float(current)
+    mean, std = rolling_mean_std(spreads, window)
+    samples_to_minutes = float(np.median(np.diff(ts))) / 60_000 if len(ts) > 1 else 1.0
+    hl = half_life(spreads)
+    return {
+        "samples": int(len(spreads)),
+        "spread": current,
+        "mean": float(mean[-1]),
+        "std": float(std[-1]),
+        "zscore": float((current - mean[-1]) / std[-1]) if std[-1] > 0 else None,
+        "percentile": percentile_of(spreads, current),
+        "half_life_min": hl * samples_to_minutes if hl is not None else None,
+    }
+
+
+class SpreadAnalytics:
+    def __init__(self, history_service, window: int = ANALYTICS_WINDOW,
+                 lookback_hours: float = ANALYTICS_LOOKBACK_HOURS):
+        self.history_service = history_service
+        self.window = window
+        self.lookback_hours = lookback_hours
+        self.flights = SingleFlight(fresh_for=0)
+        self._cached: Optional[Tuple[int, Dict[str, Dict[str, Any]]]] = None
+
+    def compute(self, currents: Dict[str, Optional[float]]) -> Dict[str, Dict[str, Any]]:
+        """Stats for every symbol in ``currents`` ({symbol: live spread or None}); blocking."""
+        end = int(time.time() * 1000)
+        start = end - int(self.lookback_hours * 3_600_000)
+        results = {}
+        for symbol, current in currents.items():
+            buckets = self.history_service.get_rollups(symbol, "1m", start, end)
+            ts = np.fromiter((b["ts"] for b in buckets if b["spread_close"] is not None), dtype=np.float64)
+            spreads = np.fromiter((b["spread_close"] for b in buckets if b["spread_close"] is not None), dtype=np.float64)
+            stats = spread_stats(ts, spreads, current, self.window)
+            if stats is not None:
+                results[symbol] = stats
+        return results
+
+    async def for_snapshot(self, snapshot, symbols: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Stats for the valid tokens of a snapshot, computed once per snapshot version."""
+        cached = self._cached
+        if cached is None or cached[0] != snapshot.version:
+            currents = {r["token"]: r.get("spread_pct") for r in snapshot.valid()}
+            results = await self.flights.do(
+                ("analytics", snapshot.version), lambda: asyncio.to_thread(self.compute, currents)
+            )
+            if self._cached is None or self._cached[0] < snapshot.version:
+                self._cached = (snapshot.version, results)
+            cached = (snapshot.version, results)
+        if symbols is None:
+            return cached[1]
+        wanted = {s.upper() for s in symbols}
+        return {symbol: stats for symbol, stats in cached[1].items() if symbol in wanted}
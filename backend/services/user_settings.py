@@ -0,0 +1,214 @@
+"""
+Persistent per-user bot settings with a write-back in-memory cache.
+
+Settings live in the ``users`` table (schema version 4) in a compact encoding:
+notification and trading-mode flags packed into one integer, and tracked tokens
+as a bitmask with bit ``symbol_id - 1`` set for every token (ids from the
+``symbols`` table), NULL meaning "every token".
+
+All rows are loaded into memory on start, so handler lookups are a dict access.
+Settings are immutable; ``update`` replaces them in the cache and marks the user
+dirty, and a background task writes dirty users in one transaction every
+``USER_SETTINGS_FLUSH_INTERVAL`` seconds (and once more on stop).
+
+Environment variables:
+    USER_SETTINGS_FLUSH_INTERVAL: seconds between background writes (default 2)
+    DATABASE_URL: sqlite database URL (default sqlite:///backend/db/mipilot.db)
+
+Example usage:
+    store = UserSettingsStore()
+    await store.start()
+    store.update(user_id, spread_threshold=2.0)
+    print(store.get(user_id).notify_enabled)
+    await store.stop()
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+from dataclasses import dataclass, replace
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from backend.db.migrations import migrate
+from backend.services.price_history import DB_PATH, resolve_symbol_ids
+
+logger = logging.getLogger(__name__)
+
+USER_SETTINGS_FLUSH_INTERVAL = float(os.getenv("USER_SETTINGS_FLUSH_INTERVAL", "2"))
+
+NOTIFY_FLAG = 1
+MODE_SHIFT = 1
+MODES = ("safe", "degen")
+
+UPSERT_SQL = """
+INSERT INTO users (user_id, flags, spread_threshold, tracked_mask) VALUES (?, ?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET
+    flags = excluded.flags,
+    spread_threshold = excluded.spread_threshold,
+    tracked_mask = excluded.tracked_mask
+"""
+
+
+@dataclass(frozen=True)
+class UserSettings:
+    notify_enabled: bool = True
+    spread_threshold: float = 1.0
+    mode: str = "safe"
+    tracked_tokens: Optional[FrozenSet[str]] = None  # None: every supported token
+
+
+DEFAULT_SETTINGS = UserSettings()
+
+
+def encode_flags(settings: UserSettings) -> int:
+    mode = MODES.index(settings.mode) if settings.mode in MODES else 0
+    return (NOTIFY_FLAG if settings.notify_enabled else 0) | (mode << MODE_SHIFT)
+
+
+def decode_flags(flags: int) -> Tuple[bool, str]:
+    mode = (flags >> MODE_SHIFT) & 0b11
+    return bool(flags & NOTIFY_FLAG), MODES[mode] if mode < len(MODES) else MODES[0]
+
+
+def encode_mask(symbols: Optional[Iterable[str]], symbol_ids: Dict[str, int]) -> Optional[bytes]:
+    if symbols is None:
+        return None
+    mask = 0
+    for symbol in symbols:
+        mask |= 1 << (symbol_ids[symbol] - 1)
+    return mask.to_bytes(max(1, (mask.bit_length() + 7) // 8), "little")
+
+
+def decode_mask(blob: Optional[bytes], id_symbols: Dict[int, str]) -> Optional[FrozenSet[str]]:
+    if blob is None:
+        return None
+    mask = int.from_bytes(blob, "little")
+    symbols = set()
+    while mask:
+        low = mask & -mask
+        symbol = id_symbols.get(low.bit_length())
+        if symbol is not None:
+            symbols.add(symbol)
+        mask ^= low
+    return frozenset(symbols)
+
+
+class UserSettingsStore:
+    def __init__(self, db_path: str = DB_PATH, flush_interval: float = USER_SETTINGS_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._settings: Dict[int, UserSettings] = {}
+        self._dirty: set = set()
+        self._symbol_ids: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.writes = 0
+        self.flush_errors = 0
+
+    # --- cache ---
+
+    def get(self, user_id: int) -> UserSettings:
+        """Settings of a user, defaults if the user has none stored."""
+        return self._settings.get(user_id, DEFAULT_SETTINGS)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._settings
+
+    def items(self) -> Iterator[Tuple[int, UserSettings]]:
+        return iter(list(self._settings.items()))
+
+    def ensure(self, user_id: int) -> UserSettings:
+        """Settings of a user, storing the defaults for a new one."""
+        if user_id not in self._settings:
+            return self.update(user_id)
+        return self._settings[user_id]
+
+    def update(self, user_id: int, **changes) -> UserSettings:
+        """Change settings fields; the new settings are written in the next background flush."""
+        if "tracked_tokens" in changes and changes["tracked_tokens"] is not None:
+            changes["tracked_tokens"] = frozenset(s.upper() for s in changes["tracked_tokens"])
+        settings = replace(self.get(user_id), **changes)
+        self._settings[user_id] = settings
+        self._dirty.add(user_id)
+        return settings
+
+    # --- storage ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def load(self):
+        """Read every stored user into the cache (blocking)."""
+        migrate(self.db_path)
+        conn = self._connect()
+        try:
+            id_symbols = {symbol_id: symbol for symbol_id, symbol in conn.execute("SELECT id, symbol FROM symbols")}
+            self._symbol_ids = {symbol: symbol_id for symbol_id, symbol in id_symbols.items()}
+            rows = conn.execute("SELECT user_id, flags, spread_threshold, tracked_mask FROM users").fetchall()
+        finally:
+            conn.close()
+        for user_id, flags, threshold, mask in rows:
+            if user_id in self._dirty:
+                continue  # Changed before the load finished
+            notify_enabled, mode = decode_flags(flags)
+            self._settings[user_id] = UserSettings(notify_enabled, threshold, mode, decode_mask(mask, id_symbols))
+        logger.info(f"Loaded settings for {len(rows)} users")
+
+    def _write(self, rows: List[Tuple[int, UserSettings]]):
+        conn = self._connect()
+        try:
+            symbols = set()
+            for _, settings in rows:
+                symbols.update(settings.tracked_tokens or ())
+            resolve_symbol_ids(conn, symbols, self._symbol_ids)
+            params = [
+                (user_id, encode_flags(s), s.spread_threshold, encode_mask(s.tracked_tokens, self._symbol_ids))
+                for user_id, s in rows
+            ]
+            with conn:
+                conn.executemany(UPSERT_SQL, params)
+        finally:
+            conn.close()
+
+    async def flush(self):
+        """Write every dirty user in one transaction."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        rows = [(user_id, self._settings[user_id]) for user_id in dirty]
+        try:
+            await asyncio.to_thread(self._write, rows)
+            self.writes += len(rows)
+        except asyncio.CancelledError:
+            # Rewritten by the final flush; upserts are idempotent
+            self._dirty |= dirty
+            raise
+        except Exception as e:
+            self.flush_errors += 1
+            self._dirty |= dirty
+            logger.error(f"Error saving user settings: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            await asyncio.to_thread(self.load)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self):
+        return {"users": len(self._settings), "dirty": len(self._dirty), "writes": self.writes,
+                "flush_errors": self.flush_errors}
@@ -2,15 +2,8 @@ import os
 import sys
 import asyncio
 import logging
-from pathlib import Path
 import aiohttp
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-import time
-from selenium.webdriver.common.by import By
 import shutil
-from datetime import datetime, timedelta
 import chromedriver_autoinstaller
 import httpx
 import openai
@@ -48,13 +41,26 @@ logger.add(
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from aiogram import Bot, Dispatcher, F, types
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery, BufferedInputFile
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
 from dotenv import load_dotenv
 from backend.services.price_comparator_service import PriceComparatorService
 from backend.ai.alpha_insight_service import AlphaInsightService
 from backend.services.price_history import PriceHistoryService
+from backend.clients.transport import open_transport, close_transport
+from backend.services.okx_stream import OKXTickerStream, OKX_WS_ENABLED
+from backend.services.market_snapshot import SnapshotScheduler
+from backend.services.spread_analytics import SpreadAnalytics
+from backend.services.alerts import AlertEngine
+from backend.services.user_settings import UserSettingsStore
+from backend.services.chart_renderer import ChartRenderer
+from backend.services.market_chart import MarketChartService, CHART_MODE, CHART_SCREENSHOT_FALLBACK
+from telegram.streaming import render_stream
+from telegram.screenshots import BrowserPool, PoolBusyError
+from telegram.chart_cache import ChartCache
+from telegram.send_queue import SendScheduler
+from telegram.webhook import WebhookHandler, TELEGRAM_WEBHOOK_URL
 
 # Load environment variables
 load_dotenv()
@@ -65,17 +71,21 @@ if not TELEGRAM_BOT_TOKEN:
     logger.error("TELEGRAM_BOT_TOKEN not set in .env file")
     sys.exit(1)
 
-# Create necessary directories
-CHARTS_DIR = Path("/data/charts")
-CHARTS_DIR.mkdir(parents=True, exist_ok=True)
-
 # Services
 price_service = PriceComparatorService()
 ai_service = AlphaInsightService()
 history_service = PriceHistoryService()
-
-# User data storage
-user_data = {}
+okx_stream = OKXTickerStream(price_service.tokens) if OKX_WS_ENABLED else None
+market_snapshots = SnapshotScheduler(price_service)
+spread_analytics = SpreadAnalytics(history_service)
+chart_renderer = ChartRenderer()
+market_charts = MarketChartService(chart_renderer, history_service)
+browser_pool = BrowserPool()
+chart_cache = ChartCache()
+alert_engine = AlertEngine()
+
+# Per-user settings (SQLite-backed, cached in memory)
+user_settings = UserSettingsStore()
 
 # List of supported OKX tokens (lowercase)
 OKX_SUPPORTED_TOKENS = [
@@ -105,103 +115,6 @@ def get_settings_keyboard():
     ]
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
-def cleanup_old_charts(max_age_hours=24):
-    """Clean up charts older than max_age_hours."""
-    cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
-    for chart_file in CHARTS_DIR.glob("*.png"):
-        if datetime.fromtimestamp(chart_file.stat().st_mtime) < cutoff_time:
-            chart_file.unlink()
-
-def ensure_charts_dir():
-    """Ensure charts directory exists and is writable."""
-    try:
-        CHARTS_DIR.mkdir(parents=True, exist_ok=True)
-        # Test if directory is writable
-        test_file = CHARTS_DIR / ".test"
-        test_file.touch()
-        test_file.unlink()
-        return True
-    except Exception as e:
-        logger.error(f"Error creating/accessing charts directory: {e}")
-        return False
-
-def screenshot_okx_chart(url, out_file=None):
-    """Takes a screenshot of the OKX chart (TradingView chart only)."""
-    if not ensure_charts_dir():
-        logger.error("Cannot access charts directory")
-        return False
-
-    try:
-        # Generate unique filename with timestamp if not provided
-        if out_file is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            out_file = f"chart_{timestamp}.png"
-        
-        # Ensure out_file is just the filename, not a full path
-        out_file = Path(out_file).name
-        full_path = CHARTS_DIR / out_file
-
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--window-size=1920,1080")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        # Disable unnecessary features
-        options.add_argument("--disable-gpu")
-        options.add_argument("--disable-software-rasterizer")
-        options.add_argument("--disable-webrtc")
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-notifications")
-        options.add_argument("--disable-geolocation")
-        # Reduce network errors
-        options.add_argument("--dns-prefetch-disable")
-        options.add_argument("--no-proxy-server")
-        options.add_argument("--disable-web-security")
-        # Set user agent
-        options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-
-        driver = webdriver.Chrome(options=options)
-        try:
-            driver.get(url)
-            time.sleep(12)  # Wait for the page to load
-
-            # Find all iframes
-            iframes = driver.find_elements(By.TAG_NAME, "iframe")
-            found = False
-            for iframe in iframes:
-                name = iframe.get_attribute("name") or ""
-                id_ = iframe.get_attribute("id") or ""
-                src = iframe.get_attribute("src") or ""
-                if "tradingview" in name or "tradingview" in id_ or "tradingview" in src:
-                    driver.switch_to.frame(iframe)
-                    time.sleep(2)
-                    try:
-                        # Try to find the chart div
-                        chart = driver.find_element(By.CSS_SELECTOR, ".chart-container, .tv-lightweight-charts, .tradingview-widget-container")
-                        chart.screenshot(str(full_path))
-                    except Exception:
-                        # If the div is not found, screenshot the entire iframe
-                        driver.save_screenshot(str(full_path))
-                    found = True
-                    break
-
-            if not found:
-                raise Exception("TradingView chart iframe not found!")
-
-            # Verify the file was created
-            if not full_path.exists():
-                raise Exception(f"Screenshot file was not created: {full_path}")
-
-            return str(full_path)
-        except Exception as e:
-            logger.error(f"Error taking screenshot: {e}")
-            return None
-        finally:
-            driver.quit()
-    except Exception as e:
-        logger.error(f"Error in screenshot process: {e}")
-        return None
-
 # Utility functions
 def format_volume(vol):
     """Format volume with appropriate suffix (K, M)."""
@@ -224,6 +137,18 @@ def get_okx_trading_url(symbol):
     """Generate OKX trading URL for a symbol."""
     return f"https://www.okx.com/trade-spot/{symbol.lower()}-usdc"
 
+async def get_chart_png(symbol):
+    """Chart for a token: rendered from OKX candles, or an OKX screenshot in screenshot mode or as fallback."""
+    if CHART_MODE != "screenshot":
+        png = await market_charts.render(symbol)
+        if png or not CHART_SCREENSHOT_FALLBACK:
+            return png
+    try:
+        return await browser_pool.capture(get_okx_trading_url(symbol))
+    except PoolBusyError:
+        logger.warning(f"Screenshot pool busy, no chart for {symbol.upper()}")
+        return None
+
 async def safe_delete_message(bot, chat_id, message_id):
     """Safely delete a message with error handling."""
     try:
@@ -248,7 +173,7 @@ def format_price_message(data, include_insight=False):
         f"🕒 {time_str}\n"
     )
     
-    if include_insight and 'insight' in data:
+    if include_insight and data.get('insight'):
         message += f"{data['insight']}\n"
     
     message += f"👉 <a href='{okx_link}'>Trade on OKX</a>\n"
@@ -256,10 +181,58 @@ def format_price_message(data, include_insight=False):
     
     return message
 
+def zscore_rank(stats):
+    """Sort key for spread analytics: |z-score|, or -1 without enough history."""
+    if not stats or stats.get('zscore') is None:
+        return -1
+    return abs(stats['zscore'])
+
+def format_spread_stats(stats):
+    if not stats or stats.get('zscore') is None:
+        return ""
+    half_life = f" | ⏳ <b>Half-life:</b> {stats['half_life_min']:.0f}m" if stats.get('half_life_min') is not None else ""
+    return f"📐 <b>Z-score:</b> {stats['zscore']:+.2f} | <b>Pctl:</b> {stats['percentile']:.0f}{half_life}\n"
+
+def format_snapshot_age(snapshot):
+    """Footer line showing which market snapshot a reply is based on."""
+    return f"📡 <i>Market data #{snapshot.version}, updated {snapshot.age:.0f}s ago</i>\n"
+
 # Create bot instance at module level for global access
 bot = Bot(token=TELEGRAM_BOT_TOKEN)
 dp = Dispatcher()
 
+# Every request to a chat is paced; alerts go out in the broadcast lane behind handler replies
+send_scheduler = SendScheduler()
+bot.session.middleware(send_scheduler)
+
+def get_tracked_tokens(user_id):
+    """Tokens a user tracks; every supported token unless they picked some."""
+    tracked = user_settings.get(user_id).tracked_tokens
+    return set(price_service.tokens.keys()) if tracked is None else set(tracked)
+
+def sync_alerts(user_id):
+    """Mirror a user's notification settings into the alert engine."""
+    settings = user_settings.get(user_id)
+    if user_id in user_settings and settings.notify_enabled:
+        alert_engine.subscribe(user_id, settings.spread_threshold, get_tracked_tokens(user_id))
+    else:
+        alert_engine.unsubscribe(user_id)
+
+def format_alert(alert):
+    return (
+        f"🚨 <b>Spread alert: {alert.token} {alert.spread:+.2f}%</b> (your threshold {alert.threshold}%)\n\n"
+        + format_price_message(alert.data)
+    )
+
+async def on_snapshot_alerts(snapshot):
+    """Snapshot listener: evaluate subscriptions and queue the alerts as broadcasts."""
+    for alert in alert_engine.evaluate_snapshot(snapshot):
+        # A newer alert for the same user and token replaces one that has not been sent yet
+        send_scheduler.broadcast(
+            alert.user_id, format_alert(alert), collapse_key=(alert.user_id, alert.token),
+            parse_mode="HTML", disable_web_page_preview=True
+        )
+
 # Message counter middleware
 async def message_counter_middleware(handler, event, data):
     """Middleware to count bot messages"""
@@ -293,12 +266,9 @@ signal.signal(signal.SIGINT, signal_handler)
 # Message handlers
 async def send_welcome(message: Message):
     user_id = message.from_user.id
-    if user_id not in user_data:
-        user_data[user_id] = {
-            'notify_enabled': True,
-            'spread_threshold': 1.0,
-            'mode': 'safe'
-        }
+    if user_id not in user_settings:
+        user_settings.ensure(user_id)
+        sync_alerts(user_id)
     await message.answer(
         f"👋 Welcome to OKX Screener AI bot, {message.from_user.first_name}!\n\n"
         f"I provide real-time trading signals based on price spreads between OKX (CEX) and Jupiter (DEX), "
@@ -309,28 +279,17 @@ async def send_welcome(message: Message):
 
 async def refresh_now(message: Message):
     user_id = get_user_id(message)
-    tracked_tokens = user_data.get(user_id, {}).get('tracked_tokens', set(price_service.tokens.keys()))
+    tracked_tokens = get_tracked_tokens(user_id)
     await message.answer("🔄 Analyzing market opportunities...")
-    results = []
-    for symbol in tracked_tokens:
-        try:
-            data = await price_service.compare(symbol)
-            if data.get('is_valid'):
-                insight = await ai_service.get_insight(
-                    price_cex=data['price_cex'],
-                    price_dex=data['price_dex'],
-                    spread=data['spread_pct'],
-                    token=symbol,
-                    volume=data.get('volume_dex', 0),
-                    slippage=data.get('slippage', 0),
-                    trend=data.get('trend', 0),
-                    detailed=False
-                )
-                data['insight'] = insight
-                results.append(data)
-        except Exception as e:
-            logger.error(f"Error for {symbol}: {e}")
-            continue
+    snapshot = await market_snapshots.get()
+    results = [dict(data) for data in snapshot.valid(tracked_tokens)]
+    try:
+        insights = await ai_service.get_insights_batch(results)
+    except Exception as e:
+        logger.error(f"Error generating insights: {e}")
+        insights = {}
+    for data in results:
+        data['insight'] = insights.get(data['token'], "")
 
     if not results:
         await message.answer("No valid arbitrage opportunities found.")
@@ -341,17 +300,17 @@ async def refresh_now(message: Message):
     for result in results:
         text += format_price_message(result, include_insight=True)
     
+    text += format_snapshot_age(snapshot)
     text += DISCLAIMER
     await message.answer(text, parse_mode="HTML", disable_web_page_preview=True)
 
 async def show_token_selection(callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
-    if user_id not in user_data:
-        user_data[user_id] = {'tracked_tokens': set(price_service.tokens.keys())}
+    tracked_tokens = get_tracked_tokens(user_id)
     
     keyboard = []
     for symbol in sorted(price_service.tokens.keys()):
-        is_tracked = symbol.upper() in user_data[user_id].get('tracked_tokens', set())
+        is_tracked = symbol.upper() in tracked_tokens
         emoji = "✅" if is_tracked else "⭕️"
         keyboard.append([InlineKeyboardButton(
             text=f"{emoji} {symbol}",
@@ -376,9 +335,7 @@ async def notifications(message: Message):
     user_id = get_user_id(message)
     if user_id is None:
         return
-    if user_id not in user_data:
-        user_data[user_id] = {'notify_enabled': False}
-    status = "ON" if user_data[user_id]['notify_enabled'] else "OFF"
+    status = "ON" if user_settings.get(user_id).notify_enabled else "OFF"
     keyboard = [[
         InlineKeyboardButton(text=f"Turn {status}", callback_data=f"notify_toggle_{status.lower()}")
     ]]
@@ -399,17 +356,15 @@ async def settings(message: Message):
         user_id = None
     if user_id is None:
         return
-    if user_id not in user_data:
-        user_data[user_id] = {
-            'spread_threshold': 1.0,
-            'notify_enabled': True,  # Default ON
-            'tracked_tokens': set(price_service.tokens.keys())
-        }
-    notify_status = "ON" if user_data[user_id].get('notify_enabled', False) else "OFF"
+    if user_id not in user_settings:
+        user_settings.ensure(user_id)  # Default: notifications ON, every token tracked
+        sync_alerts(user_id)
+    user = user_settings.get(user_id)
+    notify_status = "ON" if user.notify_enabled else "OFF"
     keyboard = [
         [
             InlineKeyboardButton(text=f"🔔 {notify_status}", callback_data="toggle_notify"),
-            InlineKeyboardButton(text=f"📈 {user_data[user_id].get('spread_threshold', 1.0)}%", callback_data="settings_threshold")
+            InlineKeyboardButton(text=f"📈 {user.spread_threshold}%", callback_data="settings_threshold")
         ],
         [InlineKeyboardButton(text="📋 Select Tokens", callback_data="select_tokens")],
         [InlineKeyboardButton(text="ℹ️ About", callback_data="show_about")]
@@ -425,13 +380,12 @@ async def settings(message: Message):
 @dp.callback_query(lambda c: c.data.startswith('toggle_'))
 async def process_token_toggle(callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
-    if user_id not in user_data:
-        user_data[user_id] = {'tracked_tokens': set(price_service.tokens.keys())}
     
     if callback_query.data == 'toggle_notify':
         # Toggle notifications
-        current_state = user_data[user_id].get('notify_enabled', False)
-        user_data[user_id]['notify_enabled'] = not current_state
+        current_state = user_settings.get(user_id).notify_enabled
+        user_settings.update(user_id, notify_enabled=not current_state)
+        sync_alerts(user_id)
         new_state = "ON" if not current_state else "OFF"
         await callback_query.answer(
             f"Notifications turned {new_state}"
@@ -440,16 +394,17 @@ async def process_token_toggle(callback_query: CallbackQuery):
     else:
         # Toggle token
         symbol = callback_query.data.split('_')[1].upper()
-        if 'tracked_tokens' not in user_data[user_id]:
-            user_data[user_id]['tracked_tokens'] = set(price_service.tokens.keys())
+        tracked_tokens = get_tracked_tokens(user_id)
         
-        if symbol in user_data[user_id]['tracked_tokens']:
-            user_data[user_id]['tracked_tokens'].remove(symbol)
+        if symbol in tracked_tokens:
+            user_settings.update(user_id, tracked_tokens=tracked_tokens - {symbol})
+            sync_alerts(user_id)
             await callback_query.answer(
                 f"Stopped tracking {symbol}"
             )
         else:
-            user_data[user_id]['tracked_tokens'].add(symbol)
+            user_settings.update(user_id, tracked_tokens=tracked_tokens | {symbol})
+            sync_alerts(user_id)
             await callback_query.answer(
                 f"Started tracking {symbol}"
             )
@@ -488,9 +443,8 @@ async def set_threshold(callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
     threshold = float(callback_query.data.split("_")[1])
     
-    if user_id not in user_data:
-        user_data[user_id] = {}
-    user_data[user_id]['spread_threshold'] = threshold
+    user_settings.update(user_id, spread_threshold=threshold)
+    sync_alerts(user_id)
     
     await callback_query.answer(
         f"Spread threshold set to {threshold}%"
@@ -516,9 +470,8 @@ async def toggle_notifications(callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
     current_state = callback_query.data.split("_")[-1]
     new_state = "off" if current_state == "on" else "on"
-    if user_id not in user_data:
-        user_data[user_id] = {}
-    user_data[user_id]['notify_enabled'] = (new_state == "on")
+    user_settings.update(user_id, notify_enabled=(new_state == "on"))
+    sync_alerts(user_id)
     # After toggling, show the settings menu with the correct user_id
     await callback_query.answer()
     await settings(callback_query)
@@ -568,10 +521,12 @@ async def solana_explorer(message: Message):
 # /alpha command handler (Top-3 signals with AI analysis)
 async def alpha_command(message: Message):
     await message.answer("🔍 Analyzing market opportunities...")
+    snapshot = await market_snapshots.get()
     results = []
-    for symbol in ["WIF", "JUP", "PYTH", "PNUT", "MOODENG"]:
+    for data in snapshot.select(["WIF", "JUP", "PYTH", "PNUT", "MOODENG"]):
+        data = dict(data)
+        symbol = data['token']
         try:
-            data = await price_service.compare(symbol)
             if data.get('is_valid'):
                 insight = await ai_service.get_insight(
                     price_cex=data['price_cex'],
@@ -593,15 +548,17 @@ async def alpha_command(message: Message):
     results.sort(key=lambda x: abs(x['spread_pct']), reverse=True)
     text = "🔥 Top-3 Arbitrage Opportunities\n\n"
     for result in results[:3]:
+        slippage_str = f"{result['slippage']:.2f}%" if result.get('slippage') is not None else "n/a"
         text += (
             f"📊 <b>{result['token']}</b>\n"
             f"CEX (OKX): ${result['price_cex']:.4f} (Vol: ${result.get('volume_cex', 0):,.0f})\n"
             f"DEX ({result['source']}): ${result['price_dex']:.4f} (Vol: ${result.get('volume_dex', 0):,.0f})\n"
             f"Spread: {result['spread_pct']:+.2f}%\n"
-            f"Slippage: {result.get('slippage', 0):.2f}%\n"
+            f"Slippage: {slippage_str}\n"
             f"24h Trend: {result.get('trend', 0):+.2f}%\n\n"
             f"🤖 <i>{result.get('insight', 'No AI analysis available')}</i>\n\n"
         )
+    text += format_snapshot_age(snapshot)
     text += DISCLAIMER
     await message.answer(text, parse_mode="HTML")
 
@@ -691,41 +648,33 @@ async def set_mode_command(message: Message):
 
 async def process_mode_select(callback_query: CallbackQuery):
     mode = callback_query.data.split('_')[1]
-    user_data[callback_query.from_user.id]['mode'] = mode
+    user_settings.update(callback_query.from_user.id, mode=mode)
     await callback_query.answer()
     await callback_query.message.answer(f"Trading mode set to: {mode.capitalize()} mode.", reply_markup=ReplyKeyboardRemove())
 
 # /history_<symbol> handler (PNG chart or text summary)
-import matplotlib.pyplot as plt
-import io
-
 async def history_command(message: Message):
     symbol = message.text.split('_', 1)[-1].upper()
-    data = history_service.get_history(symbol)
+    data = await asyncio.to_thread(history_service.get_history, symbol)
     if not data:
         await message.reply(f"No history found for {symbol}.")
         return
-    # Try to plot PNG chart
+    # Try to plot PNG chart (rendered in the chart process pool, cached per data version)
     try:
-        times = [d['timestamp'] for d in reversed(data)]
-        spreads = [d['spread_pct'] for d in reversed(data)]
-        plt.figure(figsize=(6,3))
-        plt.plot(times, spreads, marker='o')
-        plt.title(f"Spread history for {symbol}")
-        plt.xlabel("Time")
-        plt.ylabel("Spread (%)")
-        plt.xticks(rotation=45, fontsize=8)
-        plt.tight_layout()
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png')
-        buf.seek(0)
-        plt.close()
-        await message.reply_photo(buf, caption=f"Spread history for {symbol}")
+        points = [d for d in reversed(data) if d['spread_pct'] is not None]
+        times = [d['timestamp'] for d in points]
+        spreads = [d['spread_pct'] for d in points]
+        data_version = (data[0]['timestamp'], len(data))
+        png = await chart_renderer.render("spread_history", symbol, data_version, times, spreads)
+        await message.reply_photo(BufferedInputFile(png, filename=f"{symbol}_history.png"),
+                                  caption=f"Spread history for {symbol}")
     except Exception as e:
+        logger.warning(f"History chart failed for {symbol}: {e}")
         # Fallback: text summary
         summary = '\n'.join([
             f"{d['timestamp']}: {d['spread_pct']:+.2f}%"
             for d in data[-10:]
+            if d['spread_pct'] is not None
         ])
         await message.reply(f"Recent spread changes for {symbol}:\n{summary}")
 
@@ -758,7 +707,7 @@ async def tokens_command(message: Message):
 
 # /mode command handler (show current mode)
 async def mode_command(message: Message):
-    mode = user_data.get(message.from_user.id, {'mode': 'safe'})['mode']
+    mode = user_settings.get(message.from_user.id).mode
     await message.reply(f"Your current trading mode: {mode.capitalize()} mode.")
 
 # /refresh command handler (manual price refresh)
@@ -768,17 +717,14 @@ async def refresh_command(message: Message):
 # /check command handler
 async def check_command(message: Message):
     await message.answer("🔍 Scanning for arbitrage opportunities...")
+    snapshot = await market_snapshots.get()
     opportunities = []
-    for symbol in price_service.tokens.keys():
-        try:
-            data = await price_service.compare(symbol)
-            if data.get('is_valid') and abs(data['spread_pct']) >= 1.0:
-                opportunities.append(data)
-            elif not data.get('is_valid'):
-                opportunities.append({'symbol': symbol, 'error': data.get('error')})
-        except Exception as e:
-            logger.error(f"Error checking {symbol}: {e}")
-            opportunities.append({'symbol': symbol, 'error': str(e)})
+    for data in snapshot.results:
+        symbol = data['token']
+        if data.get('is_valid') and abs(data['spread_pct']) >= 1.0:
+            opportunities.append(dict(data, symbol=symbol))
+        elif not data.get('is_valid'):
+            opportunities.append({'symbol': symbol, 'error': data.get('error'), 'spread_pct': 0})
     if not opportunities:
         await message.answer("No arbitrage opportunities found (threshold: 1%)")
         return
@@ -814,6 +760,8 @@ async def check_command(message: Message):
                 f"Route: {direction}\n"
                 f"👉 <a href='{okx_link}'>Trade on OKX</a>\n\n"
             )
+    if text:
+        text += format_snapshot_age(snapshot)
     await message.answer(text or "No arbitrage opportunities found.", parse_mode="HTML", disable_web_page_preview=True)
 
 # About handler
@@ -841,35 +789,35 @@ async def show_about(callback_query: CallbackQuery):
 # Top Arbitrage handler
 async def top_arbitrage(message: Message):
     await message.answer("🔍 Scanning for arbitrage opportunities...")
+    snapshot = await market_snapshots.get()
     results = []
-    for symbol in OKX_SUPPORTED_TOKENS:
-        try:
-            data = await price_service.compare(symbol.upper())
-            if data.get('is_valid'):
-                insight = await ai_service.get_insight(
-                    price_cex=data['price_cex'],
-                    price_dex=data['price_dex'],
-                    spread=data['spread_pct'],
-                    token=symbol.upper(),
-                    volume=data.get('volume_dex', 0),
-                    slippage=data.get('slippage', 0),
-                    trend=data.get('trend', 0),
-                    detailed=False
-                )
-                data['insight'] = insight
-                results.append(data)
-            else:
-                results.append({
-                    'symbol': symbol.upper(),
-                    'error': data.get('error')
-                })
-        except Exception as e:
-            logger.error(f"Error for {symbol}: {e}")
-            results.append({'symbol': symbol.upper(), 'error': str(e)})
+    for data in snapshot.select(OKX_SUPPORTED_TOKENS):
+        data = dict(data)
+        if data.get('is_valid'):
+            results.append(data)
+        else:
+            results.append({
+                'symbol': data['token'].upper(),
+                'error': data.get('error')
+            })
+    valid = [r for r in results if r.get('is_valid')]
+    try:
+        insights = await ai_service.get_insights_batch(valid)
+    except Exception as e:
+        logger.error(f"Error generating insights: {e}")
+        insights = {}
+    for data in valid:
+        data['insight'] = insights.get(data['token'].upper(), "")
     # Separate valid and error results
     valid_results = [r for r in results if r.get('is_valid') and 'spread_pct' in r]
     error_results = [r for r in results if not (r.get('is_valid') and 'spread_pct' in r)]
-    valid_results.sort(key=lambda x: abs(x['spread_pct']), reverse=True)
+    try:
+        analytics = await spread_analytics.for_snapshot(snapshot)
+    except Exception as e:
+        logger.error(f"Error computing spread analytics: {e}")
+        analytics = {}
+    # Rank by how unusual the spread is for the token (|z|); tokens without history follow by raw spread
+    valid_results.sort(key=lambda x: (zscore_rank(analytics.get(x['token'])), abs(x['spread_pct'])), reverse=True)
     text = "🔥 <b>Top Arbitrage Opportunities</b>\n\n"
     if valid_results:
         for t in valid_results[:3]:
@@ -889,6 +837,7 @@ async def top_arbitrage(message: Message):
                 f"💥 <b>Token: {t['token']}</b>\n"
                 f"💰 <b>Price:</b> CEX: <code>${t['price_cex']:.4f}</code> | DEX: <code>${t['price_dex']:.4f}</code>\n"
                 f"📊 <b>Spread:</b> <u>{t['spread_pct']:+.2f}%</u> {spread_emoji}{trend_str}\n"
+                f"{format_spread_stats(analytics.get(t['token']))}"
                 f"📦 <b>Volume:</b> OKX: {format_volume(t['volume_cex'])} | JUP: {format_volume(t['volume_dex'])}\n"
                 f"🕒 {time_str}\n"
                 f"👉 <a href='{okx_link}'>Trade on OKX</a>\n"
@@ -898,6 +847,7 @@ async def top_arbitrage(message: Message):
         for t in error_results[:3]:
             symbol = t.get('symbol', 'Unknown')
             text += f"💥 <b>Token: {symbol}</b>\nError: {t.get('error', 'Unknown error')}\n\n"
+    text += format_snapshot_age(snapshot)
     text += DISCLAIMER
     await message.answer(text, parse_mode="HTML", disable_web_page_preview=True)
 
@@ -937,44 +887,18 @@ async def process_ai_insight(callback_query: CallbackQuery):
             )
             return
 
-        # Generate unique filename for this screenshot
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        chart_filename = f"chart_{symbol}_{timestamp}.png"
-        chart_path = screenshot_okx_chart(get_okx_trading_url(symbol), out_file=chart_filename)
-        
-        if chart_path:
-            await safe_delete_message(bot, callback_query.from_user.id, waiting_msg.message_id)
-            
-            # Create FSInputFile instance for the photo
-            photo = FSInputFile(chart_path)
-            await callback_query.message.answer_photo(
-                photo,
-                caption=f"📊 OKX Chart for {symbol.upper()}"
-            )
-            # Clean up the chart file after sending
-            try:
-                Path(chart_path).unlink()
-            except Exception as e:
-                logger.warning(f"Could not delete chart file {chart_path}: {e}")
-        else:
-            await safe_delete_message(bot, callback_query.from_user.id, waiting_msg.message_id)
+        sent = await chart_cache.send(
+            callback_query.message, symbol, lambda: get_chart_png(symbol),
+            caption=f"📊 OKX Chart for {symbol.upper()}"
+        )
+        await safe_delete_message(bot, callback_query.from_user.id, waiting_msg.message_id)
+
+        if not sent:
             await callback_query.message.answer(
                 f"❌ Could not get OKX chart for {symbol.upper()}"
             )
             return
 
-        # Get AI insight with actual data
-        insight = await ai_service.get_insight(
-            price_cex=data['price_cex'],
-            price_dex=data['price_dex'],
-            spread=data['spread_pct'],
-            token=symbol.upper(),
-            volume=data.get('volume_dex', 0),
-            slippage=data.get('slippage', 0),
-            trend=data.get('trend', 0),
-            detailed=True
-        )
-
         keyboard = [
             [
                 InlineKeyboardButton(text="💱 Trade on OKX", url=get_okx_trading_url(symbol)),
@@ -982,15 +906,21 @@ async def process_ai_insight(callback_query: CallbackQuery):
             ]
         ]
 
-        # Format the message with disclaimer
-        message_text = (
-            f"{insight}\n\n"
-            f"{DISCLAIMER}"
-        )
-
-        await callback_query.message.answer(
-            message_text,
-            parse_mode="HTML",
+        # Stream the AI insight into one message, editing it as text arrives
+        insight_msg = await callback_query.message.answer(f"🤖 Analyzing {symbol.upper()}...")
+        await render_stream(
+            insight_msg,
+            ai_service.stream_insight(
+                price_cex=data['price_cex'],
+                price_dex=data['price_dex'],
+                spread=data['spread_pct'],
+                token=symbol.upper(),
+                volume=data.get('volume_dex', 0),
+                slippage=data.get('slippage', 0),
+                trend=data.get('trend', 0),
+                detailed=True
+            ),
+            suffix=DISCLAIMER,
             reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
         )
 
@@ -1030,31 +960,16 @@ async def chart_command(message: Message):
         if symbol not in OKX_SUPPORTED_TOKENS:
             await message.answer(f"❌ No OKX chart available for {symbol.upper()}")
             return
-        pair_url = await get_okx_pair(symbol)
         await message.answer(f"🔍 Looking for {symbol.upper()}/USDC pair on OKX...")
-        
-        # Generate unique filename for this screenshot
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        chart_file = CHARTS_DIR / f"chart_{symbol}_{timestamp}.png"
-        
-        if screenshot_okx_chart(pair_url, out_file=chart_file):
-            with open(chart_file, "rb") as photo:
-                await message.answer_photo(photo, caption=f"📊 OKX Chart for {symbol.upper()}")
-            # Clean up the chart file after sending
-            try:
-                chart_file.unlink()
-            except Exception as e:
-                logger.warning(f"Could not delete chart file {chart_file}: {e}")
-        else:
+        sent = await chart_cache.send(
+            message, symbol, lambda: get_chart_png(symbol), caption=f"📊 OKX Chart for {symbol.upper()}"
+        )
+        if not sent:
             await message.answer(f"❌ Could not get OKX chart for {symbol.upper()}")
     except Exception as e:
         logger.error(f"Error in chart command: {e}")
         await message.answer("Error getting chart.")
 
-async def get_okx_pair(symbol: str) -> str:
-    """Get the OKX trading pair URL for a given symbol."""
-    return f"https://www.okx.com/trade-spot/{symbol.lower()}-usdc"
-
 # Start the bot
 async def main():
     # Initialize bot and dispatcher
@@ -1102,24 +1017,68 @@ async def main():
     dp.callback_query.register(process_ai_insight, lambda c: c.data and c.data.startswith('ai_insight_'))
     dp.callback_query.register(ai_back_to_tokens, F.data == "ai_back_to_tokens")
 
+    # Webhook mode: Telegram posts updates to the FastAPI app below instead of being polled
+    webhook = WebhookHandler(dp, bot) if TELEGRAM_WEBHOOK_URL else None
+    if webhook:
+        webhook.mount(app)
+
     try:
         # Start FastAPI app in background
         config = uvicorn.Config(app, host="0.0.0.0", port=8000, log_level="info")
         server = uvicorn.Server(config)
         api_task = asyncio.create_task(server.serve())
 
-        # Start bot polling
-        chromedriver_autoinstaller.install()
+        # Open shared HTTP connection pools
+        await open_transport()
+
+        # Stream OKX tickers into the in-memory price book
+        if okx_stream:
+            price_service.comparator.price_book = okx_stream.book
+            await okx_stream.start()
+
+        # Write price history in batches off the event loop
+        await price_service.price_history_service.start()
+
+        # Pace outgoing messages and send alerts from the broadcast lane
+        await send_scheduler.start(bot)
+        # Load stored user settings and subscribe users to spread alerts
+        await user_settings.start()
+        for user_id, _ in user_settings.items():
+            sync_alerts(user_id)
+
+        # Scan the market in the background; handlers read the latest snapshot
+        market_snapshots.subscribe(on_snapshot_alerts)
+        await market_snapshots.start()
+
+        if CHART_MODE == "screenshot" or CHART_SCREENSHOT_FALLBACK:
+            chromedriver_autoinstaller.install()
         logger.info('Starting bot...')
         logger.info(f'httpx version: {httpx.__version__}')
         logger.info(f'openai version: {openai.__version__}')
-        
-        await dp.start_polling(bot)
+
+        if webhook:
+            await webhook.register()
+            await api_task
+        else:
+            # A webhook left over from webhook mode would block getUpdates
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
     except Exception as e:
         logger.exception("Error in main loop")
         sentry_sdk.capture_exception(e)
         raise
     finally:
+        if webhook:
+            await webhook.drain()
+        await market_snapshots.stop()
+        await send_scheduler.stop()
+        await user_settings.stop()
+        await price_service.price_history_service.stop()
+        await chart_renderer.close()
+        await browser_pool.close()
+        if okx_stream:
+            await okx_stream.stop()
+        await close_transport()
         await shutdown(dp)
 
 if __name__ == '__main__':
@@ -0,0 +1,138 @@
+"""
+Shared cache of chart images sent to Telegram.
+
+Charts are cached per (symbol, time bucket): every request for a token within
+the same ``CHART_CACHE_BUCKET`` seconds gets the same image, produced once even
+when requests arrive concurrently. Images are stored recompressed (scaled down
+to ``CHART_MAX_WIDTH`` and encoded as JPEG, which is what Telegram turns photos
+into anyway). After the first upload the ``file_id`` Telegram returns is kept,
+so repeat sends reference the uploaded photo instead of uploading it again.
+Entries from past buckets are evicted whenever a new chart is stored.
+
+Environment variables:
+    CHART_CACHE_BUCKET: seconds a chart is reused for (default 60)
+    CHART_CACHE_ENTRIES: max cached charts (default 64)
+    CHART_MAX_WIDTH: max stored image width in pixels (default 1280)
+    CHART_JPEG_QUALITY: JPEG quality of stored images (default 85)
+
+Example usage:
+    chart_cache = ChartCache()
+    sent = await chart_cache.send(message, "WIF", lambda: get_chart_png("WIF"), caption="📊 WIF")
+"""
+import asyncio
+import io
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, Message
+
+from backend.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+CHART_CACHE_BUCKET = int(os.getenv("CHART_CACHE_BUCKET", "60"))
+CHART_CACHE_ENTRIES = int(os.getenv("CHART_CACHE_ENTRIES", "64"))
+CHART_MAX_WIDTH = int(os.getenv("CHART_MAX_WIDTH", "1280"))
+CHART_JPEG_QUALITY = int(os.getenv("CHART_JPEG_QUALITY", "85"))
+
+
+@dataclass
+class CachedChart:
+    data: bytes
+    filename: str
+    file_id: Optional[str] = None
+
+
+def compact_image(image: bytes, max_width: int = CHART_MAX_WIDTH, quality: int = CHART_JPEG_QUALITY) -> Tuple[bytes, str]:
+    """Downscale an image to ``max_width`` and re-encode it as JPEG; returns (bytes, extension)."""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(image)) as img:
+            img = img.convert("RGB")
+            if img.width > max_width:
+                img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=quality, optimize=True)
+    except OSError as e:
+        logger.warning(f"Could not recompress chart image: {e}")
+        return image, "png"
+    if buf.tell() >= len(image):
+        return image, "png"
+    return buf.getvalue(), "jpg"
+
+
+class ChartCache:
+    def __init__(self, bucket_seconds: int = CHART_CACHE_BUCKET, max_entries: int = CHART_CACHE_ENTRIES,
+                 clock: Callable[[], float] = time.time):
+        self.bucket_seconds = bucket_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[str, int], CachedChart]" = OrderedDict()
+        self.flights = SingleFlight(fresh_for=0)
+        self.hits = 0
+        self.misses = 0
+        self.uploads = 0
+        self.reuploads = 0
+
+    def key(self, symbol: str) -> Tuple[str, int]:
+        return symbol.upper(), int(self.clock() // self.bucket_seconds)
+
+    def _store(self, key: Tuple[str, int], chart: CachedChart):
+        # Charts from past buckets are never served again
+        for old in [k for k in self._entries if k[1] < key[1]]:
+            del self._entries[old]
+        self._entries[key] = chart
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, symbol: str, produce: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[CachedChart]:
+        """Cached chart for the current bucket, produced (once) by ``produce`` on a miss."""
+        key = self.key(symbol)
+        chart = self._entries.get(key)
+        if chart is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return chart
+
+        async def create() -> Optional[CachedChart]:
+            self.misses += 1
+            image = await produce()
+            if not image:
+                return None
+            # Decoding and re-encoding a full-size PNG would block the event loop
+            data, extension = await asyncio.to_thread(compact_image, image)
+            created = CachedChart(data, f"chart_{key[0].lower()}_{key[1]}.{extension}")
+            self._store(key, created)
+            return created
+
+        return await self.flights.do(key, create)
+
+    async def send(self, message: Message, symbol: str, produce: Callable[[], Awaitable[Optional[bytes]]],
+                   caption: Optional[str] = None) -> bool:
+        """Send the chart as a photo reply to ``message``; False if no chart could be produced."""
+        chart = await self.get(symbol, produce)
+        if chart is None:
+            return False
+        if chart.file_id:
+            try:
+                await message.answer_photo(chart.file_id, caption=caption)
+                return True
+            except TelegramBadRequest as e:
+                logger.warning(f"Cached file_id for {symbol} rejected, uploading again: {e}")
+                chart.file_id = None
+                self.reuploads += 1
+        sent = await message.answer_photo(BufferedInputFile(chart.data, filename=chart.filename), caption=caption)
+        self.uploads += 1
+        if sent.photo:
+            chart.file_id = sent.photo[-1].file_id
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "uploads": self.uploads, "reuploads": self.reuploads}
@@ -0,0 +1,233 @@
+"""
+Warm headless Chrome pool for OKX chart screenshots.
+
+Each worker thread keeps its own Chrome instance alive between captures, so a
+request pays for page navigation only, not a browser start. Captures wait for
+the TradingView iframe and chart element to appear (explicit DOM readiness
+instead of a fixed sleep) and return PNG bytes in memory. Requests beyond the
+pool size wait in a bounded queue. Each capture has one overall deadline shared
+by page load and the DOM waits; a browser that fails, overruns the deadline or
+reaches ``SCREENSHOT_MAX_USES`` captures is replaced. A browser slot is only
+freed when its worker thread has actually finished.
+
+Environment variables:
+    SCREENSHOT_POOL_SIZE: concurrent browsers (default 2)
+    SCREENSHOT_QUEUE_SIZE: captures allowed to wait for a browser (default 8)
+    SCREENSHOT_TIMEOUT: seconds per capture, page load included (default 25)
+    SCREENSHOT_MAX_USES: captures before a browser is recycled (default 50)
+
+Example usage:
+    pool = BrowserPool()
+    png = await pool.capture("https://www.okx.com/trade-spot/wif-usdc")
+    await pool.close()
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_POOL_SIZE = int(os.getenv("SCREENSHOT_POOL_SIZE", "2"))
+SCREENSHOT_QUEUE_SIZE = int(os.getenv("SCREENSHOT_QUEUE_SIZE", "8"))
+SCREENSHOT_TIMEOUT = float(os.getenv("SCREENSHOT_TIMEOUT", "25"))
+SCREENSHOT_MAX_USES = int(os.getenv("SCREENSHOT_MAX_USES", "50"))
+
+TRADINGVIEW_IFRAME = "iframe[src*='tradingview'], iframe[id*='tradingview'], iframe[name*='tradingview']"
+CHART_ELEMENT = ".chart-container, .tv-lightweight-charts, .tradingview-widget-container, canvas"
+# Extra seconds on top of the driver's own waits before a capture is abandoned
+CAPTURE_GRACE = 5.0
+
+
+class PoolBusyError(RuntimeError):
+    pass
+
+
+def chrome_options() -> Options:
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    # Disable unnecessary features
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-software-rasterizer")
+    options.add_argument("--disable-webrtc")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-notifications")
+    options.add_argument("--disable-geolocation")
+    # Reduce network errors
+    options.add_argument("--dns-prefetch-disable")
+    options.add_argument("--no-proxy-server")
+    options.add_argument("--disable-web-security")
+    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+    return options
+
+
+def new_chrome() -> webdriver.Chrome:
+    return webdriver.Chrome(options=chrome_options())
+
+
+def _remaining(deadline: float) -> float:
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutException("Capture deadline exceeded")
+    return left
+
+
+def capture_tradingview(driver, url: str, timeout: float) -> bytes:
+    """Open ``url`` and screenshot the TradingView chart once it is rendered, all within ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    driver.set_page_load_timeout(_remaining(deadline))
+    driver.get(url)
+    try:
+        WebDriverWait(driver, _remaining(deadline)).until(
+            EC.frame_to_be_available_and_switch_to_it((By.CSS_SELECTOR, TRADINGVIEW_IFRAME)))
+        try:
+            chart = WebDriverWait(driver, _remaining(deadline)).until(
+                EC.visibility_of_element_located((By.CSS_SELECTOR, CHART_ELEMENT)))
+            return chart.screenshot_as_png
+        except TimeoutException:
+            # If the chart element never shows up, screenshot the entire iframe
+            return driver.get_screenshot_as_png()
+    finally:
+        driver.switch_to.default_content()
+
+
+class BrowserPool:
+    def __init__(self, size: int = SCREENSHOT_POOL_SIZE, queue_size: int = SCREENSHOT_QUEUE_SIZE,
+                 timeout: float = SCREENSHOT_TIMEOUT, max_uses: int = SCREENSHOT_MAX_USES,
+                 driver_factory: Callable[[], object] = new_chrome,
+                 capture_fn: Callable[[object, str, float], bytes] = capture_tradingview):
+        self.size = size
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.max_uses = max_uses
+        self.driver_factory = driver_factory
+        self.capture_fn = capture_fn
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="chrome")
+        self._local = threading.local()
+        self._drivers: List[object] = []
+        self._lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self.captures = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    # --- worker thread side ---
+
+    def _driver(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is not None and self._local.uses >= self.max_uses:
+            self._discard()
+            driver = None
+        if driver is None:
+            driver = self.driver_factory()
+            self._local.driver, self._local.uses = driver, 0
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def _discard(self):
+        driver = getattr(self._local, "driver", None)
+        self._local.driver = None
+        if driver is None:
+            return
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing browser: {e}")
+
+    def _capture(self, url: str, abandoned: threading.Event) -> bytes:
+        driver = self._driver()
+        self._local.uses += 1
+        try:
+            return self.capture_fn(driver, url, self.timeout)
+        except WebDriverException:
+            # A browser in an unknown state is replaced on the next capture
+            self._discard()
+            raise
+        finally:
+            if abandoned.is_set():
+                # Overran the hard timeout: the page may still be loading or hung
+                self._discard()
+
+    def _release(self, future: asyncio.Future):
+        self._slots.release()
+        if not future.cancelled():
+            # Mark retrieved so a failure after a timeout does not log "exception never retrieved"
+            future.exception()
+
+    # --- event loop side ---
+
+    async def capture(self, url: str) -> Optional[bytes]:
+        """
+        PNG screenshot of the chart at ``url``, or None if the capture failed or timed out.
+        Raises PoolBusyError when the wait queue is full.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        if self._slots.locked() and self._waiting >= self.queue_size:
+            raise PoolBusyError("All browsers are busy, try again shortly")
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        abandoned = threading.Event()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, self._capture, url, abandoned)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot stays taken until the worker thread is done, even if this caller gives up
+        future.add_done_callback(self._release)
+        try:
+            png = await asyncio.wait_for(asyncio.shield(future), self.timeout + CAPTURE_GRACE)
+            self.captures += 1
+            return png
+        except asyncio.TimeoutError:
+            abandoned.set()
+            self.timeouts += 1
+            logger.error(f"Screenshot of {url} timed out after {self.timeout}s")
+            return None
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error taking screenshot of {url}: {e}")
+            return None
+
+    def stats(self):
+        return {
+            "browsers": len(self._drivers),
+            "waiting": self._waiting,
+            "captures": self.captures,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+        }
+
+    def _quit_all(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+
+    async def close(self):
+        await asyncio.to_thread(self._executor.shutdown, True)
+        self._quit_all()
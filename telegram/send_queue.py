@@ -0,0 +1,268 @@
+"""
+Rate-limit aware scheduler for outbound Telegram requests.
+
+Registered as a request middleware on the bot session, so every API call that
+targets a chat (messages, photos, edits, deletes) passes through it:
+
+- a global token bucket keeps the bot under Telegram's overall limit (``SEND_RATE``/s)
+- a per-chat token bucket paces each chat (``SEND_CHAT_RATE``/s, bursts of ``SEND_CHAT_BURST``)
+- a 429 answer pauses that chat for ``retry_after`` seconds and the request is retried
+- waiting requests are granted in priority lanes: interactive replies first, broadcasts after
+
+Broadcasts (spread alerts) are queued with ``broadcast`` and sent by a few worker
+tasks in the broadcast lane, so a storm of alerts never delays handler replies
+by more than one global token. A broadcast with the same ``collapse_key`` as one
+still waiting replaces it in place: a user gets the latest alert for a token,
+not every superseded one.
+
+Environment variables:
+    SEND_RATE: global requests per second (default 25)
+    SEND_CHAT_RATE: requests per second per chat (default 1)
+    SEND_CHAT_BURST: requests a chat may burst before pacing applies (default 3)
+    SEND_MAX_RETRIES: retries after a 429 answer (default 3)
+    SEND_BROADCAST_WORKERS: concurrent broadcast senders (default 8)
+    SEND_BROADCAST_QUEUE: max broadcasts waiting to be sent (default 100000)
+
+Example usage:
+    scheduler = SendScheduler()
+    bot.session.middleware(scheduler)
+    await scheduler.start(bot)
+    scheduler.broadcast(user_id, text, collapse_key=(user_id, "WIF"), parse_mode="HTML")
+"""
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+SEND_RATE = float(os.getenv("SEND_RATE", "25"))
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+SEND_CHAT_BURST = int(os.getenv("SEND_CHAT_BURST", "3"))
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))
+SEND_BROADCAST_WORKERS = int(os.getenv("SEND_BROADCAST_WORKERS", "8"))
+SEND_BROADCAST_QUEUE = int(os.getenv("SEND_BROADCAST_QUEUE", "100000"))
+
+INTERACTIVE = 0
+BROADCAST = 1
+
+# Waiters inspected per lane when looking for a chat that may send now
+SCAN_LIMIT = 64
+MAX_IDLE_CHATS = 10_000
+
+_lane: contextvars.ContextVar[int] = contextvars.ContextVar("send_lane", default=INTERACTIVE)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class SendScheduler(BaseRequestMiddleware):
+    def __init__(self, rate: float = SEND_RATE, chat_rate: float = SEND_CHAT_RATE, chat_burst: int = SEND_CHAT_BURST,
+                 max_retries: int = SEND_MAX_RETRIES, workers: int = SEND_BROADCAST_WORKERS,
+                 max_pending: int = SEND_BROADCAST_QUEUE, clock: Callable[[], float] = time.monotonic):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.workers = workers
+        self.max_pending = max_pending
+        self.clock = clock
+        self._global = TokenBucket(rate, rate, clock())
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._paused: Dict[Any, float] = {}  # chat_id -> paused until (clock time)
+        self._lanes: Tuple[Deque[Tuple[Any, asyncio.Future]], ...] = (deque(), deque())
+        self._wakeup = asyncio.Event()
+        self._pending: "OrderedDict[Hashable, Tuple[Any, str, Dict[str, Any]]]" = OrderedDict()
+        self._has_pending = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._tasks: List[asyncio.Task] = []
+        self.granted = 0
+        self.retries = 0
+        self.sent = 0
+        self.failed = 0
+        self.collapsed = 0
+        self.dropped = 0
+
+    # --- rate limiting ---
+
+    def _chat_bucket(self, chat_id, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_IDLE_CHATS:
+                # Buckets that refilled completely carry no state
+                self._chats = {c: b for c, b in self._chats.items() if not b.idle(now)}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    def _chat_delay(self, chat_id, now: float) -> float:
+        paused = self._paused.get(chat_id)
+        if paused is not None and paused <= now:
+            del self._paused[chat_id]
+            paused = None
+        delay = self._chat_bucket(chat_id, now).delay(now)
+        return max(delay, paused - now) if paused is not None else delay
+
+    def _take(self, chat_id, now: float):
+        self._global.take(now)
+        self._chat_bucket(chat_id, now).take(now)
+        self.granted += 1
+
+    def _next_ready(self, now: float) -> Tuple[Optional[asyncio.Future], Any, float]:
+        """First waiter (by lane priority) whose chat may send now, else the soonest chat delay."""
+        soonest = math.inf
+        for lane in self._lanes:
+            while lane and lane[0][1].done():
+                lane.popleft()  # Cancelled waiters
+            for i, (chat_id, future) in enumerate(lane):
+                if i >= SCAN_LIMIT:
+                    break
+                if future.done():
+                    continue
+                delay = self._chat_delay(chat_id, now)
+                if delay == 0:
+                    del lane[i]
+                    return future, chat_id, 0.0
+                soonest = min(soonest, delay)
+        return None, None, soonest
+
+    def _grant(self, now: float) -> Optional[float]:
+        """Grant every waiter that may send now; returns seconds until the next could, None when idle."""
+        while any(self._lanes):
+            delay = self._global.delay(now)
+            if delay > 0:
+                return delay
+            future, chat_id, soonest = self._next_ready(now)
+            if future is None:
+                return soonest if soonest < math.inf else None
+            self._take(chat_id, now)
+            future.set_result(None)
+        return None
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._grant(self.clock())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def acquire(self, chat_id, lane: int = INTERACTIVE):
+        """Wait until a request to ``chat_id`` fits the global and per-chat limits."""
+        now = self.clock()
+        if not any(self._lanes) and self._global.delay(now) == 0 and self._chat_delay(chat_id, now) == 0:
+            self._take(chat_id, now)
+            return
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[lane].append((chat_id, future))
+        self._wakeup.set()
+        await future
+
+    def pause(self, chat_id, seconds: float):
+        """Hold every request to ``chat_id`` for ``seconds`` (Telegram's retry_after)."""
+        self._paused[chat_id] = max(self._paused.get(chat_id, 0.0), self.clock() + seconds)
+        self._wakeup.set()
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+        attempt = 0
+        while True:
+            await self.acquire(chat_id, _lane.get())
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"Flood limit for chat {chat_id}, retrying in {e.retry_after}s")
+                self.pause(chat_id, e.retry_after)
+
+    # --- broadcasts ---
+
+    def broadcast(self, chat_id, text: str, collapse_key: Optional[Hashable] = None, **kwargs: Any) -> bool:
+        """
+        Queue a broadcast message. A message still waiting with the same ``collapse_key``
+        is replaced (keeping its place in the queue). Returns False if the queue is full.
+        """
+        if collapse_key is not None and collapse_key in self._pending:
+            self._pending[collapse_key] = (chat_id, text, kwargs)
+            self.collapsed += 1
+            return True
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        self._pending[collapse_key if collapse_key is not None else object()] = (chat_id, text, kwargs)
+        self._has_pending.set()
+        return True
+
+    async def _broadcast_worker(self, bot):
+        _lane.set(BROADCAST)
+        while True:
+            if not self._pending:
+                self._has_pending.clear()
+                await self._has_pending.wait()
+                continue
+            _, (chat_id, text, kwargs) = self._pending.popitem(last=False)
+            try:
+                await bot.send_message(chat_id, text, **kwargs)
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Could not send broadcast to {chat_id}: {e}")
+
+    async def start(self, bot):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._broadcast_worker(bot)) for _ in range(self.workers)]
+
+    async def stop(self):
+        tasks = self._tasks + ([self._dispatcher] if self._dispatcher else [])
+        self._tasks, self._dispatcher = [], None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "waiting_interactive": len(self._lanes[INTERACTIVE]),
+            "waiting_broadcast": len(self._lanes[BROADCAST]),
+            "pending_broadcasts": len(self._pending),
+            "granted": self.granted,
+            "retries": self.retries,
+            "sent": self.sent,
+            "failed": self.failed,
+            "collapsed": self.collapsed,
+            "dropped": self.dropped,
+        }
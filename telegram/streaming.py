@@ -0,0 +1,72 @@
+"""
+Progressive rendering of streamed text into a single Telegram message.
+
+The bot sends a placeholder message and edits it as new text arrives. Edits are
+throttled to at most one per ``STREAM_EDIT_INTERVAL`` seconds and skipped when
+the text has not changed, keeping well within Telegram's per-chat edit limits.
+The final text is always written, together with the reply markup.
+
+Environment variables:
+    STREAM_EDIT_INTERVAL: minimum seconds between message edits (default 1.0)
+
+Example usage:
+    placeholder = await message.answer("⏳ Thinking...")
+    await render_stream(placeholder, ai_service.stream_insight(...), suffix=DISCLAIMER)
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+TELEGRAM_TEXT_LIMIT = 4096
+CURSOR = " ▌"
+
+
+async def _edit(message, text: str, **kwargs) -> bool:
+    """Edit the message text; returns False if Telegram rejected the edit."""
+    for _ in range(2):
+        try:
+            await message.edit_text(text[:TELEGRAM_TEXT_LIMIT], **kwargs)
+            return True
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                logger.warning(f"Could not edit streamed message: {e}")
+            return False
+    return False
+
+
+async def render_stream(message, chunks: AsyncIterator[str], suffix: str = "",
+                        reply_markup=None, parse_mode: Optional[str] = "HTML",
+                        min_interval: float = STREAM_EDIT_INTERVAL) -> str:
+    """
+    Render accumulated text from ``chunks`` into ``message``.
+    Args:
+        message: message previously sent by the bot, edited in place
+        chunks: async iterator yielding the full text generated so far
+        suffix: appended to the final text only (e.g. a disclaimer)
+        reply_markup: keyboard attached with the final edit
+        min_interval: minimum seconds between intermediate edits
+    Returns:
+        The final text (without suffix).
+    """
+    text = ""
+    shown = None
+    last_edit = 0.0
+    async for text in chunks:
+        now = time.monotonic()
+        if text and text != shown and now - last_edit >= min_interval:
+            # Partial output may contain unbalanced markup, so intermediate edits are sent as plain text
+            if await _edit(message, text + CURSOR):
+                shown = text
+            last_edit = time.monotonic()
+    await _edit(message, f"{text}\n\n{suffix}" if suffix else text,
+                parse_mode=parse_mode, reply_markup=reply_markup)
+    return text
@@ -0,0 +1,107 @@
+"""
+Webhook delivery of Telegram updates on the bot's FastAPI app.
+
+Instead of long polling, Telegram POSTs every update to ``TELEGRAM_WEBHOOK_PATH``
+on the health/metrics app the bot already serves with uvicorn. Each request must
+carry the ``X-Telegram-Bot-Api-Secret-Token`` header registered with
+``set_webhook``; anything else is rejected with 403. Accepted updates are fed to
+the dispatcher in background tasks, so Telegram gets its 200 immediately and
+updates are handled concurrently. At most ``TELEGRAM_WEBHOOK_MAX_IN_FLIGHT``
+updates are processed at once; beyond that the request waits for a free slot
+before it is acknowledged, which makes Telegram hold back further deliveries.
+
+Environment variables:
+    TELEGRAM_WEBHOOK_URL: public base URL (e.g. https://bot.example.com); enables webhook mode
+    TELEGRAM_WEBHOOK_PATH: route for updates (default /telegram/webhook)
+    TELEGRAM_WEBHOOK_SECRET: secret token checked on every update (default: random per start)
+    TELEGRAM_WEBHOOK_MAX_IN_FLIGHT: updates processed concurrently (default 64)
+
+Example usage:
+    webhook = WebhookHandler(dp, bot)
+    webhook.mount(app)
+    await webhook.register()
+"""
+import asyncio
+import hmac
+import logging
+import os
+import secrets
+from typing import Optional, Set
+
+from aiogram.methods import TelegramMethod
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "").rstrip("/")
+TELEGRAM_WEBHOOK_PATH = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram/webhook")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+TELEGRAM_WEBHOOK_MAX_IN_FLIGHT = int(os.getenv("TELEGRAM_WEBHOOK_MAX_IN_FLIGHT", "64"))
+
+
+class WebhookHandler:
+    def __init__(self, dispatcher, bot, secret: Optional[str] = TELEGRAM_WEBHOOK_SECRET,
+                 max_in_flight: int = TELEGRAM_WEBHOOK_MAX_IN_FLIGHT, path: str = TELEGRAM_WEBHOOK_PATH):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        # Telegram accepts 1-256 characters of A-Z, a-z, 0-9, _ and -
+        self.secret = secret or secrets.token_urlsafe(32)
+        self.max_in_flight = max_in_flight
+        self.path = path
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.accepted = 0
+        self.rejected = 0
+
+    def mount(self, app: FastAPI):
+        """Add the update route to ``app``."""
+        app.add_api_route(self.path, self.handle, methods=["POST"], include_in_schema=False)
+
+    async def register(self, base_url: str = TELEGRAM_WEBHOOK_URL):
+        """Point Telegram at this webhook."""
+        await self.bot.set_webhook(
+            f"{base_url}{self.path}",
+            secret_token=self.secret,
+            allowed_updates=self.dispatcher.resolve_used_update_types(),
+            max_connections=min(100, self.max_in_flight),
+        )
+        logger.info(f"Webhook set to {base_url}{self.path}")
+
+    async def _process(self, update: dict):
+        try:
+            result = await self.dispatcher.feed_raw_update(self.bot, update)
+            if isinstance(result, TelegramMethod):
+                await self.dispatcher.silent_call_request(self.bot, result)
+        except Exception as e:
+            logger.error(f"Error processing update {update.get('update_id')}: {e}")
+        finally:
+            self._slots.release()
+
+    async def handle(self, request: Request,
+                     x_telegram_bot_api_secret_token: Optional[str] = Header(None)) -> Response:
+        if not hmac.compare_digest((x_telegram_bot_api_secret_token or "").encode(), self.secret.encode()):
+            self.rejected += 1
+            raise HTTPException(status_code=403, detail="Invalid secret token")
+        try:
+            update = await request.json()
+        except ValueError:  # Invalid JSON or a body that is not UTF-8
+            raise HTTPException(status_code=400, detail="Invalid update")
+        if not isinstance(update, dict):
+            raise HTTPException(status_code=400, detail="Invalid update")
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.accepted += 1
+        return Response(status_code=200)
+
+    async def drain(self):
+        """Wait for updates still being processed."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self):
+        return {"in_flight": len(self._tasks), "accepted": self.accepted, "rejected": self.rejected}
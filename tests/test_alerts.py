@@ -0,0 +1,76 @@
+import time
+from types import SimpleNamespace
+
+from backend.services.alerts import AlertEngine
+
+
+def snapshot(version, spreads):
+    results = [{"token": token, "spread_pct": spread, "is_valid": True} for token, spread in spreads.items()]
+    return SimpleNamespace(version=version, valid=lambda: results)
+
+
+def test_evaluate_fires_only_crossed_thresholds():
+    engine = AlertEngine(hysteresis=0.2, cooldown=0)
+    for user_id, threshold in ((1, 0.5), (2, 1.0), (3, 2.0), (4, 1.0)):
+        engine.subscribe(user_id, threshold, {"WIF"})
+    engine.subscribe(5, 0.1, {"JUP"})
+
+    assert engine.evaluate("WIF", 1.2) == [(1, 0.5), (2, 1.0), (4, 1.0)]
+    # Negative spreads count by magnitude; only the newly crossed threshold fires
+    assert engine.evaluate("WIF", -2.5) == [(3, 2.0)]
+    assert engine.evaluate("WIF", 2.4) == []
+    assert engine.evaluate("BONK", 9.0) == []
+
+
+def test_hysteresis_rearms_below_threshold():
+    engine = AlertEngine(hysteresis=0.2, cooldown=0)
+    engine.subscribe(1, 1.0, {"WIF"})
+    assert engine.evaluate("WIF", 1.05) == [(1, 1.0)]
+    # Hovering around the threshold does not fire again
+    assert engine.evaluate("WIF", 0.95) == []
+    assert engine.evaluate("WIF", 1.1) == []
+    # Dropping more than the hysteresis below re-arms it
+    assert engine.evaluate("WIF", 0.7) == []
+    assert engine.evaluate("WIF", 1.0) == [(1, 1.0)]
+
+
+def test_subscription_updates_and_unsubscribe():
+    engine = AlertEngine(cooldown=0)
+    engine.subscribe(1, 1.0, {"WIF", "JUP"})
+    engine.subscribe(1, 3.0, {"wif"})
+    assert engine.evaluate("JUP", 5.0) == []
+    assert engine.evaluate("WIF", 2.0) == []
+    assert engine.evaluate("WIF", 3.0) == [(1, 3.0)]
+    engine.unsubscribe(1)
+    engine.unsubscribe(1)
+    assert engine.stats()["subscribers"] == 0
+    assert engine.evaluate("WIF", 0.0) == [] and engine.evaluate("WIF", 5.0) == []
+
+
+def test_snapshot_alerts_respect_user_cooldown():
+    now = [0.0]
+    engine = AlertEngine(hysteresis=0.2, cooldown=60, clock=lambda: now[0])
+    engine.subscribe(1, 1.0, {"WIF", "JUP"})
+    alerts = engine.evaluate_snapshot(snapshot(1, {"WIF": 1.5, "JUP": 1.2}))
+    # The cooldown is per token, so tokens crossing at once each alert
+    assert sorted((a.user_id, a.token) for a in alerts) == [(1, "JUP"), (1, "WIF")]
+    assert {a.token: a.data["spread_pct"] for a in alerts} == {"WIF": 1.5, "JUP": 1.2}
+
+    engine.evaluate_snapshot(snapshot(2, {"WIF": 0.0, "JUP": 0.0}))
+    now[0] = 30
+    assert engine.evaluate_snapshot(snapshot(3, {"WIF": 2.0})) == []
+    now[0] = 100
+    engine.evaluate_snapshot(snapshot(4, {"WIF": 0.0}))
+    assert [a.token for a in engine.evaluate_snapshot(snapshot(5, {"WIF": 2.0}))] == ["WIF"]
+    assert engine.stats() == {"subscribers": 1, "fired": 3, "suppressed": 1}
+
+
+def test_evaluation_cost_does_not_scale_with_subscribers():
+    engine = AlertEngine(cooldown=0)
+    for user_id in range(100_000):
+        engine.subscribe(user_id, 1.0 + (user_id % 1000) / 100, {"WIF"})
+    engine.evaluate("WIF", 0.5)
+    started = time.perf_counter()
+    for _ in range(1000):
+        assert engine.evaluate("WIF", 0.5) == []
+    assert (time.perf_counter() - started) / 1000 < 1e-3
@@ -0,0 +1,71 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from backend.ai.alpha_insight_service import AlphaInsightService
+from backend.ai.insight_cache import InsightCache
+
+
+class FakeCompletions:
+    def __init__(self, batch_content):
+        self.batch_content = batch_content
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if "response_format" in kwargs:
+            content = self.batch_content
+        else:
+            content = "single insight"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def make_service(batch_content):
+    service = AlphaInsightService(cache=InsightCache(ttl=60, db_path=None))
+    completions = FakeCompletions(batch_content)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return service, completions
+
+
+def item(token, spread):
+    return {"token": token, "price_cex": 1.0, "price_dex": 1.0 + spread / 100, "spread_pct": spread,
+            "volume_dex": 50_000, "slippage": 0.1, "trend": 2.0}
+
+
+@pytest.mark.asyncio
+async def test_batch_uses_one_call_and_caches():
+    content = json.dumps({"insights": [
+        {"token": "WIF", "insight": "DEX premium, sell on Jupiter."},
+        {"token": "bonk", "insight": "Spread is thin, wait."},
+    ]})
+    service, completions = make_service(content)
+    items = [item("WIF", 1.5), item("BONK", 0.2)]
+
+    insights = await service.get_insights_batch(items)
+    assert insights == {"WIF": "DEX premium, sell on Jupiter.", "BONK": "Spread is thin, wait."}
+    assert len(completions.calls) == 1
+
+    assert await service.get_insights_batch(items) == insights
+    assert len(completions.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_falls_back_per_token_for_invalid_entries():
+    content = json.dumps({"insights": [
+        {"token": "WIF", "insight": "DEX premium."},
+        {"token": "BONK", "insight": ""},
+        "garbage",
+    ]})
+    service, completions = make_service(content)
+
+    insights = await service.get_insights_batch([item("WIF", 1.5), item("BONK", 0.2), item("JUP", -0.8)])
+    assert insights == {"WIF": "DEX premium.", "BONK": "single insight", "JUP": "single insight"}
+    assert len(completions.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_unparseable_response_falls_back_for_all():
+    service, completions = make_service("not json")
+    insights = await service.get_insights_batch([item("WIF", 1.5)])
+    assert insights == {"WIF": "single insight"}
+    assert len(completions.calls) == 2
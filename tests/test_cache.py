@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from backend.services.cache import MarketDataCache
+
+@pytest.mark.asyncio
+async def test_cache_hits_and_coalesces_misses():
+    cache = MarketDataCache(maxsize=10)
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"daily_volume": 100}
+
+    results = await asyncio.gather(*[cache.get_or_fetch("jup", fetch, ttl=60) for _ in range(5)])
+    assert all(r == {"daily_volume": 100} for r in results)
+    assert await cache.get_or_fetch("jup", fetch, ttl=60) == {"daily_volume": 100}
+    assert calls == 1
+    assert cache.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_cache_serves_stale_while_refreshing():
+    cache = MarketDataCache()
+    values = iter([1, 2])
+
+    async def fetch():
+        return next(values)
+
+    assert await cache.get_or_fetch("candles", fetch, ttl=0, stale_ttl=60) == 1
+    assert await cache.get_or_fetch("candles", fetch, ttl=0, stale_ttl=60) == 1
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert await cache.get_or_fetch("candles", fetch, ttl=60) == 2
+    assert cache.stats()["stale_hits"] >= 1
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used_and_skips_errors():
+    cache = MarketDataCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert await cache.get_or_fetch("a", None) == 1
+    cache.set("c", 3)
+    assert len(cache) == 2 and cache.stats()["evictions"] == 1
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_fetch("b", failing)
+    assert "b" not in cache._entries
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_fail_shared_fetch():
+    cache = MarketDataCache()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "tokens"
+
+    first = asyncio.create_task(cache.get_or_fetch("okx", fetch, ttl=60))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(cache.get_or_fetch("okx", fetch, ttl=60))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await second == "tokens"
+    assert await cache.get_or_fetch("okx", fetch, ttl=60) == "tokens"
+    assert calls == 1
@@ -0,0 +1,96 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import SendPhoto
+from aiogram.types import BufferedInputFile
+from PIL import Image
+
+from telegram.chart_cache import ChartCache, compact_image
+
+
+def png(width=1920, height=1080):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (20, 120, 200)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class FakeMessage:
+    def __init__(self, reject_file_ids=False):
+        self.sent = []
+        self.reject_file_ids = reject_file_ids
+
+    async def answer_photo(self, photo, caption=None):
+        if isinstance(photo, str) and self.reject_file_ids:
+            raise TelegramBadRequest(SendPhoto(chat_id=1, photo=photo), "wrong file identifier")
+        self.sent.append(photo)
+        return SimpleNamespace(photo=[SimpleNamespace(file_id="small"), SimpleNamespace(file_id=f"id{len(self.sent)}")])
+
+
+def test_compact_image_scales_down_and_reencodes():
+    data, extension = compact_image(png(), max_width=800)
+    assert extension == "jpg"
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.size == (800, 450)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_chart_and_reuse_file_id():
+    produced = []
+
+    async def produce():
+        produced.append(1)
+        await asyncio.sleep(0.01)
+        return png(400, 300)
+
+    cache = ChartCache(bucket_seconds=60, clock=lambda: 1000.0)
+    first, second = await asyncio.gather(cache.get("wif", produce), cache.get("WIF", produce))
+    assert first is second and len(produced) == 1
+
+    message = FakeMessage()
+    assert await cache.send(message, "WIF", produce)
+    assert await cache.send(message, "WIF", produce)
+    assert isinstance(message.sent[0], BufferedInputFile)
+    assert message.sent[1] == "id1"
+    assert cache.stats()["uploads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_new_bucket_evicts_old_charts():
+    now = [1000.0]
+    cache = ChartCache(bucket_seconds=60, clock=lambda: now[0])
+
+    async def produce():
+        return png(400, 300)
+
+    await cache.get("WIF", produce)
+    await cache.get("JUP", produce)
+    now[0] += 60
+    await cache.get("WIF", produce)
+    assert list(cache._entries) == [("WIF", 17)]
+    assert cache.stats()["misses"] == 3
+
+
+@pytest.mark.asyncio
+async def test_rejected_file_id_is_uploaded_again():
+    async def produce():
+        return png(400, 300)
+
+    cache = ChartCache(clock=lambda: 0.0)
+    message = FakeMessage(reject_file_ids=True)
+    await cache.send(message, "WIF", produce)
+    await cache.send(message, "WIF", produce)
+    assert all(isinstance(photo, BufferedInputFile) for photo in message.sent)
+    assert cache.stats()["reuploads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_chart_is_not_cached():
+    async def produce():
+        return None
+
+    cache = ChartCache(clock=lambda: 0.0)
+    assert not await cache.send(FakeMessage(), "WIF", produce)
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+from backend.services.chart_renderer import ChartRenderer
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.mark.asyncio
+async def test_render_in_pool_with_lru_cache():
+    renderer = ChartRenderer(max_workers=1, cache_size=2)
+    times = ["2024-05-01 12:00:00", "2024-05-01 12:01:00", "2024-05-01 12:02:00"]
+    try:
+        first, second = await asyncio.gather(
+            renderer.render("spread_history", "WIF", 1, times, [0.5, 1.2, -0.3]),
+            renderer.render("spread_history", "WIF", 1, times, [0.5, 1.2, -0.3]),
+        )
+        assert first.startswith(PNG_MAGIC) and first is second
+        assert renderer.stats()["renders"] == 1
+
+        assert await renderer.render("spread_history", "WIF", 1, times, [0.5, 1.2, -0.3]) is first
+        assert renderer.stats()["hits"] == 1
+
+        await renderer.render("spread_history", "JUP", 1, times, [0.1, 0.2, 0.3])
+        await renderer.render("spread_history", "WIF", 2, times, [0.5, 1.2, 2.0])
+        # The first entry was least recently used and is evicted
+        assert ("WIF", "spread_history", 1) not in renderer._cache
+        assert renderer.stats() == {"size": 2, "hits": 1, "renders": 3}
+    finally:
+        await renderer.close()
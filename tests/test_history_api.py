@@ -0,0 +1,62 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import routes
+from backend.services.downsample import lttb
+from backend.services.price_history import PriceHistoryService
+
+BASE = 1_714_564_800_000  # 2024-05-01 12:00:00 UTC
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    service = PriceHistoryService(str(tmp_path / "h.db"))
+    for i in range(250):
+        service.save(symbol="WIF", price_cex=1.0, price_dex=1.01, spread_pct=float(i % 50),
+                     timestamp=BASE + i * 60_000)
+    monkeypatch.setattr(routes, "history_service", service)
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_keyset_pagination_walks_range_newest_first(client):
+    params = {"from": BASE + 10 * 60_000, "to": "2024-05-01T15:00:00", "limit": 80}
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/history/WIF", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen.extend(row["ts"] for row in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == [BASE + i * 60_000 for i in range(180, 9, -1)]
+    assert client.get("/api/history/WIF", params={"cursor": "%%%"}).status_code == 400
+
+
+def test_default_returns_latest_rows_in_legacy_shape(client):
+    response = client.get("/api/history/WIF")
+    rows = response.json()
+    assert len(rows) == 100
+    assert rows[0]["timestamp"] == "2024-05-01 16:09:00"
+    assert "created_at" in rows[0] and "ts" not in rows[0] and "id" not in rows[0]
+    assert "X-Next-Cursor" not in response.headers
+    assert len(client.get("/api/history/WIF", params={"limit": 5}).json()) == 5
+
+
+def test_max_points_downsamples(client):
+    response = client.get("/api/history/WIF", params={"from": BASE, "to": BASE + 250 * 60_000, "max_points": 20})
+    points = response.json()
+    assert len(points) == 20
+    assert response.headers["X-Resolution"] in ("1m", "5m")
+    assert points[0]["ts"] < points[-1]["ts"]
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    xs = list(range(1000))
+    ys = [0.0] * 1000
+    ys[421] = 50.0
+    keep = lttb(xs, ys, 30).tolist()
+    assert len(keep) == 30 and keep[0] == 0 and keep[-1] == 999 and 421 in keep
+    assert lttb(xs[:10], ys[:10], 30).tolist() == list(range(10))
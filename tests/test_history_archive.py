@@ -0,0 +1,78 @@
+import sqlite3
+
+from backend.db.migrations import migrate
+from backend.services.history_archive import DAY_MS, HistoryArchive
+from backend.services.price_history import PriceHistoryService, PriceHistoryWriter, insert_rows
+
+DAY0 = 1_714_521_600_000  # 2024-05-01 00:00:00 UTC
+
+
+def row(symbol, ts, spread, valid=True):
+    if not valid:
+        return (symbol, ts, None, None, None, None, None, None, 0, "no quote")
+    return (symbol, ts, 1.0, 1.0 + spread / 100, spread, 10.0, None, "jupiter", 1, None)
+
+
+def make_db(tmp_path):
+    db_path = str(tmp_path / "h.db")
+    migrate(db_path)
+    conn = sqlite3.connect(db_path)
+    rows = []
+    for day in range(3):
+        for i in range(4):
+            ts = DAY0 + day * DAY_MS + i * 3_600_000
+            rows.append(row("WIF", ts, day * 10 + i))
+            rows.append(row("JUP", ts + 1, -i, valid=i != 2))
+    insert_rows(conn, rows, {})
+    return db_path, conn
+
+
+def test_archive_moves_whole_days_and_reads_with_pushdown(tmp_path):
+    db_path, conn = make_db(tmp_path)
+    archive = HistoryArchive(str(tmp_path / "archive"))
+
+    # Cutoff in the middle of day 2: only days 0 and 1 are moved
+    assert archive.archive(conn, DAY0 + 2 * DAY_MS + 5_000) == 16
+    assert archive.days() == ["2024-05-01", "2024-05-02"]
+    assert conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0] == 8
+    assert archive.archive(conn, DAY0 + 2 * DAY_MS + 5_000) == 0
+
+    data = archive.read("WIF", DAY0 + 3_600_000, DAY0 + DAY_MS + 3_600_000)
+    assert data["ts"].tolist() == [DAY0 + h * 3_600_000 for h in (1, 2, 3)] + [DAY0 + DAY_MS, DAY0 + DAY_MS + 3_600_000]
+    assert data["spread_pct"].tolist() == [1.0, 2.0, 3.0, 10.0, 11.0]
+
+    jup = archive.read_rows("JUP", DAY0, DAY0 + DAY_MS)
+    assert [r["is_valid"] for r in jup] == [True, True, False, True]
+    assert jup[2]["price_cex"] is None and jup[2]["error_message"] == "no quote"
+    assert archive.read("NOPE", DAY0, DAY0 + DAY_MS)["ts"].size == 0
+
+    # Re-archiving the same rows (e.g. after a crash before the delete) does not duplicate them
+    archive.write_day("2024-05-01", [("WIF", 1, DAY0, 1.0, 1.0, 0.0, None, None, 1, None, None)])
+    assert len(archive.read_rows("WIF", DAY0, DAY0 + DAY_MS - 1)) == 4
+    conn.close()
+
+
+def test_service_reads_hot_and_cold_tiers(tmp_path):
+    db_path, conn = make_db(tmp_path)
+    archive = HistoryArchive(str(tmp_path / "archive"))
+    archive.archive(conn, DAY0 + 2 * DAY_MS)
+    conn.close()
+    service = PriceHistoryService(db_path, archive=archive)
+
+    history = service.get_history("WIF", limit=6)
+    assert [h["spread_pct"] for h in history] == [23.0, 22.0, 21.0, 20.0, 13.0, 12.0]
+    assert history[4]["timestamp"] == "2024-05-02 03:00:00"
+
+    raw = service.get_raw("WIF", DAY0 + DAY_MS + 2 * 3_600_000, DAY0 + 2 * DAY_MS + 3_600_000)
+    assert [r["spread_pct"] for r in raw] == [12.0, 13.0, 20.0, 21.0]
+
+
+def test_writer_archives_expired_rows(tmp_path):
+    db_path, conn = make_db(tmp_path)
+    conn.close()
+    archive = HistoryArchive(str(tmp_path / "archive"))
+    writer = PriceHistoryWriter(db_path, retention_hours=0, archive=archive)
+    writer._write([row("WIF", DAY0 + 3 * DAY_MS, 1.0)])
+    assert writer.archived == 25
+    assert len(archive.days()) == 4
+    assert writer.stats()["archived"] == 25
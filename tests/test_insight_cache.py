@@ -0,0 +1,29 @@
+import pytest
+from backend.ai.insight_cache import InsightCache, insight_key
+
+def test_key_buckets_nearby_market_states_together():
+    base = insight_key("wif", False, spread=1.01, trend=3.2, slippage=0.12, volume=25_000)
+    assert base == insight_key("WIF", False, spread=1.2, trend=3.9, slippage=0.18, volume=90_000)
+    assert base != insight_key("WIF", True, spread=1.01, trend=3.2, slippage=0.12, volume=25_000)
+    assert base != insight_key("WIF", False, spread=1.3, trend=3.2, slippage=0.12, volume=25_000)
+    assert base != insight_key("WIF", False, spread=1.01, trend=3.2, slippage=0.12, volume=250_000)
+    assert insight_key("WIF", False, 1.0, None, None, 0).endswith("na|na|0")
+
+@pytest.mark.asyncio
+async def test_persistent_tier_survives_new_instance(tmp_path):
+    db_path = str(tmp_path / "insights.db")
+    cache = InsightCache(ttl=60, db_path=db_path)
+    assert await cache.get("k") is None
+    await cache.set("k", "Spread is widening on DEX.")
+    assert await cache.get("k") == "Spread is widening on DEX."
+
+    restarted = InsightCache(ttl=60, db_path=db_path)
+    assert await restarted.get("k") == "Spread is widening on DEX."
+    assert restarted.stats()["persistent_hits"] == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_misses():
+    cache = InsightCache(ttl=0)
+    await cache.set("k", "text")
+    assert await cache.get("k") is None
@@ -0,0 +1,58 @@
+import httpx
+import pytest
+from backend.services import price_comparator
+from backend.services.cache import MarketDataCache
+from backend.services.jupiter_prices import JupiterPriceSource
+from backend.services.price_comparator import PriceComparator
+
+class FakeJupiterClient:
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = 0
+
+    async def get_prices(self, mints):
+        self.calls += 1
+        return {mint: self.prices[mint] for mint in mints if mint in self.prices}
+
+class FakeCEXSource:
+    def __init__(self, prices):
+        self.prices = prices
+
+    async def get(self, symbol):
+        return {"last": self.prices[symbol], "vol24h": "1000", "change24h": 1.0}
+
+@pytest.mark.asyncio
+async def test_source_fetches_all_mints_once():
+    client = FakeJupiterClient({"a": 1.0, "b": 2.0})
+    source = JupiterPriceSource(["a", "b", "c"], max_age=60, client=client)
+    assert await source.get("a") == 1.0
+    assert await source.get("b") == 2.0
+    assert await source.get("c") is None
+    assert client.calls == 1
+
+@pytest.mark.asyncio
+async def test_comparator_quotes_only_tokens_passing_prefilter(monkeypatch):
+    quoted = []
+
+    def handler(request):
+        if request.url.host == "tokens.jup.ag":
+            return httpx.Response(200, json={"daily_volume": 50000})
+        quoted.append(request.url.params["inputMint"])
+        return httpx.Response(200, json={"outAmount": "1050000", "priceImpactPct": "0.1"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(price_comparator, "get_http_client", lambda url: client)
+    comparator = PriceComparator()
+    comparator.cache = MarketDataCache()
+    wif_mint, jup_mint = comparator.tokens["WIF"][0], comparator.tokens["JUP"][0]
+    comparator.cex_source = FakeCEXSource({"WIF": 1.0, "JUP": 1.0})
+    comparator.dex_source = JupiterPriceSource([wif_mint, jup_mint], max_age=60,
+                                               client=FakeJupiterClient({wif_mint: 1.001, jup_mint: 1.04}))
+
+    calm = await comparator.compare_price("WIF")
+    wide = await comparator.compare_price("JUP")
+    await client.aclose()
+
+    assert quoted == [jup_mint]
+    assert calm.is_valid and calm.price_dex == pytest.approx(1.001) and calm.slippage is None
+    assert wide.is_valid and wide.price_dex == pytest.approx(1.05) and wide.slippage == pytest.approx(0.1)
@@ -0,0 +1,63 @@
+import pytest
+
+from backend.services.chart_renderer import ChartRenderer
+from backend.services.market_chart import MarketChartService, parse_candles
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+START = 1_714_564_800_000
+BAR_MS = 900_000
+
+
+def okx_candles(n):
+    rows = []
+    for i in range(n):
+        price = 2.0 + 0.01 * (i % 5)
+        rows.append([str(START + i * BAR_MS), str(price), str(price + 0.02), str(price - 0.02),
+                     str(price + (0.01 if i % 2 else -0.01)), str(1000 + i), "0", "0", "1"])
+    return {"code": "0", "msg": "", "data": rows[::-1]}
+
+
+class FakeOKXClient:
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    async def get_candles(self, symbol, bar="5m", limit=100, quote="USDT"):
+        self.calls.append((symbol, bar, limit, quote))
+        return self.response
+
+
+class FakeHistory:
+    def get_series(self, symbol, start=None, end=None, max_points=500):
+        points = [{"ts": START + i * 60_000, "spread_close": 0.1 * (i % 7) - 0.3} for i in range(60)]
+        points.append({"ts": START + 61 * 60_000, "spread_close": None})
+        return {"symbol": symbol, "resolution": "1m", "points": points}
+
+
+def test_parse_candles_sorts_oldest_first():
+    candles = parse_candles(okx_candles(3))
+    assert candles["ts"] == [START, START + BAR_MS, START + 2 * BAR_MS]
+    assert candles["volume"] == [1000.0, 1001.0, 1002.0]
+    assert parse_candles({"code": "51001", "msg": "Instrument ID does not exist", "data": []}) is None
+
+
+@pytest.mark.asyncio
+async def test_render_candles_with_spread_overlay():
+    renderer = ChartRenderer(max_workers=1)
+    client = FakeOKXClient(okx_candles(20))
+    charts = MarketChartService(renderer, FakeHistory(), client=client, bar="15m", limit=20)
+    try:
+        png = await charts.render("wif")
+        assert png.startswith(PNG_MAGIC)
+        assert client.calls == [("WIF", "15m", 20, "USDC")]
+        # Same candles and spreads -> same data version -> served from the renderer cache
+        assert await charts.render("WIF") is png
+        assert renderer.stats()["renders"] == 1
+    finally:
+        await renderer.close()
+
+
+@pytest.mark.asyncio
+async def test_render_without_candles_returns_none():
+    charts = MarketChartService(None, FakeHistory(), client=FakeOKXClient({"code": "0", "data": []}))
+    assert await charts.render("WIF") is None
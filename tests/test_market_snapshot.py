@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from backend.services.market_snapshot import SnapshotScheduler
+
+class FakeService:
+    def __init__(self):
+        self.scans = 0
+
+    async def compare_many(self):
+        self.scans += 1
+        await asyncio.sleep(0.01)
+        return [
+            {"token": "WIF", "spread_pct": 2.0, "is_valid": True},
+            {"token": "JUP", "spread_pct": 0.5, "is_valid": True},
+            {"token": "PNUT", "is_valid": False, "error": "Timed out"},
+        ]
+
+@pytest.mark.asyncio
+async def test_readers_share_one_scan_and_snapshot_is_immutable():
+    service = FakeService()
+    scheduler = SnapshotScheduler(service, interval=60)
+    first, second = await asyncio.gather(scheduler.get(), scheduler.get())
+    assert first is second
+    assert service.scans == 1
+    assert first.version == 1
+    assert [r["token"] for r in first.valid()] == ["WIF", "JUP"]
+    assert [r["token"] for r in first.select(["jup", "pnut"])] == ["JUP", "PNUT"]
+    with pytest.raises(TypeError):
+        first.get("WIF")["spread_pct"] = 0
+
+@pytest.mark.asyncio
+async def test_scheduler_publishes_new_versions_to_listeners():
+    published = []
+
+    async def listener(snapshot):
+        published.append(snapshot.version)
+
+    scheduler = SnapshotScheduler(FakeService(), interval=0.01)
+    scheduler.subscribe(listener)
+    await scheduler.start()
+    await asyncio.sleep(0.1)
+    await scheduler.stop()
+    assert len(published) >= 2
+    assert published == sorted(published)
+    assert scheduler.latest.version == published[-1]
@@ -0,0 +1,48 @@
+import sqlite3
+
+from backend.db.migrations import LATEST_VERSION, current_version, migrate
+from backend.services.price_history import PriceHistoryService, to_epoch_ms
+
+
+def test_v1_rows_migrate_to_epoch_ms_and_symbol_ids(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    assert migrate(db_path, target=1) == 1
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO price_history (symbol, price_cex, price_dex, spread_pct, is_valid, error_message, timestamp, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                ("WIF", 1.0, 1.01, 1.0, 1, None, "2024-05-01 12:00:00", "2024-05-01 12:00:01"),
+                ("WIF", 1.1, 1.12, 1.8, 1, None, "2024-05-01T12:00:30.250000", "2024-05-01 12:00:31"),
+                ("JUP", None, None, None, 0, "no quote", "", "2024-05-01 12:01:00"),
+            ],
+        )
+
+    assert migrate(db_path) == LATEST_VERSION
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT s.symbol, p.ts, p.spread_pct FROM price_history p JOIN symbols s ON s.id = p.symbol_id ORDER BY p.id"
+        ).fetchall()
+        plan = " ".join(r[-1] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT ts, spread_pct FROM price_history WHERE symbol_id = 1 ORDER BY ts DESC LIMIT 10"
+        ))
+    assert rows == [
+        ("WIF", to_epoch_ms("2024-05-01 12:00:00"), 1.0),
+        ("WIF", to_epoch_ms("2024-05-01 12:00:30.250"), 1.8),
+        ("JUP", to_epoch_ms("2024-05-01 12:01:00"), None),
+    ]
+    assert "COVERING INDEX idx_price_history_symbol_ts" in plan
+
+    history = PriceHistoryService(db_path).get_history("WIF")
+    assert [h["timestamp"] for h in history] == ["2024-05-01 12:00:30", "2024-05-01 12:00:00"]
+    assert history[0]["spread_pct"] == 1.8 and history[0]["is_valid"] is True
+
+
+def test_migrate_is_idempotent_and_service_migrates_lazily(tmp_path):
+    db_path = str(tmp_path / "fresh.db")
+    service = PriceHistoryService(db_path)
+    service.save(symbol="WIF", price_cex=1.0, price_dex=1.01, spread_pct=1.0, timestamp="2024-05-01 12:00:00")
+    assert migrate(db_path) == LATEST_VERSION
+    with sqlite3.connect(db_path) as conn:
+        assert current_version(conn) == LATEST_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0] == 1
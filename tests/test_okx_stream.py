@@ -0,0 +1,68 @@
+import asyncio
+import json
+import pytest
+from aiohttp import web
+from backend.services.okx_stream import OKXTickerStream, PriceBook
+
+def ticker_push(inst_id, last):
+    return json.dumps({
+        "arg": {"channel": "tickers", "instId": inst_id},
+        "data": [{"instId": inst_id, "last": str(last), "open24h": "2.0", "volCcy24h": "1000", "bidPx": "0", "askPx": "0", "ts": "0"}],
+    })
+
+async def start_stand_in_server(subscriptions, pings):
+    """Local OKX stand-in: pushes one ticker per subscription, answers pings, drops the first connection."""
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            if msg.data == "ping":
+                pings.append(msg.data)
+                await ws.send_str("pong")
+                continue
+            subscribe = json.loads(msg.data)
+            subscriptions.append(subscribe)
+            for arg in subscribe["args"]:
+                await ws.send_str(ticker_push(arg["instId"], 2.0 + len(subscriptions) / 10))
+            if len(subscriptions) == 1:
+                await ws.close()
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/ws"
+
+@pytest.mark.asyncio
+async def test_stream_reconnects_resubscribes_and_pings():
+    subscriptions, pings = [], []
+    runner, url = await start_stand_in_server(subscriptions, pings)
+    stream = OKXTickerStream(["WIF"], url=url, ping_interval=0.1, reconnect_delay=0.01)
+    await stream.start()
+    try:
+        for _ in range(100):
+            if len(subscriptions) >= 2 and pings:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await stream.stop()
+        await runner.cleanup()
+    assert len(subscriptions) >= 2
+    assert subscriptions[1]["args"] == [{"channel": "tickers", "instId": "WIF-USDC"}]
+    assert stream.reconnects >= 1
+    assert pings
+    entry = stream.book.get("WIF")
+    assert entry["last"] == pytest.approx(2.2)
+    assert entry["change24h"] == pytest.approx(10.0)
+    assert entry["stale"] is False
+
+def test_price_book_flags_stale_entries():
+    book = PriceBook(stale_after=0)
+    book.update("wif", {"last": 1.0})
+    assert book.get("WIF")["stale"] is True
+    assert book.is_stale("JUP")
+    assert book.get("JUP") is None
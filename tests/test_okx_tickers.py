@@ -0,0 +1,47 @@
+import pytest
+from backend.services.okx_tickers import OKXTickerSource, parse_tickers
+
+TICKERS = {
+    "code": "0",
+    "data": [
+        {"instId": "WIF-USDC", "last": "2.2", "open24h": "2.0", "sodUtc0": "2.1", "volCcy24h": "5000", "bidPx": "2.19", "askPx": "2.21", "ts": "1700000000000"},
+        {"instId": "JUP-USDC", "last": "1.0", "open24h": "0", "sodUtc0": "0.8", "volCcy24h": "900", "bidPx": "0.99", "askPx": "1.01", "ts": "1700000000000"},
+        {"instId": "WIF-USDT", "last": "9.9", "open24h": "9.9"},
+        {"instId": "BTC-USDC", "last": "60000", "open24h": "59000"},
+    ],
+}
+
+class FakeOKXClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_tickers(self, inst_type="SPOT"):
+        self.calls += 1
+        return TICKERS
+
+def test_parse_tickers_indexes_tracked_usdc_pairs():
+    book = parse_tickers(TICKERS, ["WIF", "JUP", "PYTH"])
+    assert set(book) == {"WIF", "JUP"}
+    assert book["WIF"]["last"] == 2.2
+    assert book["WIF"]["change24h"] == pytest.approx(10.0)
+    # open24h missing -> falls back to the UTC day open
+    assert book["JUP"]["change24h"] == pytest.approx(25.0)
+
+def test_malformed_fields_only_affect_their_ticker():
+    data = {"data": [
+        {"instId": "WIF-USDC", "last": "2.2", "open24h": {"bad": 1}, "sodUtc0": "2.0", "bidPx": "n/a", "askPx": [], "ts": "soon"},
+        {"instId": "JUP-USDC", "last": "1.0", "open24h": "0.8", "bidPx": "0.99", "askPx": "1.01", "ts": "1700000000000"},
+    ]}
+    book = parse_tickers(data, ["WIF", "JUP"])
+    assert book["WIF"]["change24h"] == pytest.approx(10.0)
+    assert (book["WIF"]["bid"], book["WIF"]["ask"], book["WIF"]["ts"]) == (0.0, 0.0, 0)
+    assert (book["JUP"]["bid"], book["JUP"]["ts"]) == (0.99, 1700000000000)
+
+@pytest.mark.asyncio
+async def test_source_fetches_once_per_cycle():
+    client = FakeOKXClient()
+    source = OKXTickerSource(["WIF", "JUP"], max_age=60, client=client)
+    assert (await source.get("WIF"))["last"] == 2.2
+    assert (await source.get("JUP"))["last"] == 1.0
+    assert await source.get("PYTH") is None
+    assert client.calls == 1
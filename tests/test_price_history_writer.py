@@ -0,0 +1,82 @@
+import asyncio
+import sqlite3
+
+import pytest
+from backend.services.price_history import PriceHistoryService, PriceHistoryWriter
+
+SCHEMA = """
+CREATE TABLE price_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    price_cex REAL,
+    price_dex REAL,
+    spread_pct REAL,
+    volume_cex FLOAT,
+    volume_dex FLOAT,
+    source_dex TEXT,
+    is_valid BOOLEAN DEFAULT TRUE,
+    error_message TEXT,
+    timestamp TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "history.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute(SCHEMA)
+    return path
+
+
+def count_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0]
+
+
+@pytest.mark.asyncio
+async def test_batches_flush_on_size_and_time(db_path):
+    service = PriceHistoryService(db_path, PriceHistoryWriter(db_path, batch_size=3, flush_interval=0.05))
+    await service.start()
+    for i in range(4):
+        service.save(symbol="WIF", price_cex=1.0, price_dex=1.01, spread_pct=float(i))
+    assert count_rows(db_path) == 0  # Nothing written synchronously
+
+    await asyncio.sleep(0.2)
+    stats = service.writer.stats()
+    assert count_rows(db_path) == 4
+    assert stats["flushes"] == 2 and stats["written"] == 4
+    assert stats["queue_depth"] == 0 and stats["last_flush_ms"] > 0
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_queued_rows(db_path):
+    service = PriceHistoryService(db_path, PriceHistoryWriter(db_path, batch_size=1000, flush_interval=60))
+    await service.start()
+    for _ in range(50):
+        service.save(symbol="JUP", price_cex=1.0, price_dex=1.0, spread_pct=0.0)
+    await service.stop()
+    assert count_rows(db_path) == 50
+    assert service.get_history("JUP", limit=5)[0]["symbol"] == "JUP"
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_rows(db_path):
+    writer = PriceHistoryWriter(db_path, batch_size=10, flush_interval=60, max_queue=2)
+    service = PriceHistoryService(db_path, writer)
+    await service.start()
+    for _ in range(5):
+        service.save(symbol="WIF", price_cex=1.0, price_dex=1.0, spread_pct=0.0)
+    assert writer.stats()["dropped"] == 3
+    await service.stop()
+    assert count_rows(db_path) == 2
+
+
+def test_save_without_writer_is_synchronous(db_path):
+    service = PriceHistoryService(db_path)
+    service.save(symbol="WIF", price_cex=1.0, price_dex=1.01, spread_pct=1.0)
+    assert count_rows(db_path) == 1
@@ -0,0 +1,81 @@
+import sqlite3
+import time
+
+from backend.db.migrations import migrate
+from backend.db.rollups import pick_resolution, prune_raw, query_rollups
+from backend.services.price_history import PriceHistoryService, PriceHistoryWriter, insert_rows
+
+BASE = 1_714_564_800_000  # 2024-05-01 12:00:00 UTC, on an hour boundary
+
+
+def row(ts, spread, cex=1.0, valid=True):
+    return ("WIF", ts, cex, cex * (1 + spread / 100), spread, None, None, "jupiter", int(valid), None)
+
+
+def test_rollups_merge_incrementally_and_out_of_order(tmp_path):
+    db_path = str(tmp_path / "h.db")
+    migrate(db_path)
+    conn = sqlite3.connect(db_path)
+    ids = {}
+    insert_rows(conn, [row(BASE + 10_000, 1.0), row(BASE + 20_000, 3.0)], ids)
+    insert_rows(conn, [row(BASE + 5_000, 2.0), row(BASE + 50_000, -1.0), row(BASE + 30_000, 9.0, valid=False)], ids)
+    insert_rows(conn, [row(BASE + 61_000, 0.5)], ids)
+
+    one_min = conn.execute(
+        "SELECT bucket_ts, count, spread_open, spread_high, spread_low, spread_close FROM price_rollups "
+        "WHERE resolution = 60 ORDER BY bucket_ts"
+    ).fetchall()
+    assert one_min == [(BASE, 4, 2.0, 3.0, -1.0, -1.0), (BASE + 60_000, 1, 0.5, 0.5, 0.5, 0.5)]
+    assert conn.execute(
+        "SELECT count, spread_open, spread_close FROM price_rollups WHERE resolution = 3600"
+    ).fetchall() == [(5, 2.0, 0.5)]
+
+    # Raw rows go, rollups stay
+    assert prune_raw(conn, BASE + 60_000, chunk=2) == 5
+    assert conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM price_rollups").fetchone()[0] == 4  # 2 x 1m, 1 x 5m, 1 x 1h
+    conn.close()
+
+
+def test_pick_resolution_and_series(tmp_path):
+    assert pick_resolution(BASE, BASE + 3_600_000, 500) == "1m"
+    assert pick_resolution(BASE, BASE + 24 * 3_600_000, 500) == "5m"
+    assert pick_resolution(BASE, BASE + 30 * 24 * 3_600_000, 500) == "1h"
+    assert pick_resolution(BASE, BASE + 365 * 24 * 3_600_000, 500) == "1h"
+
+    db_path = str(tmp_path / "h.db")
+    service = PriceHistoryService(db_path)
+    for i in range(120):  # Two hours of one sample per minute
+        service.save(symbol="WIF", price_cex=1.0, price_dex=1.01, spread_pct=float(i), timestamp=BASE + i * 60_000)
+
+    series = service.get_series("WIF", start=BASE, end=BASE + 2 * 3_600_000, max_points=30)
+    assert series["resolution"] == "5m"
+    assert len(series["points"]) == 24
+    first = series["points"][0]
+    assert (first["count"], first["spread_open"], first["spread_close"]) == (5, 0.0, 4.0)
+    assert first["timestamp"] == "2024-05-01 12:00:00"
+
+    # Old range: rollups only, even when few points would be needed
+    assert service.get_series("WIF", start=BASE, end=BASE + 600_000, max_points=1000)["resolution"] == "1m"
+    assert service.get_series("NOPE")["points"] == []
+
+
+def test_rollup_limit_keeps_most_recent_buckets(tmp_path):
+    db_path = str(tmp_path / "h.db")
+    migrate(db_path)
+    conn = sqlite3.connect(db_path)
+    ids = {}
+    insert_rows(conn, [row(BASE + i * 60_000, float(i)) for i in range(10)], ids)
+    points = query_rollups(conn, ids["WIF"], "1m", BASE, BASE + 10 * 60_000, limit=3)
+    assert [p["ts"] for p in points] == [BASE + i * 60_000 for i in (7, 8, 9)]
+    conn.close()
+
+
+def test_series_uses_writer_retention(tmp_path):
+    db_path = str(tmp_path / "h.db")
+    service = PriceHistoryService(db_path, writer=PriceHistoryWriter(db_path, retention_hours=0))
+    now = int(time.time() * 1000)
+    for i in range(5):
+        service.save(symbol="WIF", price_cex=1.0, price_dex=1.01, spread_pct=1.0, timestamp=now - i * 1000)
+    # Nothing is kept raw, so even a recent range is read from rollups
+    assert service.get_series("WIF", start=now - 60_000, end=now)["resolution"] == "1m"
@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+from backend.services.scan_engine import ScanEngine
+
+@pytest.mark.asyncio
+async def test_scan_runs_tokens_concurrently_within_limit():
+    running = 0
+    peak = 0
+
+    async def worker(symbol):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return {"token": symbol, "spread_pct": len(symbol)}
+
+    engine = ScanEngine(concurrency=2, timeout=1)
+    results = await engine.scan(["WIF", "JUP", "PYTH", "MOODENG"], worker, key=lambda r: r["spread_pct"])
+    assert [r["token"] for r in results] == ["MOODENG", "PYTH", "WIF", "JUP"]
+    assert peak == 2
+
+@pytest.mark.asyncio
+async def test_scan_reports_timeouts_and_errors_via_handler():
+    async def worker(symbol):
+        if symbol == "SLOW":
+            await asyncio.sleep(1)
+        if symbol == "BAD":
+            raise RuntimeError("boom")
+        return symbol
+
+    engine = ScanEngine(concurrency=5, timeout=0.05)
+    order = [symbol async for symbol, _ in engine.iter_scan(["SLOW", "BAD", "OK"], worker, on_error=lambda s, e: type(e).__name__)]
+    assert order[-1] == "SLOW"
+    results = await engine.scan(["SLOW", "BAD", "OK"], worker, on_error=lambda s, e: type(e).__name__)
+    assert results == ["TimeoutError", "RuntimeError", "OK"]
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from telegram.screenshots import BrowserPool, PoolBusyError
+
+
+class FakeDriver:
+    def __init__(self):
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+
+def make_pool(capture_fn=None, **kwargs):
+    drivers = []
+
+    def factory():
+        driver = FakeDriver()
+        drivers.append(driver)
+        return driver
+
+    pool = BrowserPool(driver_factory=factory,
+                       capture_fn=capture_fn or (lambda driver, url, timeout: url.encode()), **kwargs)
+    return pool, drivers
+
+
+@pytest.mark.asyncio
+async def test_browsers_stay_warm_between_captures():
+    pool, drivers = make_pool(size=1)
+    assert await pool.capture("a") == b"a"
+    assert await pool.capture("b") == b"b"
+    assert len(drivers) == 1
+    assert not drivers[0].closed
+    await pool.close()
+    assert drivers[0].closed
+
+
+@pytest.mark.asyncio
+async def test_browser_recycled_after_max_uses():
+    pool, drivers = make_pool(size=1, max_uses=2)
+    for url in ("a", "b", "c"):
+        await pool.capture(url)
+    assert len(drivers) == 2
+    assert drivers[0].closed
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_browser_is_replaced():
+    def capture(driver, url, timeout):
+        if url == "bad":
+            raise WebDriverException("crashed")
+        return b"png"
+
+    pool, drivers = make_pool(capture, size=1)
+    assert await pool.capture("bad") is None
+    assert await pool.capture("good") == b"png"
+    assert len(drivers) == 2
+    assert drivers[0].closed
+    assert pool.stats()["failures"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_capture_timeout(monkeypatch):
+    monkeypatch.setattr("telegram.screenshots.CAPTURE_GRACE", 0)
+    pool, _ = make_pool(lambda driver, url, timeout: time.sleep(0.3) or b"png", size=1, timeout=0.1)
+    assert await pool.capture("slow") is None
+    assert pool.stats()["timeouts"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_captures():
+    pool, _ = make_pool(lambda driver, url, timeout: time.sleep(0.2) or b"png", size=1, queue_size=1)
+    first = asyncio.create_task(pool.capture("a"))
+    second = asyncio.create_task(pool.capture("b"))
+    await asyncio.sleep(0.05)
+    with pytest.raises(PoolBusyError):
+        await pool.capture("c")
+    assert await first == b"png"
+    assert await second == b"png"
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_timed_out_capture_keeps_slot_until_thread_finishes(monkeypatch):
+    monkeypatch.setattr("telegram.screenshots.CAPTURE_GRACE", 0)
+
+    def capture(driver, url, timeout):
+        if url == "slow":
+            time.sleep(0.3)
+        return url.encode()
+
+    pool, drivers = make_pool(capture, size=1, timeout=0.15)
+    assert await pool.capture("slow") is None
+    # Waits for the slow thread instead of timing out behind it in the executor queue
+    assert await pool.capture("fast") == b"fast"
+    assert pool.stats()["timeouts"] == 1
+    assert len(drivers) == 2
+    assert drivers[0].closed
+    await pool.close()
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetMe, SendMessage
+
+from telegram.send_queue import SendScheduler, TokenBucket
+
+
+class FakeBot:
+    """Sends through the scheduler like a bot session with the middleware registered."""
+
+    def __init__(self, scheduler, fail_first=0):
+        self.scheduler = scheduler
+        self.sent = []
+        self.fail_first = fail_first
+
+    async def make_request(self, bot, method):
+        if self.fail_first:
+            self.fail_first -= 1
+            raise TelegramRetryAfter(method, "Too Many Requests", 0)
+        self.sent.append((method.chat_id, method.text))
+        return True
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return await self.scheduler(self.make_request, self, SendMessage(chat_id=chat_id, text=text, **kwargs))
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2, burst=2, now=0.0)
+    bucket.take(0.0)
+    bucket.take(0.0)
+    assert bucket.delay(0.0) == pytest.approx(0.5)
+    assert bucket.delay(0.5) == 0
+    assert not bucket.idle(0.5) and bucket.idle(1.0)
+
+
+@pytest.mark.asyncio
+async def test_requests_without_chat_pass_through():
+    scheduler = SendScheduler(rate=1, chat_rate=1, chat_burst=1)
+
+    async def make_request(bot, method):
+        return "me"
+
+    for _ in range(5):
+        assert await scheduler(make_request, None, GetMe()) == "me"
+    assert scheduler.stats()["granted"] == 0
+
+
+@pytest.mark.asyncio
+async def test_per_chat_pacing_after_burst():
+    scheduler = SendScheduler(rate=100, chat_rate=20, chat_burst=2)
+    bot = FakeBot(scheduler)
+    started = time.monotonic()
+    await asyncio.gather(*(bot.send_message(1, str(i)) for i in range(4)))
+    # Two sends fit the burst, the other two wait 1/20 s each
+    assert time.monotonic() - started >= 0.09
+    await bot.send_message(2, "other chat")
+    assert [text for _, text in bot.sent] == ["0", "1", "2", "3", "other chat"]
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured():
+    scheduler = SendScheduler(rate=100, chat_rate=100, chat_burst=5, max_retries=2)
+    bot = FakeBot(scheduler, fail_first=2)
+    assert await bot.send_message(1, "hi") is True
+    assert scheduler.stats()["retries"] == 2
+
+    bot.fail_first = 3
+    with pytest.raises(TelegramRetryAfter):
+        await bot.send_message(1, "again")
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_interactive_replies_go_ahead_of_broadcasts():
+    scheduler = SendScheduler(rate=20, chat_rate=100, chat_burst=100, workers=2)
+    bot = FakeBot(scheduler)
+    for user_id in range(40):
+        scheduler.broadcast(user_id, "alert")
+    await scheduler.start(bot)
+    await asyncio.sleep(0.2)
+    started = time.monotonic()
+    await bot.send_message(999, "reply")
+    # The reply waits for at most one global token, not for the backlog of alerts
+    assert time.monotonic() - started < 0.15
+    assert scheduler.stats()["pending_broadcasts"] > 0
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_superseded_broadcasts_collapse():
+    scheduler = SendScheduler(rate=100, chat_rate=100, chat_burst=100, workers=1, max_pending=3)
+    bot = FakeBot(scheduler)
+    assert scheduler.broadcast(1, "WIF 2%", collapse_key=(1, "WIF"))
+    assert scheduler.broadcast(1, "JUP 3%", collapse_key=(1, "JUP"))
+    assert scheduler.broadcast(1, "WIF 4%", collapse_key=(1, "WIF"))
+    assert scheduler.broadcast(2, "no key")
+    assert not scheduler.broadcast(3, "queue full")
+    await scheduler.start(bot)
+    for _ in range(50):
+        if scheduler.stats()["sent"] == 3:
+            break
+        await asyncio.sleep(0.01)
+    assert bot.sent == [(1, "WIF 4%"), (1, "JUP 3%"), (2, "no key")]
+    assert scheduler.stats()["collapsed"] == 1 and scheduler.stats()["dropped"] == 1
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_are_skipped():
+    scheduler = SendScheduler(rate=100, chat_rate=10, chat_burst=1)
+    bot = FakeBot(scheduler)
+    await bot.send_message(1, "first")
+    waiting = asyncio.create_task(bot.send_message(1, "cancelled"))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    await bot.send_message(1, "second")
+    assert [text for _, text in bot.sent] == ["first", "second"]
+    await scheduler.stop()
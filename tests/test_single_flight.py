@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from backend.services.single_flight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    flights = SingleFlight(fresh_for=0)
+    calls = 0
+
+    async def compare():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"token": "WIF"}
+
+    results = await asyncio.gather(*[flights.do("WIF", compare) for _ in range(20)])
+    assert calls == 1
+    assert all(r is results[0] for r in results)
+    await flights.do("WIF", compare)
+    assert calls == 2
+
+@pytest.mark.asyncio
+async def test_results_reused_within_window_and_errors_not_cached():
+    flights = SingleFlight(fresh_for=60)
+    outcomes = iter([RuntimeError("upstream"), "ok"])
+
+    async def flaky():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    with pytest.raises(RuntimeError):
+        await flights.do("JUP", flaky)
+    assert await flights.do("JUP", flaky) == "ok"
+    assert await flights.do("JUP", flaky) == "ok"
+    assert flights.calls == 2 and flights.shared == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_followers():
+    flights = SingleFlight(fresh_for=0)
+    calls = 0
+
+    async def scan():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "snapshot"
+
+    leader = asyncio.create_task(flights.do("scan", scan))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("scan", scan))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await follower == "snapshot"
+    assert calls == 1
+
+@pytest.mark.asyncio
+async def test_shared_call_cancelled_when_all_callers_are():
+    flights = SingleFlight(fresh_for=0)
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    callers = [asyncio.create_task(flights.do("slow", slow)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flights._in_flight == {}
@@ -0,0 +1,64 @@
+import time
+from types import MappingProxyType
+
+import numpy as np
+import pytest
+
+from backend.services.market_snapshot import MarketSnapshot
+from backend.services.price_history import PriceHistoryService
+from backend.services.spread_analytics import SpreadAnalytics, half_life, rolling_mean_std, spread_stats
+
+
+def test_rolling_mean_std_matches_naive():
+    rng = np.random.default_rng(1)
+    values = 100 + rng.normal(size=500)
+    mean, std = rolling_mean_std(values, 50)
+    windows = np.lib.stride_tricks.sliding_window_view(values, 50)
+    assert np.allclose(mean, windows.mean(axis=1))
+    assert np.allclose(std, windows.std(axis=1))
+
+
+def test_half_life_of_ar1_series():
+    rng = np.random.default_rng(7)
+    phi = 0.9  # Theoretical half-life: ln(0.5) / ln(0.9) = 6.58 samples
+    values = np.zeros(20_000)
+    for i in range(1, len(values)):
+        values[i] = phi * values[i - 1] + rng.normal()
+    assert half_life(values) == pytest.approx(6.58, rel=0.1)
+    assert half_life(np.cumsum(np.ones(100))) is None  # Trending, no reversion
+
+
+def test_spread_stats_current_value():
+    ts = np.arange(100) * 60_000
+    spreads = np.tile([0.0, 1.0], 50)
+    stats = spread_stats(ts, spreads, current=2.0, window=20)
+    assert stats["mean"] == pytest.approx(0.5) and stats["std"] == pytest.approx(0.5)
+    assert stats["zscore"] == pytest.approx(3.0)
+    assert stats["percentile"] == 100.0
+    assert spread_stats(ts[:5], spreads[:5]) is None
+
+
+@pytest.mark.asyncio
+async def test_analytics_cached_per_snapshot_version(tmp_path):
+    service = PriceHistoryService(str(tmp_path / "h.db"))
+    now = int(time.time() * 1000)
+    for i in range(60):
+        service.save(symbol="WIF", price_cex=1.0, price_dex=1.01, spread_pct=float(i % 3),
+                     timestamp=now - (60 - i) * 60_000)
+
+    calls = []
+    analytics = SpreadAnalytics(service, window=30)
+    original = analytics.compute
+    analytics.compute = lambda currents: calls.append(currents) or original(currents)
+
+    def snapshot(version):
+        results = (MappingProxyType({"token": "WIF", "is_valid": True, "spread_pct": 5.0}),
+                   MappingProxyType({"token": "JUP", "is_valid": True, "spread_pct": 1.0}))
+        return MarketSnapshot(version=version, created_at=time.time(), scan_duration=0.1, results=results)
+
+    first = await analytics.for_snapshot(snapshot(1))
+    assert list(first) == ["WIF"] and first["WIF"]["zscore"] > 3
+    assert await analytics.for_snapshot(snapshot(1), ["wif"]) == first
+    assert len(calls) == 1
+    await analytics.for_snapshot(snapshot(2))
+    assert len(calls) == 2
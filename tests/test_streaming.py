@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+from backend.ai.alpha_insight_service import AlphaInsightService
+from backend.ai.insight_cache import InsightCache
+from telegram.streaming import render_stream
+
+
+class FakeMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append((text, kwargs))
+
+
+async def chunks(parts):
+    text = ""
+    for part in parts:
+        text += part
+        yield text
+
+
+@pytest.mark.asyncio
+async def test_render_stream_throttles_and_finalizes():
+    message = FakeMessage()
+    final = await render_stream(message, chunks(["Market ", "is ", "calm."]), suffix="DYOR",
+                                reply_markup="kb", min_interval=60)
+    assert final == "Market is calm."
+    # First chunk is shown immediately, the rest are throttled until the final edit
+    assert len(message.edits) == 2
+    assert message.edits[0][0].startswith("Market ")
+    assert message.edits[-1] == ("Market is calm.\n\nDYOR", {"parse_mode": "HTML", "reply_markup": "kb"})
+
+
+@pytest.mark.asyncio
+async def test_render_stream_edits_every_change_without_throttle():
+    message = FakeMessage()
+    await render_stream(message, chunks(["a", "b", "", "c"]), min_interval=0)
+    assert [text for text, _ in message.edits[:-1]] == ["a ▌", "ab ▌", "abc ▌"]
+
+
+def stream_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+@pytest.mark.asyncio
+async def test_stream_insight_yields_partial_text_and_caches():
+    async def fake_stream():
+        for content in ["Spread ", None, "widening."]:
+            yield stream_chunk(content)
+
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return fake_stream()
+
+    service = AlphaInsightService(cache=InsightCache(ttl=60, db_path=None))
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    args = dict(price_cex=1.0, price_dex=1.02, spread=2.0, token="WIF", volume=10_000)
+
+    assert [t async for t in service.stream_insight(**args)] == ["Spread ", "Spread widening."]
+    assert [t async for t in service.stream_insight(**args)] == ["Spread widening."]
@@ -0,0 +1,20 @@
+import pytest
+from backend.clients.transport import HTTPTransport
+
+@pytest.mark.asyncio
+async def test_transport_reuses_client_per_host():
+    transport = HTTPTransport(max_connections=10, max_keepalive_connections=5)
+    okx_ticker = transport.client("https://www.okx.com/api/v5/market/ticker")
+    okx_candles = transport.client("https://www.okx.com/api/v5/market/candles")
+    jupiter = transport.client("https://quote-api.jup.ag/v6/quote")
+    assert okx_ticker is okx_candles
+    assert okx_ticker is not jupiter
+    assert transport.stats()["pools"] == 2
+    await transport.aclose()
+    assert okx_ticker.is_closed
+    assert transport.stats()["pools"] == 0
+
+def test_transport_rejects_relative_url():
+    transport = HTTPTransport()
+    with pytest.raises(ValueError):
+        transport.client("/api/v5/market/ticker")
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from backend.services.user_settings import (
+    DEFAULT_SETTINGS, UserSettings, UserSettingsStore, decode_flags, decode_mask, encode_flags, encode_mask,
+)
+
+
+def test_compact_encoding_round_trip():
+    settings = UserSettings(notify_enabled=False, spread_threshold=2.0, mode="degen")
+    assert decode_flags(encode_flags(settings)) == (False, "degen")
+    assert decode_flags(encode_flags(DEFAULT_SETTINGS)) == (True, "safe")
+
+    symbol_ids = {"WIF": 1, "JUP": 3, "BONK": 70}
+    blob = encode_mask({"WIF", "BONK"}, symbol_ids)
+    assert len(blob) == 9
+    assert decode_mask(blob, {v: k for k, v in symbol_ids.items()}) == {"WIF", "BONK"}
+    assert decode_mask(encode_mask(set(), symbol_ids), {}) == frozenset()
+    assert encode_mask(None, symbol_ids) is None and decode_mask(None, {}) is None
+
+
+@pytest.mark.asyncio
+async def test_settings_are_cached_and_written_back(tmp_path):
+    db_path = str(tmp_path / "bot.db")
+    store = UserSettingsStore(db_path, flush_interval=3600)
+    await store.start()
+    assert store.get(1) is DEFAULT_SETTINGS and 1 not in store
+
+    store.ensure(1)
+    store.update(2, spread_threshold=3.0, mode="degen", tracked_tokens={"wif", "jup"})
+    store.update(2, notify_enabled=False)
+    assert store.get(2).tracked_tokens == {"WIF", "JUP"}
+    assert store.stats()["dirty"] == 2
+
+    await store.flush()
+    assert store.stats()["dirty"] == 0 and store.stats()["writes"] == 2
+    with sqlite3.connect(db_path) as conn:
+        rows = dict(conn.execute("SELECT user_id, flags FROM users").fetchall())
+        assert rows == {1: 1, 2: 2}
+        assert {s for (s,) in conn.execute("SELECT symbol FROM symbols")} == {"WIF", "JUP"}
+
+    store.update(1, spread_threshold=5.0)
+    await store.stop()
+
+    reloaded = UserSettingsStore(db_path)
+    reloaded.load()
+    assert reloaded.get(1) == UserSettings(spread_threshold=5.0)
+    assert reloaded.get(2) == UserSettings(False, 3.0, "degen", frozenset({"WIF", "JUP"}))
+    assert dict(reloaded.items()).keys() == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_users_dirty(tmp_path):
+    store = UserSettingsStore(str(tmp_path / "missing" / "bot.db"))
+    store.update(1, spread_threshold=2.0)
+    await store.flush()
+    assert store.stats() == {"users": 1, "dirty": 1, "writes": 0, "flush_errors": 1}
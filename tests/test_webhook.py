@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from telegram.webhook import WebhookHandler
+
+SECRET = "test-secret"
+
+
+class FakeDispatcher:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.updates = []
+        self.active = 0
+        self.peak = 0
+
+    async def feed_raw_update(self, bot, update):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        self.updates.append(update["update_id"])
+
+
+def make_client(dispatcher, max_in_flight=64):
+    app = FastAPI()
+    webhook = WebhookHandler(dispatcher, bot=None, secret=SECRET, max_in_flight=max_in_flight)
+    webhook.mount(app)
+    return TestClient(app), webhook
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_rejects_missing_or_wrong_secret():
+    dispatcher = FakeDispatcher()
+    client, webhook = make_client(dispatcher)
+    with client:
+        assert client.post("/telegram/webhook", json={"update_id": 1}).status_code == 403
+        response = client.post("/telegram/webhook", json={"update_id": 1},
+                               headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+        assert response.status_code == 403
+        for body in (b"not json", b"\xff\xfe\xfa"):
+            response = client.post("/telegram/webhook", content=body,
+                                   headers={"X-Telegram-Bot-Api-Secret-Token": SECRET})
+            assert response.status_code == 400
+    assert dispatcher.updates == []
+    assert webhook.stats()["rejected"] == 2
+
+
+def test_updates_are_fed_concurrently_within_the_limit():
+    dispatcher = FakeDispatcher(delay=0.05)
+    client, webhook = make_client(dispatcher, max_in_flight=3)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    with client:
+        for update_id in range(6):
+            assert client.post("/telegram/webhook", json={"update_id": update_id}, headers=headers).status_code == 200
+        assert wait_for(lambda: len(dispatcher.updates) == 6)
+    assert sorted(dispatcher.updates) == list(range(6))
+    assert 1 < dispatcher.peak <= 3
+    assert webhook.stats() == {"in_flight": 0, "accepted": 6, "rejected": 0}